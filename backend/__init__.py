@@ -15,6 +15,7 @@ from backend.database.models.models import db, init_db
 from backend.database.models import onboarding_models  # SaaS features
 from backend.database.models import wellness_models  # CBT features
 from backend.database.models import age_verification_models  # Age-gated features
+from backend.database.models import activity_models  # Dashboard stats rollups
 
 # Import configuration
 from backend.services.config import configure_app
@@ -22,7 +23,13 @@ from backend.services.config import configure_app
 # Import services
 from backend.services.firebase.firebase_service import initialize_firebase
 from backend.services.chat.pinecone_service import initialize_pinecone
+from backend.services.chat.lexical_index import init_lexical_index
+from backend.services.activity_rollups import init_activity_rollups
+from backend.services.vector_store import init_vector_store
 from backend.services.socketio import init_socketio
+from backend.services.jobs import init_job_queue
+from backend.services.http_client import init_http_clients
+from backend.services.llm import init_llm
 
 # Login manager
 login_manager = LoginManager()
@@ -58,6 +65,8 @@ def create_app():
 
     # Initialize database
     init_db(app)
+    init_lexical_index(app)
+    init_activity_rollups(app)
     
     # Initialize default personas
     with app.app_context():
@@ -86,8 +95,12 @@ def create_app():
             return None
 
     # Initialize external services
+    init_http_clients(app)
+    init_llm(app)
     initialize_firebase(app)
     initialize_pinecone(app)
+    init_vector_store(app)
+    init_job_queue(app)
     
     # Initialize Socket.IO for real-time communication
     socketio = init_socketio(app)
@@ -0,0 +1,42 @@
+"""
+Activity rollup models for MyBella
+Per-user counters kept up to date as chat messages, mood check-ins and
+exercises are written, so dashboards read a few rows instead of the raw history
+"""
+
+from backend.database.models.models import db
+
+
+class DailyActivity(db.Model):
+    """One user's count (and summed amount) of one metric on one UTC day"""
+    __tablename__ = 'daily_activity'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', 'metric', name='uq_daily_activity_user_day_metric'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    metric = db.Column(db.String(120), nullable=False)  # e.g. 'chat_messages', 'chat_messages.persona:Maya'
+    count = db.Column(db.Integer, default=0, nullable=False)
+    total = db.Column(db.Float, default=0, nullable=False)  # Summed amount: mood level, exercise minutes
+
+    def __repr__(self):
+        return f'<DailyActivity {self.user_id} - {self.day} - {self.metric}: {self.count}>'
+
+
+class ActivityTotal(db.Model):
+    """One user's lifetime count (and summed amount) of one metric"""
+    __tablename__ = 'activity_totals'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'metric', name='uq_activity_totals_user_metric'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    metric = db.Column(db.String(120), nullable=False)
+    count = db.Column(db.Integer, default=0, nullable=False)
+    total = db.Column(db.Float, default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<ActivityTotal {self.user_id} - {self.metric}: {self.count}>'
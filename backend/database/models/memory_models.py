@@ -6,7 +6,8 @@ Stores conversation history, summaries, and user preferences for personalized AI
 from backend.database.models.models import db
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import JSON
-from sqlalchemy import Text
+from sqlalchemy import Text, event
+from backend.services.vector_store.ids import vector_id as memory_vector_id
 
 class ConversationMemory(db.Model):
     """Store conversation summaries and context for personalized responses"""
@@ -31,6 +32,7 @@ class ConversationMemory(db.Model):
     # Metadata
     message_count = db.Column(db.Integer, default=0)
     tokens_used = db.Column(db.Integer, default=0)
+    summarized_through_id = db.Column(db.Integer, default=0)  # Last ChatMessage.id folded into summary
     
     # Relationships
     user = db.relationship('User', backref=db.backref('conversation_memories', lazy='dynamic'))
@@ -59,6 +61,12 @@ class ConversationMemory(db.Model):
 class ChatMessage(db.Model):
     """Store individual chat messages for history and context"""
     __tablename__ = 'chat_messages'
+    __table_args__ = (
+        # Keyset pagination of a user's history, newest first
+        db.Index('ix_chat_messages_user_timestamp', 'user_id', 'timestamp', 'id'),
+        # Other messages stored under the same memory vector
+        db.Index('ix_chat_messages_user_vector', 'user_id', 'vector_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -69,6 +77,7 @@ class ChatMessage(db.Model):
     role = db.Column(db.String(20), nullable=False)  # 'user' or 'assistant'
     content = db.Column(Text, nullable=False)
     persona = db.Column(db.String(50))  # Legacy: kept for backward compatibility
+    vector_id = db.Column(db.String(120))  # Content-addressed memory vector (near-identical messages share one)
     
     # Metadata
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -98,6 +107,12 @@ class ChatMessage(db.Model):
         }
 
 
+@event.listens_for(ChatMessage, 'before_insert')
+@event.listens_for(ChatMessage, 'before_update')
+def _set_vector_id(mapper, connection, message):
+    message.vector_id = memory_vector_id(str(message.user_id), message.persona or '', message.content)
+
+
 class UserPreference(db.Model):
     """Track user preferences learned from conversations"""
     __tablename__ = 'user_preferences'
@@ -135,3 +150,97 @@ class UserPreference(db.Model):
             'learned_from': self.learned_from,
             'times_observed': self.times_observed
         }
+
+
+class MemoryDeletion(db.Model):
+    """A user's request to delete chat memory, carried out in the background across every store"""
+    __tablename__ = 'memory_deletions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    persona = db.Column(db.String(50))  # None = every persona
+    message_ids = db.Column(Text)  # JSON list of ChatMessage ids; None = the whole persona/user
+    through_message_id = db.Column(db.Integer)  # Whole-scope deletes leave messages sent after the request
+    
+    # Progress
+    status = db.Column(db.String(20), default='pending', nullable=False)  # 'pending', 'running', 'done', 'failed'
+    sql_deleted = db.Column(db.Integer, default=0)
+    vectors_deleted = db.Column(db.Integer, default=0)
+    firestore_deleted = db.Column(db.Integer, default=0)
+    error = db.Column(Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    completed_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<MemoryDeletion {self.id} - {self.user_id} - {self.status}>'
+    
+    def to_dict(self):
+        """Convert to dictionary for JSON serialization"""
+        return {
+            'id': self.id,
+            'persona': self.persona,
+            'status': self.status,
+            'sql_deleted': self.sql_deleted,
+            'vectors_deleted': self.vectors_deleted,
+            'firestore_deleted': self.firestore_deleted,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+
+
+class MemoryTombstone(db.Model):
+    """Marks memory as deleted until its MemoryDeletion finishes, so retrieval and upserts skip it"""
+    __tablename__ = 'memory_tombstones'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    deletion_id = db.Column(db.Integer, db.ForeignKey('memory_deletions.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    persona_key = db.Column(db.String(50))  # Lowercased persona; None = every persona
+    vector_id = db.Column(db.String(120))  # One memory vector; None = everything in scope
+    through_message_id = db.Column(db.Integer)  # Scope tombstones only cover messages up to this id
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class DataExport(db.Model):
+    """A compressed export file built in the background for download"""
+    __tablename__ = 'data_exports'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)  # Whose data
+    requested_by = db.Column(db.Integer)  # Admin who requested it; None = the user themselves
+    kind = db.Column(db.String(20), nullable=False)  # 'memories' or 'user_data'
+    format = db.Column(db.String(10), nullable=False)  # 'json' or 'ndjson'
+    compression = db.Column(db.String(10), nullable=False)  # 'gzip' or 'zip'
+    
+    # Progress
+    status = db.Column(db.String(20), default='pending', nullable=False)  # 'pending', 'running', 'done', 'failed', 'expired'
+    path = db.Column(db.String(500))
+    size_bytes = db.Column(db.Integer)
+    error = db.Column(Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    completed_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<DataExport {self.id} - {self.user_id} - {self.status}>'
+    
+    @property
+    def download_name(self):
+        extension = 'zip' if self.compression == 'zip' else f'{self.format}.gz'
+        return f"mybella_{self.kind}_{self.user_id}_{self.created_at.strftime('%Y%m%d')}.{extension}"
+    
+    def to_dict(self):
+        """Convert to dictionary for JSON serialization"""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'format': self.format,
+            'compression': self.compression,
+            'status': self.status,
+            'size_bytes': self.size_bytes,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
@@ -81,6 +81,11 @@ class Chat(db.Model):
 class Message(db.Model):
     """Individual message model"""
     __tablename__ = 'messages'
+    __table_args__ = (
+        # Keyset pagination newest first: per user, and across all users (admin message log)
+        db.Index('ix_messages_user_timestamp', 'user_id', 'timestamp', 'id'),
+        db.Index('ix_messages_timestamp', 'timestamp', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
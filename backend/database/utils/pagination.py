@@ -0,0 +1,69 @@
+"""
+Keyset (cursor) pagination for MyBella
+Message lists are paged newest first on (timestamp, id). Each page is an
+indexed range scan that starts after the previous page's last row, so deep
+pages cost the same as the first (OFFSET reads and discards every earlier
+row). Cursors are opaque URL-safe strings. Rows without a timestamp come
+after every timestamped row, ordered by id.
+
+Totals and filter options come from the activity rollups
+(backend/services/activity_rollups.py) instead of a COUNT(*) / DISTINCT scan.
+"""
+
+import base64
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(timestamp, row_id):
+    """Opaque cursor for the position just after a row (timestamp may be None)"""
+    raw = f"{timestamp.isoformat() if timestamp is not None else ''}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Returns:
+        tuple: (timestamp or None, id) of the row the cursor points after
+
+    Raises:
+        ValueError: The cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        timestamp, row_id = raw.split('|')
+        return (datetime.fromisoformat(timestamp) if timestamp else None), int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def keyset_page(query, timestamp_column, id_column, cursor=None, limit=50):
+    """
+    One page of a query, newest first
+
+    Args:
+        query: Filtered query (unordered)
+        cursor: next_cursor of the previous page (None = first page)
+        limit: Rows per page
+
+    Returns:
+        tuple: (rows, next_cursor), next_cursor is None on the last page
+    """
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        if timestamp is None:  # NULL timestamps sort last
+            after = and_(timestamp_column.is_(None), id_column < row_id)
+        else:
+            after = or_(timestamp_column < timestamp,
+                        and_(timestamp_column == timestamp, id_column < row_id),
+                        timestamp_column.is_(None))
+        query = query.filter(after)
+
+    rows = query.order_by(timestamp_column.desc().nulls_last(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, timestamp_column.key), getattr(last, id_column.key))
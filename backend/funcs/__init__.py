@@ -17,7 +17,9 @@ from .users import (
     update_user_settings,
     get_user_statistics,
     get_user_messages,
-    search_user_messages
+    get_user_messages_page,
+    search_user_messages,
+    search_user_messages_paginated
 )
 
 # Import admin functions
@@ -33,6 +35,7 @@ from .admin import (
     get_user_messages_admin,
     get_all_messages,
     search_all_messages,
+    search_all_messages_paginated,
     bulk_user_action,
     export_user_data
 )
@@ -51,7 +54,9 @@ __all__ = [
     'update_user_settings',
     'get_user_statistics',
     'get_user_messages',
+    'get_user_messages_page',
     'search_user_messages',
+    'search_user_messages_paginated',
     
     # Admin CRUD
     'AdminCRUDError',
@@ -65,6 +70,7 @@ __all__ = [
     'get_user_messages_admin',
     'get_all_messages',
     'search_all_messages',
+    'search_all_messages_paginated',
     'bulk_user_action',
     'export_user_data'
 ]
\ No newline at end of file
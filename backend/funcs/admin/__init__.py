@@ -15,6 +15,7 @@ from .admin_crud import (
     get_user_messages_admin,
     get_all_messages,
     search_all_messages,
+    search_all_messages_paginated,
     bulk_user_action,
     export_user_data
 )
@@ -31,6 +32,7 @@ __all__ = [
     'get_user_messages_admin',
     'get_all_messages',
     'search_all_messages',
+    'search_all_messages_paginated',
     'bulk_user_action',
     'export_user_data'
 ]
\ No newline at end of file
@@ -6,8 +6,12 @@ Database operations for administrative user management
 from typing import Optional, List, Dict, Any, Tuple
 from flask import current_app
 from backend.database.models.models import db, User, UserSettings, Message, Chat
+from backend.database.utils.pagination import keyset_page, encode_cursor
+from backend.services.chat.lexical_index import search_messages, load_ranked
+from backend.services.data_export import user_data_export
+from backend.services.activity_rollups import clear_user_activity, metric_count, breakdown_counts
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import func, desc, asc, or_
+from sqlalchemy import func, desc, or_
 from datetime import datetime, timedelta
 
 class AdminCRUDError(Exception):
@@ -293,6 +297,7 @@ def admin_delete_user(user_id: int, admin_id: int) -> bool:
         # Delete user (cascade will handle related data)
         db.session.delete(user)
         db.session.commit()
+        clear_user_activity(user_id)
         
         current_app.logger.info(f"Admin {admin_id} deleted user account: {email}")
         return True
@@ -381,18 +386,21 @@ def get_system_statistics() -> Dict[str, Any]:
         return {}
 
 def get_user_messages_admin(user_id: int, page: int = 1, per_page: int = 50, 
-                           persona_filter: Optional[str] = None) -> Tuple[List[Message], int]:
+                           persona_filter: Optional[str] = None,
+                           cursor: Optional[str] = None) -> Tuple[List[Message], int]:
     """
     Get user's messages for admin review
     
     Args:
         user_id: User's ID
-        page: Page number
+        page: Page number (ignored when a cursor is given)
         per_page: Messages per page
         persona_filter: Filter by persona
+        cursor: Continue after this cursor (see get_all_messages(user_id=...))
     
     Returns:
-        Tuple of (messages list, total count)
+        Tuple of (messages list, total count); the total comes from the
+        activity rollups
     """
     try:
         query = Message.query.filter_by(user_id=user_id)
@@ -400,10 +408,13 @@ def get_user_messages_admin(user_id: int, page: int = 1, per_page: int = 50,
         if persona_filter:
             query = query.filter_by(persona=persona_filter)
         
-        total = query.count()
-        messages = query.order_by(desc(Message.timestamp)).offset(
-            (page - 1) * per_page
-        ).limit(per_page).all()
+        total = metric_count(f'messages.persona:{persona_filter}' if persona_filter else 'messages', user_id)
+        if cursor or page <= 1:
+            messages = keyset_page(query, Message.timestamp, Message.id, cursor, per_page)[0]
+        else:
+            messages = query.order_by(desc(Message.timestamp), desc(Message.id)).offset(
+                (page - 1) * per_page
+            ).limit(per_page).all()
         
         return messages, total
         
@@ -412,7 +423,7 @@ def get_user_messages_admin(user_id: int, page: int = 1, per_page: int = 50,
         return [], 0
 
 def search_all_messages(search_term: str, limit: int = 100, 
-                       user_filter: Optional[int] = None) -> List[Message]:
+                       user_filter: Optional[int] = None, page: int = 1) -> List[Message]:
     """
     Search all messages in the system (admin only)
     
@@ -420,39 +431,77 @@ def search_all_messages(search_term: str, limit: int = 100,
         search_term: Term to search for
         limit: Maximum results
         user_filter: Filter by specific user ID
+        page: Page number
+    
+    Returns:
+        List of matching messages, best match first, each with an HTML-safe .snippet
+    """
+    return search_all_messages_paginated(search_term, page, limit, user_filter)['messages']
+
+def search_all_messages_paginated(search_term: str, cursor: Optional[str] = None, per_page: int = 50,
+                                  user_filter: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Full-text search across every user's messages (admin only)
+    
+    Uses the lexical index, so it reads only matching rows and never
+    blocks writers the way a LIKE scan over all message text did.
+    
+    Args:
+        search_term: Term to search for
+        cursor: next_cursor of the previous page (None = first page)
+        per_page: Messages per page
+        user_filter: Filter by specific user ID
     
     Returns:
-        List of matching messages
+        Dictionary with ranked messages and keyset pagination info (total
+        counts matches up to SEARCH_COUNT_CAP)
+    
+    Raises:
+        ValueError: Malformed cursor
     """
     try:
-        query = Message.query.filter(Message.content.contains(search_term))
+        results = search_messages('messages', search_term, user_id=user_filter, cursor=cursor, per_page=per_page)
         
-        if user_filter:
-            query = query.filter_by(user_id=user_filter)
-        
-        return query.order_by(desc(Message.timestamp)).limit(limit).all()
+        return {
+            'messages': load_ranked(Message, results),
+            'total': results['total'],
+            'total_capped': results['total_capped'],
+            'per_page': per_page,
+            'has_next': results['has_next'],
+            'next_cursor': results['next_cursor'],
+        }
         
+    except ValueError:
+        raise
     except Exception as e:
         current_app.logger.error(f"Error searching messages: {str(e)}")
-        return []
+        return {'messages': [], 'total': 0, 'total_capped': False, 'per_page': per_page, 'has_next': False,
+                'next_cursor': None}
 
 def get_all_messages(page: int = 1, per_page: int = 50, 
                     user_id: Optional[int] = None,
-                    persona_filter: Optional[str] = None) -> Dict[str, Any]:
+                    persona_filter: Optional[str] = None,
+                    cursor: Optional[str] = None) -> Dict[str, Any]:
     """
     Get all messages with pagination and filtering (admin only)
     
+    Pages are keyset-paginated newest first: pass the returned next_cursor
+    to get the next page. Page numbers past 1 without a cursor still work
+    but get slower the deeper they go.
+    
     Args:
-        page: Page number
+        page: Page number (ignored when a cursor is given)
         per_page: Messages per page
         user_id: Filter by specific user ID
         persona_filter: Filter by persona
+        cursor: next_cursor of the previous page
     
     Returns:
-        Dictionary with messages, pagination info, and filter options
+        Dictionary with messages, pagination info (total and personas come
+        from the activity rollups), and filter options
     """
     try:
-        query = Message.query.join(User)
+        query = Message.query
         
         if user_id:
             query = query.filter(Message.user_id == user_id)
@@ -460,16 +509,30 @@ def get_all_messages(page: int = 1, per_page: int = 50,
         if persona_filter:
             query = query.filter(Message.persona.contains(persona_filter))
         
-        messages_pagination = query.order_by(desc(Message.timestamp)).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        if cursor or page <= 1:
+            messages, next_cursor = keyset_page(query, Message.timestamp, Message.id, cursor, per_page)
+        else:
+            messages = query.order_by(desc(Message.timestamp), desc(Message.id)).offset(
+                (page - 1) * per_page
+            ).limit(per_page + 1).all()
+            next_cursor = None
+            if len(messages) > per_page:
+                messages = messages[:per_page]
+                next_cursor = encode_cursor(messages[-1].timestamp, messages[-1].id)
         
         # Get unique personas for filter
-        personas_query = db.session.query(Message.persona).distinct()
-        personas = [p[0] for p in personas_query.all() if p[0]]
+        personas = list(breakdown_counts('messages.persona'))
+        
+        if persona_filter:
+            total = sum(breakdown_counts('messages.persona', user_id or None, contains=persona_filter).values())
+        else:
+            total = metric_count('messages', user_id or None)
         
         return {
-            'messages': messages_pagination,
+            'messages': messages,
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None,
+            'total': total,
             'personas': personas,
             'user_filter': user_id,
             'persona_filter': persona_filter
@@ -551,6 +614,10 @@ def export_user_data(user_id: int) -> Optional[Dict[str, Any]]:
     """
     Export all user data for admin purposes
     
+    Builds the whole export in memory; for long histories stream it instead
+    with data_export.export_response('user_data', user_id) or build a file
+    in the background with data_export.request_export.
+    
     Args:
         user_id: User's ID
     
@@ -558,54 +625,15 @@ def export_user_data(user_id: int) -> Optional[Dict[str, Any]]:
         Dictionary containing all user data
     """
     try:
-        user = User.query.get(user_id)
-        if not user:
+        export = user_data_export(user_id)
+        if export is None:
             return None
         
-        # Get all user data
-        messages = Message.query.filter_by(user_id=user_id).order_by(asc(Message.timestamp)).all()
-        chats = Chat.query.filter_by(user_id=user_id).order_by(asc(Chat.created_at)).all()
-        settings = UserSettings.query.filter_by(user_id=user_id).first()
-        
-        return {
-            'user_info': {
-                'id': user.id,
-                'name': user.name,
-                'email': user.email,
-                'role': user.role,
-                'active': user.active,
-                'created_at': user.created_at.isoformat() if user.created_at else None
-            },
-            'settings': {
-                'current_persona': settings.current_persona if settings else None,
-                'mode': settings.mode if settings else None,
-                'tts_enabled': settings.tts_enabled if settings else None,
-                'age_confirmed': settings.age_confirmed if settings else None,
-                'show_ads': settings.show_ads if settings else None,
-            } if settings else None,
-            'messages': [
-                {
-                    'id': msg.id,
-                    'role': msg.role,
-                    'content': msg.content,
-                    'persona': msg.persona,
-                    'timestamp': msg.timestamp.isoformat() if msg.timestamp else None
-                }
-                for msg in messages
-            ],
-            'chats': [
-                {
-                    'id': chat.id,
-                    'title': chat.title,
-                    'persona': chat.persona,
-                    'mode': chat.mode,
-                    'created_at': chat.created_at.isoformat() if chat.created_at else None,
-                    'updated_at': chat.updated_at.isoformat() if chat.updated_at else None
-                }
-                for chat in chats
-            ],
-            'export_timestamp': datetime.utcnow().isoformat()
-        }
+        header, sections = export
+        return dict(header, **{name: [
+            dict(row, **{key: value.isoformat() for key, value in row.items() if isinstance(value, datetime)})
+            for row in rows()
+        ] for name, rows in sections})
         
     except Exception as e:
         current_app.logger.error(f"Error exporting user data for {user_id}: {str(e)}")
@@ -16,7 +16,9 @@ from .user_crud import (
     update_user_settings,
     get_user_statistics,
     get_user_messages,
+    get_user_messages_page,
     search_user_messages,
+    search_user_messages_paginated,
     update_user_profile_picture,
     get_user_profile_picture_url
 )
@@ -34,7 +36,9 @@ __all__ = [
     'update_user_settings',
     'get_user_statistics',
     'get_user_messages',
+    'get_user_messages_page',
     'search_user_messages',
+    'search_user_messages_paginated',
     'update_user_profile_picture',
     'get_user_profile_picture_url'
 ]
\ No newline at end of file
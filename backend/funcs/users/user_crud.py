@@ -9,8 +9,13 @@ from flask import current_app
 from werkzeug.utils import secure_filename
 from backend.database.models.models import db, User, UserSettings, Message, Chat
 from backend.database.utils.utils import safe_filename, allowed_image_file
+from backend.database.utils.pagination import keyset_page
+from backend.services.chat.lexical_index import search_messages, load_ranked
+from backend.services.activity_rollups import (
+    clear_user_activity, lifetime_totals, daily_rows, window_totals, breakdown, count_of, metric_count
+)
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import func, desc
+from sqlalchemy import desc
 from datetime import datetime, timedelta
 
 class UserCRUDError(Exception):
@@ -250,6 +255,7 @@ def delete_user_account(user_id: int, password: str) -> bool:
         # Delete user (cascade will handle related data)
         db.session.delete(user)
         db.session.commit()
+        clear_user_activity(user_id)
         
         current_app.logger.info(f"Permanently deleted user account: {email}")
         return True
@@ -322,23 +328,13 @@ def get_user_statistics(user_id: int) -> Dict[str, Any]:
         Dictionary containing user statistics
     """
     try:
-        # Basic counts
-        message_count = Message.query.filter_by(user_id=user_id).count()
+        # Basic counts (message counts come from the activity rollups)
+        totals = lifetime_totals(user_id, 'messages')
         chat_count = Chat.query.filter_by(user_id=user_id).count()
-        user_message_count = Message.query.filter_by(user_id=user_id, role='user').count()
-        
-        # Persona usage
-        persona_stats = db.session.query(
-            Message.persona,
-            func.count(Message.id).label('count')
-        ).filter_by(user_id=user_id).group_by(Message.persona).all()
         
         # Recent activity (last 7 days)
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        recent_messages = Message.query.filter(
-            Message.user_id == user_id,
-            Message.timestamp >= week_ago
-        ).count()
+        week_ago = (datetime.utcnow() - timedelta(days=7)).date()
+        recent_messages = count_of(window_totals(daily_rows(user_id, 'messages', week_ago)), 'messages')
         
         # Most recent message
         last_message = Message.query.filter_by(user_id=user_id).order_by(
@@ -354,10 +350,10 @@ def get_user_statistics(user_id: int) -> Dict[str, Any]:
             voice_minutes_remaining = 100
         
         return {
-            'total_messages': message_count,
-            'user_messages': user_message_count,
+            'total_messages': count_of(totals, 'messages'),
+            'user_messages': count_of(totals, 'messages.user'),
             'chat_sessions': chat_count,
-            'persona_usage': [(p.persona, p.count) for p in persona_stats],
+            'persona_usage': list(breakdown(totals, 'messages.persona').items()),
             'recent_activity': recent_messages,
             'last_activity': last_message.timestamp if last_message else None,
             'voice_minutes_remaining': voice_minutes_remaining
@@ -367,7 +363,8 @@ def get_user_statistics(user_id: int) -> Dict[str, Any]:
         current_app.logger.error(f"Error getting user statistics for {user_id}: {str(e)}")
         return {}
 
-def get_user_messages(user_id: int, limit: int = 50, offset: int = 0, persona_filter: Optional[str] = None) -> List[Message]:
+def get_user_messages(user_id: int, limit: int = 50, offset: int = 0, persona_filter: Optional[str] = None,
+                      cursor: Optional[str] = None) -> List[Message]:
     """
     Get user's messages with optional filtering
     
@@ -376,6 +373,8 @@ def get_user_messages(user_id: int, limit: int = 50, offset: int = 0, persona_fi
         limit: Maximum number of messages to return
         offset: Number of messages to skip
         persona_filter: Filter by specific persona (optional)
+        cursor: Continue after this cursor instead of skipping offset messages
+            (see get_user_messages_page)
     
     Returns:
         List of Message objects
@@ -386,33 +385,98 @@ def get_user_messages(user_id: int, limit: int = 50, offset: int = 0, persona_fi
         if persona_filter:
             query = query.filter_by(persona=persona_filter)
         
-        return query.order_by(desc(Message.timestamp)).offset(offset).limit(limit).all()
+        if cursor or not offset:
+            return keyset_page(query, Message.timestamp, Message.id, cursor, limit)[0]
+        return query.order_by(desc(Message.timestamp), desc(Message.id)).offset(offset).limit(limit).all()
         
     except Exception as e:
         current_app.logger.error(f"Error getting user messages for {user_id}: {str(e)}")
         return []
 
-def search_user_messages(user_id: int, search_term: str, limit: int = 20) -> List[Message]:
+def get_user_messages_page(user_id: int, cursor: Optional[str] = None, per_page: int = 50,
+                           persona_filter: Optional[str] = None) -> Dict[str, Any]:
     """
-    Search user's messages by content
+    One page of user's messages, newest first (keyset pagination)
+    
+    Args:
+        user_id: User's ID
+        cursor: next_cursor of the previous page (None = first page)
+        per_page: Messages per page
+        persona_filter: Filter by specific persona (optional)
+    
+    Returns:
+        Dictionary with messages, next_cursor (None on the last page), has_next
+        and total (from the activity rollups)
+    
+    Raises:
+        ValueError: Malformed cursor
+    """
+    query = Message.query.filter_by(user_id=user_id)
+    if persona_filter:
+        query = query.filter_by(persona=persona_filter)
+    
+    messages, next_cursor = keyset_page(query, Message.timestamp, Message.id, cursor, per_page)
+    
+    return {
+        'messages': messages,
+        'next_cursor': next_cursor,
+        'has_next': next_cursor is not None,
+        'total': metric_count(f'messages.persona:{persona_filter}' if persona_filter else 'messages', user_id)
+    }
+
+def search_user_messages(user_id: int, search_term: str, limit: int = 20, cursor: Optional[str] = None,
+                         persona_filter: Optional[str] = None) -> List[Message]:
+    """
+    Search user's messages by content (full-text, best match first)
     
     Args:
         user_id: User's ID
         search_term: Term to search for in message content
         limit: Maximum number of results
+        cursor: next_cursor of the previous page
+        persona_filter: Filter by persona
+    
+    Returns:
+        List of matching Message objects, each with an HTML-safe .snippet
+    """
+    return search_user_messages_paginated(user_id, search_term, cursor, limit, persona_filter)['messages']
+
+def search_user_messages_paginated(user_id: int, search_term: str, cursor: Optional[str] = None,
+                                   per_page: int = 20, persona_filter: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Search user's messages with keyset pagination (best match first)
+    
+    Args:
+        user_id: User's ID
+        search_term: Term to search for in message content
+        cursor: next_cursor of the previous page (None = first page)
+        per_page: Messages per page
+        persona_filter: Filter by persona
     
     Returns:
-        List of matching Message objects
+        Dictionary with messages, next_cursor (None on the last page), has_next,
+        total and total_capped (matches are counted up to SEARCH_COUNT_CAP)
+    
+    Raises:
+        ValueError: Malformed cursor
     """
+    empty = {'messages': [], 'next_cursor': None, 'has_next': False, 'total': 0, 'total_capped': False}
     try:
-        return Message.query.filter(
-            Message.user_id == user_id,
-            Message.content.contains(search_term)
-        ).order_by(desc(Message.timestamp)).limit(limit).all()
-        
+        results = search_messages('messages', search_term, user_id=user_id, persona=persona_filter,
+                                  cursor=cursor, per_page=per_page)
+    except ValueError:
+        raise
     except Exception as e:
         current_app.logger.error(f"Error searching user messages for {user_id}: {str(e)}")
-        return []
+        return empty
+    
+    return {
+        'messages': load_ranked(Message, results),
+        'next_cursor': results['next_cursor'],
+        'has_next': results['has_next'],
+        'total': results['total'],
+        'total_capped': results['total_capped']
+    }
 
 def update_user_profile_picture(user_id: int, file) -> Optional[str]:
     """
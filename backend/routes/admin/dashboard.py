@@ -3,13 +3,16 @@ Admin routes for MyBella - Analytics and Management
 Handles admin dashboard, analytics, persona management, and system monitoring
 """
 
-from flask import Blueprint, render_template, request, jsonify, session
+from flask import Blueprint, render_template, request, jsonify, session, url_for, send_file
 from flask_login import login_required, current_user
 from functools import wraps
 from datetime import datetime, timedelta
 import json
 from backend.database.models.models import User, PersonaProfile, Message, UserSubscription
 from backend.database.utils.utils import get_db_connection
+from backend.database.utils.pagination import decode_cursor
+from backend.funcs.admin import search_all_messages_paginated, get_all_messages
+from backend.services.data_export import FORMATS, COMPRESSIONS, export_response, request_export, get_export
 from sqlalchemy import func, and_, or_
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
@@ -410,6 +413,145 @@ def toggle_persona_status(persona_id):
         db.rollback()
         return jsonify({'error': 'Failed to update persona status'}), 500
 
+@admin_bp.route('/api/messages')
+@login_required
+@admin_required
+def list_messages():
+    """Global message log, newest first (follow next_cursor for older pages)"""
+    try:
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                decode_cursor(cursor)
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+        
+        per_page = min(request.args.get('per_page', 50, type=int), 200)
+        results = get_all_messages(
+            per_page=per_page,
+            user_id=request.args.get('user_id', type=int),
+            persona_filter=request.args.get('persona', ''),
+            cursor=cursor
+        )
+        
+        return jsonify({
+            'messages': [{
+                'id': message.id,
+                'user_id': message.user_id,
+                'chat_id': message.chat_id,
+                'role': message.role,
+                'persona': message.persona,
+                'content': message.content,
+                'timestamp': message.timestamp.isoformat() if message.timestamp else None
+            } for message in results['messages']],
+            'next_cursor': results['next_cursor'],
+            'has_next': results['has_next'],
+            'total': results['total'],
+            'total_is_approximate': True,
+            'personas': results['personas']
+        })
+        
+    except Exception as e:
+        print(f"Error fetching messages: {e}")
+        return jsonify({'error': 'Failed to fetch messages'}), 500
+
+@admin_bp.route('/api/messages/search')
+@login_required
+@admin_required
+def search_messages():
+    """Full-text search across all users' messages"""
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'Search query is required'}), 400
+        
+        per_page = min(request.args.get('per_page', 50, type=int), 200)
+        user_id = request.args.get('user_id', type=int)
+        
+        try:
+            results = search_all_messages_paginated(query, cursor=request.args.get('cursor') or None,
+                                                    per_page=per_page, user_filter=user_id)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'messages': [{
+                'id': message.id,
+                'user_id': message.user_id,
+                'chat_id': message.chat_id,
+                'role': message.role,
+                'persona': message.persona,
+                'snippet': str(message.snippet),
+                'score': message.search_score,
+                'timestamp': message.timestamp.isoformat() if message.timestamp else None
+            } for message in results['messages']],
+            'total': results['total'],
+            'total_capped': results['total_capped'],
+            'per_page': results['per_page'],
+            'has_next': results['has_next'],
+            'next_cursor': results['next_cursor']
+        })
+        
+    except Exception as e:
+        print(f"Error searching messages: {e}")
+        return jsonify({'error': 'Failed to search messages'}), 500
+
+@admin_bp.route('/api/users/<int:user_id>/export')
+@login_required
+@admin_required
+def export_user(user_id):
+    """
+    Export everything stored for a user (streamed)
+    
+    Pass background=1 to build a gzip/zip file in the background instead.
+    """
+    try:
+        fmt = request.args.get('format', 'json')
+        compression = request.args.get('compression', 'gzip')
+        if fmt not in FORMATS or compression not in COMPRESSIONS:
+            return jsonify({'error': 'Unsupported export format'}), 400
+        
+        if request.args.get('background') == '1':
+            if not User.query.get(user_id):
+                return jsonify({'error': 'User not found'}), 404
+            export = request_export(user_id, 'user_data', fmt, compression, requested_by=current_user.id)
+            return jsonify({
+                'export_id': export.id,
+                'status_url': url_for('admin.export_status', export_id=export.id),
+                'download_url': url_for('admin.export_download', export_id=export.id)
+            }), 202
+        
+        response = export_response('user_data', user_id, fmt)
+        if response is None:
+            return jsonify({'error': 'User not found'}), 404
+        return response
+        
+    except Exception as e:
+        print(f"Error exporting user data: {e}")
+        return jsonify({'error': 'Failed to export user data'}), 500
+
+@admin_bp.route('/api/exports/<int:export_id>')
+@login_required
+@admin_required
+def export_status(export_id):
+    """Progress of a background export"""
+    export = get_export(export_id)
+    if export is None:
+        return jsonify({'error': 'Export not found'}), 404
+    
+    return jsonify(export.to_dict())
+
+@admin_bp.route('/api/exports/<int:export_id>/download')
+@login_required
+@admin_required
+def export_download(export_id):
+    """Download a finished background export"""
+    export = get_export(export_id)
+    if export is None or export.status != 'done':
+        return jsonify({'error': 'Export not ready'}), 404
+    
+    return send_file(export.path, as_attachment=True, download_name=export.download_name)
+
 @admin_bp.route('/api/system-logs')
 @login_required
 @admin_required
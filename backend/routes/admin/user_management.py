@@ -7,11 +7,12 @@ from flask import Blueprint, render_template, request, jsonify, flash, redirect,
 from flask_login import login_required, current_user
 from functools import wraps
 from datetime import datetime, timedelta
-from backend.database.models.models import db, User, Chat, Message, UserSettings
+from backend.database.models.models import db, User, Chat, UserSettings
 from backend.database.models.wellness_models import (
     MoodEntry, WellnessGoal, FinanceEntry, SocialConnection,
     CopingStrategy, CBTSession, WellnessAchievement
 )
+from backend.services.activity_rollups import totals_for_users
 from sqlalchemy import func, desc, or_
 import logging
 
@@ -84,11 +85,10 @@ def get_users_list():
         
         # Format user data
         users = []
+        activity = totals_for_users([user.id for user in pagination.items], ['messages', 'mood_entries'])
         for user in pagination.items:
             # Get user statistics
-            message_count = Message.query.filter_by(user_id=user.id).count()
             chat_count = Chat.query.filter_by(user_id=user.id).count()
-            mood_count = MoodEntry.query.filter_by(user_id=user.id).count()
             
             users.append({
                 'id': user.id,
@@ -99,9 +99,9 @@ def get_users_list():
                 'active': user.active,
                 'created_at': user.created_at.isoformat(),
                 'stats': {
-                    'messages': message_count,
+                    'messages': activity[user.id].get('messages', 0),
                     'chats': chat_count,
-                    'mood_entries': mood_count
+                    'mood_entries': activity[user.id].get('mood_entries', 0)
                 }
             })
         
@@ -130,9 +130,10 @@ def get_user_details(user_id):
         user = User.query.get_or_404(user_id)
         
         # Get user statistics
-        message_count = Message.query.filter_by(user_id=user.id).count()
+        activity = totals_for_users([user.id], ['messages', 'mood_entries'])[user.id]
+        message_count = activity.get('messages', 0)
         chat_count = Chat.query.filter_by(user_id=user.id).count()
-        mood_count = MoodEntry.query.filter_by(user_id=user.id).count()
+        mood_count = activity.get('mood_entries', 0)
         goal_count = WellnessGoal.query.filter_by(user_id=user.id).count()
         achievement_count = WellnessAchievement.query.filter_by(user_id=user.id).count()
         
@@ -3,73 +3,166 @@ API routes for MyBella
 Handles chat, TTS, voice upload endpoints, and real-time communication
 """
 
-from flask import Blueprint, request, jsonify, send_file, session, current_app
+from flask import Blueprint, request, jsonify, send_file, session, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
 from backend.database.models.models import db, Message, PersonaProfile
 from backend.database.utils.utils import get_user_id, get_persona, get_mode, get_tts_enabled, safe_filename, allowed_audio_file
-from backend.services.chat.chat_service import get_ai_response
-from backend.services.firebase.firebase_service import store_message_firestore
-from backend.services.chat.pinecone_service import pinecone_upsert
+from backend.services.chat.chat_service import get_ai_response, stream_ai_response
+from backend.services.chat.memory_retriever import retrieve_memory
+from backend.services.chat.context_builder import build_context_window, empty_window
+from backend.services.chat.idempotency import get_idempotency_store, make_key, NEW, REPLAY
+from backend.services.jobs import enqueue_jobs
+from backend.services.admission import admission_controlled
+from backend.services.chat.stage_executor import StageExecutor
 from backend.services.elevenlabs.tts_service import generate_speech, upload_voice
-from backend.services.socketio import emit_ai_response, emit_subscription_update
+from backend.services.socketio import emit_ai_response, emit_ai_token, emit_subscription_update
 from backend.services.voice.voice_conversation_service import VoiceConversationService, generate_voice
 from backend.services.crisis_detection import detect_crisis, get_crisis_response, log_crisis_event, should_block_ai_response
 from backend.services.achievements_service import AchievementsService
+from backend.services.mood_service import MoodService
+from backend.services.voice_chat_service import VoiceChatService
 from backend.funcs.users import update_user_profile_picture, get_user_profile_picture_url, UserCRUDError
 from backend.funcs.personas.persona_crud import (
     update_persona_profile_picture, get_persona_profile_picture_url, 
     PersonaCRUDError, get_persona_with_picture_info
 )
 import io
+import itertools
+import json
 
 api_bp = Blueprint('api', __name__)
 
-@api_bp.route('/chat', methods=['POST'])
-@login_required
-def api_chat():
-    """Handle chat messages with real-time support and crisis detection"""
-    data = request.get_json(force=True)
+def _sse(event, data):
+    """Format one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _parse_chat_request(data):
+    """Extract chat fields from the request JSON (shared by /chat and /chat/stream)"""
     user_text = (data.get('text') or '').strip()
     persona = (data.get('persona') or get_persona()).capitalize()
     mode = data.get('mode') or get_mode()
     chat_id = data.get('chat_id')  # For real-time room support
     use_voice = data.get('use_voice', False)  # NEW: Voice mode flag from frontend
     
-    if not user_text:
-        return jsonify({"error": "Empty message"}), 400
+    return user_text, persona, mode, chat_id, use_voice
 
-    user_id = get_user_id()
+def _claim_idempotency_key(data, user_id):
+    """
+    Claim the request's client_message_id (or Idempotency-Key header)
     
-    # Get persona_id for memory isolation
+    Returns:
+        tuple: (key, state, replay) - key is None when the client sent no id;
+        otherwise state is NEW (this request runs the turn), REPLAY (replay holds
+        the earlier response payload) or PENDING (a duplicate is still running)
+    """
+    key = make_key(user_id, data.get('client_message_id') or request.headers.get('Idempotency-Key'))
+    if key is None:
+        return None, NEW, None
+    
+    state, replay = get_idempotency_store().begin(key)
+    return key, state, replay
+
+def _duplicate_in_progress():
+    return jsonify({"error": "A request with this client_message_id is still in progress"}), 409
+
+def _get_persona_id(persona):
+    """Get persona_id for memory isolation"""
     persona_profile = PersonaProfile.query.filter_by(name=persona).first()
-    persona_id = persona_profile.id if persona_profile else None
+    return persona_profile.id if persona_profile else None
+
+def _load_history(user_id, persona):
+    """Conversation history for the prompt; history is optional context, so a failure leaves it empty"""
+    try:
+        return build_context_window(user_id, persona)
+    except Exception as e:
+        current_app.logger.warning(f"History stage failed for user {user_id}, continuing without history: {e}")
+        return empty_window()
+
+def _run_prechat_stages(user_id, user_text, persona, use_voice):
+    """
+    Fan out the independent lookups needed before the LLM call
+    
+    Persona lookup, crisis detection, memory retrieval (keyword + vector
+    search), conversation history, mood context and voice status don't depend
+    on each other, so they run concurrently and are joined here.
+    
+    Returns:
+        tuple: (StageExecutor, results dict keyed by stage name)
+    """
+    stages = StageExecutor()
+    stages.submit('persona', _get_persona_id, persona)
+    stages.submit('crisis', detect_crisis, user_text)
+    stages.submit('memory', retrieve_memory, user_id, persona, user_text)
+    stages.submit('history', _load_history, user_id, persona)
+    stages.submit('mood', MoodService.get_mood_context, user_id)
+    if not use_voice:
+        stages.submit('voice_status', VoiceChatService.get_user_voice_status, user_id)
+    
+    return stages, stages.join()
+
+def _check_crisis(user_id, user_text, detection):
+    """
+    Act on the crisis detection result for the user message
     
+    Args:
+        detection: detect_crisis() result tuple
+    
+    Returns:
+        tuple: (is_crisis, severity, crisis_prefix, block_ai) where crisis_prefix is
+        the crisis resources text to show before (or instead of) the AI reply
+    """
     # Crisis detection - check user message for high-risk indicators
-    is_crisis, severity, matched_keywords = detect_crisis(user_text)
+    is_crisis, severity, matched_keywords = detection
     
-    if is_crisis:
-        # Log crisis event for admin monitoring
-        log_crisis_event(user_id, user_text, severity, matched_keywords)
-        
-        # Get crisis-appropriate response
-        crisis_response_data = get_crisis_response(severity)
-        
-        # For high severity, prioritize crisis resources over AI response
-        if should_block_ai_response(severity):
-            bot_text = crisis_response_data['message']
-        else:
-            # Get AI response but prepend crisis resources
-            bot_text = crisis_response_data['message'] + "\n\n---\n\n"
-            ai_response = get_ai_response(user_text, persona, mode, user_id, persona_id=persona_id)
-            bot_text += ai_response
-    else:
-        # Normal AI response flow (now with persona_id for memory isolation)
-        bot_text = get_ai_response(user_text, persona, mode, user_id, persona_id=persona_id)
+    if not is_crisis:
+        return False, severity, '', False
+    
+    # Log crisis event for admin monitoring
+    log_crisis_event(user_id, user_text, severity, matched_keywords)
+    
+    # Get crisis-appropriate response
+    crisis_response_data = get_crisis_response(severity)
+    
+    # For high severity, prioritize crisis resources over AI response
+    if should_block_ai_response(severity):
+        return True, severity, crisis_response_data['message'], True
+    
+    # Get AI response but prepend crisis resources
+    return True, severity, crisis_response_data['message'] + "\n\n---\n\n", False
+
+def _stream_reply_tokens(user_text, persona, mode, user_id, chat_id, crisis_prefix, block_ai, ai_kwargs):
+    """
+    Yield the bot reply piece by piece, mirroring each piece to the chat room
+    
+    The crisis prefix (if any) is sent first so resources reach the user before
+    the model has produced anything.
+    """
+    pieces = [crisis_prefix] if crisis_prefix else []
+    if not block_ai:
+        pieces = itertools.chain(pieces, stream_ai_response(user_text, persona, mode, user_id, **ai_kwargs))
     
-    # Store user message in Firestore
-    store_message_firestore(user_id, persona, "user", user_text)
+    for index, token in enumerate(pieces):
+        if chat_id:
+            try:
+                emit_ai_token(chat_id, persona, token, index)
+            except Exception:
+                # Continue if real-time emission fails
+                pass
+        yield token
 
+def _finalize_chat_turn(user_id, user_text, bot_text, persona, persona_id, chat_id, use_voice, is_crisis, severity,
+                        mood_context=None, voice_status=None, history=None):
+    """
+    Persist a completed chat turn and build the JSON payload for the client
+    
+    Stores both messages, queues Firestore/vector memory writes (plus a rolling
+    summary update once history overflows the context window), updates
+    achievements, emits the final
+    real-time message and attaches voice, mood and crisis info. mood_context,
+    voice_status and history can be passed in when already fetched by the pre-chat stages.
+    """
     # Save conversation to database WITH persona_id for memory isolation
+    user_msg_id = bot_msg_id = None
     try:
         from backend.database.models.memory_models import ChatMessage
         
@@ -105,6 +198,7 @@ def api_chat():
             persona=persona
         ))
         db.session.commit()
+        user_msg_id, bot_msg_id = user_msg.id, bot_msg.id
         
         # 🏆 Check for conversation achievements and update streak
         newly_unlocked = AchievementsService.check_conversation_achievements(current_user.id)
@@ -115,9 +209,18 @@ def api_chat():
         newly_unlocked = []
         streak_achievements = []
 
-    # Store in vector database for memory
-    pinecone_upsert(user_id, persona, user_text)
-    pinecone_upsert(user_id, persona, bot_text)
+    # Firestore copy + vector memory go through the durable job queue,
+    # keeping their external round-trips off the response path
+    jobs = [
+        ('firestore.store_message', {'user_id': user_id, 'persona': persona, 'role': 'user', 'text': user_text,
+                                     'message_id': user_msg_id}),
+        # message_id lets a later memory reset tell these apart from messages it covers
+        ('memory.upsert', {'user_id': user_id, 'persona': persona, 'text': user_text, 'message_id': user_msg_id}),
+        ('memory.upsert', {'user_id': user_id, 'persona': persona, 'text': bot_text, 'message_id': bot_msg_id}),
+    ]
+    if history and history.get('needs_summary'):
+        jobs.append(('memory.summarize', {'user_id': user_id, 'persona': persona, 'persona_id': persona_id}))
+    enqueue_jobs(jobs)
 
     # Emit real-time AI response if chat_id provided
     if chat_id:
@@ -132,7 +235,6 @@ def api_chat():
     
     if use_voice:
         # User is in voice mode - generate voice and deduct minutes
-        from backend.services.voice_chat_service import VoiceChatService
         voice_response = VoiceChatService.generate_voice_response(
             text=bot_text,
             persona=persona,
@@ -140,8 +242,7 @@ def api_chat():
         )
     else:
         # Chat mode - skip voice generation entirely (no API costs)
-        from backend.services.voice_chat_service import VoiceChatService
-        status = VoiceChatService.get_user_voice_status(user_id)
+        status = voice_status if voice_status is not None else VoiceChatService.get_user_voice_status(user_id)
         voice_response['remaining_minutes'] = status.get('remaining_minutes', 0.0)
     
     # Include crisis flag in response for frontend handling
@@ -154,8 +255,8 @@ def api_chat():
     }
     
     # 💙 MOOD CONTEXT - Include mood awareness info for frontend
-    from backend.services.mood_service import MoodService
-    mood_context = MoodService.get_mood_context(user_id)
+    if mood_context is None:
+        mood_context = MoodService.get_mood_context(user_id)
     
     if mood_context['has_recent_mood']:
         response_data["mood_aware"] = True
@@ -163,7 +264,7 @@ def api_chat():
         response_data["days_since_checkin"] = mood_context['days_since_checkin']
     
     # Suggest mood check-in if needed
-    if MoodService.should_suggest_mood_checkin(user_id):
+    if MoodService.should_suggest_mood_checkin(user_id, mood_context=mood_context):
         response_data["suggest_mood_checkin"] = True
         response_data["mood_checkin_prompt"] = MoodService.get_mood_checkin_prompt(persona)
     
@@ -181,10 +282,172 @@ def api_chat():
         response_data["achievements"] = [achievement.to_dict() for achievement in all_new_achievements]
         response_data["crisis_resources_url"] = "/crisis/support"
 
-    return jsonify(response_data)
+    return response_data
+
+@api_bp.route('/chat', methods=['POST'])
+@login_required
+@admission_controlled('chat')
+def api_chat():
+    """
+    Handle chat messages with real-time support and crisis detection
+    
+    With "stream": true and a chat_id, reply tokens are pushed to the
+    chat_{chat_id} Socket.IO room (ai_token events) as they are generated;
+    the JSON response is unchanged. Per-stage timings are returned in the
+    Server-Timing header.
+    
+    Requests carrying a client_message_id are idempotent: a duplicate waits
+    for the original to finish, or replays its response if it already has.
+    """
+    data = request.get_json(force=True)
+    user_text, persona, mode, chat_id, use_voice = _parse_chat_request(data)
+    
+    if not user_text:
+        return jsonify({"error": "Empty message"}), 400
+
+    user_id = get_user_id()
+    
+    idempotency_key, state, replay = _claim_idempotency_key(data, user_id)
+    if state == REPLAY:
+        response = jsonify(replay)
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response
+    if state != NEW:
+        return _duplicate_in_progress()
+    
+    try:
+        response_data, stages = _run_chat_turn(data, user_text, persona, mode, chat_id, use_voice, user_id)
+    except Exception:
+        if idempotency_key:
+            get_idempotency_store().abandon(idempotency_key)
+        raise
+    
+    if idempotency_key:
+        get_idempotency_store().complete(idempotency_key, response_data)
+    
+    response = jsonify(response_data)
+    response.headers['Server-Timing'] = stages.server_timing()
+    return response
+
+def _run_chat_turn(data, user_text, persona, mode, chat_id, use_voice, user_id):
+    """
+    Run one /api/chat turn end to end
+    
+    Returns:
+        tuple: (response payload dict, StageExecutor with the stage timings)
+    """
+    stages, prechat = _run_prechat_stages(user_id, user_text, persona, use_voice)
+    persona_id = prechat['persona']
+    is_crisis, severity, crisis_prefix, block_ai = _check_crisis(user_id, user_text, prechat['crisis'])
+    ai_kwargs = dict(persona_id=persona_id, chunks=prechat['memory'], mood_context=prechat['mood'],
+                     history=prechat['history'], use_cache=not is_crisis)
+    
+    with stages.timed('llm'):
+        if data.get('stream') and chat_id:
+            bot_text = ''.join(_stream_reply_tokens(
+                user_text, persona, mode, user_id, chat_id, crisis_prefix, block_ai, ai_kwargs
+            ))
+        elif block_ai:
+            bot_text = crisis_prefix
+        else:
+            # Normal AI response flow (now with persona_id for memory isolation)
+            bot_text = crisis_prefix + get_ai_response(user_text, persona, mode, user_id, **ai_kwargs)
+    
+    with stages.timed('finalize'):
+        response_data = _finalize_chat_turn(
+            user_id, user_text, bot_text, persona, persona_id, chat_id, use_voice, is_crisis, severity,
+            mood_context=prechat['mood'], voice_status=prechat.get('voice_status'),
+            history=prechat['history']
+        )
+    
+    stages.log_timings('api_chat')
+    return response_data, stages
+
+@api_bp.route('/chat/stream', methods=['POST'])
+@login_required
+@admission_controlled('chat')
+def api_chat_stream():
+    """
+    Stream a chat reply as Server-Sent Events (for clients without websockets)
+    
+    Accepts the same JSON body as /api/chat. Emits "token" events with text
+    deltas, then one "done" event carrying the usual /api/chat payload.
+    A replayed client_message_id sends the stored reply as a single token.
+    """
+    data = request.get_json(force=True)
+    user_text, persona, mode, chat_id, use_voice = _parse_chat_request(data)
+    
+    if not user_text:
+        return jsonify({"error": "Empty message"}), 400
+
+    user_id = get_user_id()
+    
+    idempotency_key, state, replay = _claim_idempotency_key(data, user_id)
+    if state == REPLAY:
+        return Response(
+            _sse('token', {'text': replay['text']}) + _sse('done', replay),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'Idempotent-Replayed': 'true'}
+        )
+    if state != NEW:
+        return _duplicate_in_progress()
+    
+    try:
+        return _stream_chat_turn(data, user_text, persona, mode, chat_id, use_voice, user_id, idempotency_key)
+    except Exception:
+        if idempotency_key:
+            get_idempotency_store().abandon(idempotency_key)
+        raise
+
+def _stream_chat_turn(data, user_text, persona, mode, chat_id, use_voice, user_id, idempotency_key):
+    """Run the pre-chat stages and return the SSE response that streams the rest of the turn"""
+    stages, prechat = _run_prechat_stages(user_id, user_text, persona, use_voice)
+    persona_id = prechat['persona']
+    is_crisis, severity, crisis_prefix, block_ai = _check_crisis(user_id, user_text, prechat['crisis'])
+    ai_kwargs = dict(persona_id=persona_id, chunks=prechat['memory'], mood_context=prechat['mood'],
+                     history=prechat['history'], use_cache=not is_crisis)
+    
+    # Headers go out before the body, so only the pre-LLM stages are reported there
+    server_timing = stages.server_timing()
+    
+    def generate():
+        parts = []
+        try:
+            with stages.timed('llm'):
+                for token in _stream_reply_tokens(user_text, persona, mode, user_id, chat_id, crisis_prefix, block_ai, ai_kwargs):
+                    parts.append(token)
+                    yield _sse('token', {'text': token})
+            
+            with stages.timed('finalize'):
+                response_data = _finalize_chat_turn(
+                    user_id, user_text, ''.join(parts), persona, persona_id, chat_id, use_voice, is_crisis, severity,
+                    mood_context=prechat['mood'], voice_status=prechat.get('voice_status'),
+                    history=prechat['history']
+                )
+        except BaseException:
+            # Includes GeneratorExit when the client disconnects mid-stream, so its retry runs the turn again
+            if idempotency_key:
+                get_idempotency_store().abandon(idempotency_key)
+            raise
+        
+        if idempotency_key:
+            get_idempotency_store().complete(idempotency_key, response_data)
+        stages.log_timings('api_chat_stream')
+        yield _sse('done', response_data)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',  # Stop reverse proxies from buffering the stream
+            'Server-Timing': server_timing
+        }
+    )
 
 @api_bp.route('/tts', methods=['POST'])
 @login_required
+@admission_controlled('tts')
 def api_tts():
     """Generate text-to-speech audio"""
     data = request.get_json(force=True)
@@ -357,6 +620,7 @@ def toggle_voice_mode():
 
 @api_bp.route('/chat/voice/tts', methods=['POST'])
 @login_required
+@admission_controlled('tts')
 def generate_voice_tts():
     """
     Generate TTS audio for AI response
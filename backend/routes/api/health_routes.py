@@ -4,6 +4,15 @@ These endpoints allow uptime checks from load balancers and simple diagnostics.
 """
 
 from flask import Blueprint, jsonify
+from backend.services.http_client import get_http_client_stats
+from backend.services.chat.prompt_builder import get_prompt_cache_stats
+from backend.services.chat.idempotency import get_idempotency_stats
+from backend.services.chat.embedding_cache import get_embedding_cache_stats
+from backend.services.chat.retrieval_cache import get_retrieval_cache_stats
+from backend.services.llm import get_llm_stats
+from backend.services.admission import get_admission_stats
+from backend.services.vector_store import get_vector_store_stats
+from backend.services.chat.memory_retriever import get_memory_retrieval_stats
 
 health_bp = Blueprint('health_api', __name__, url_prefix='/health')
 
@@ -21,5 +30,14 @@ def readyz():
     checks = {
         "database": "unknown",  # TODO: implement quick SELECT 1
         "socketio": "unknown",
+        "http_clients": get_http_client_stats(),
+        "prompt_cache": get_prompt_cache_stats(),
+        "embedding_cache": get_embedding_cache_stats(),
+        "retrieval_cache": get_retrieval_cache_stats(),
+        "vector_store": get_vector_store_stats(),
+        "memory_retrieval": get_memory_retrieval_stats(),
+        "llm": get_llm_stats(),
+        "idempotency": get_idempotency_stats(),
+        "admission": get_admission_stats(),
     }
     return jsonify({"status": "ready", "checks": checks}), 200
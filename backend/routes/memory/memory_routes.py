@@ -3,10 +3,14 @@ Memory routes for MyBella
 View conversation history, search messages, and manage preferences
 """
 
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, render_template, request, jsonify, url_for, send_file
 from flask_login import login_required, current_user
 from backend.services.memory_service import MemoryService
+from backend.services.data_export import (
+    FORMATS, COMPRESSIONS, export_response, request_export, get_export
+)
 from backend.database.models.memory_models import ChatMessage
+from backend.database.utils.pagination import keyset_page
 from datetime import datetime, timedelta
 
 memory_bp = Blueprint('memory', __name__, url_prefix='/memory')
@@ -114,6 +118,27 @@ def api_context():
     })
 
 
+@memory_bp.route('/api/search')
+@login_required
+def api_search():
+    """Search conversation history (ranked, highlighted, paginated by next_cursor)"""
+    query = request.args.get('q', '')
+    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    
+    try:
+        results = MemoryService.search_conversations_page(
+            current_user.id,
+            query,
+            cursor=request.args.get('cursor') or None,
+            per_page=per_page,
+            persona=request.args.get('persona') or None
+        )
+    except ValueError as e:
+        return jsonify({'ok': False, 'error': str(e)}), 400
+    
+    return jsonify({'ok': True, 'query': query, **results})
+
+
 @memory_bp.route('/api/save-message', methods=['POST'])
 @login_required
 def api_save_message():
@@ -172,51 +197,42 @@ def api_stats():
 @memory_bp.route('/export')
 @login_required
 def export():
-    """Export conversation history as JSON"""
-    # Get all messages
-    messages = ChatMessage.query.filter_by(
-        user_id=current_user.id
-    ).order_by(ChatMessage.timestamp).all()
-    
-    # Get all preferences
-    preferences = MemoryService.get_user_preferences(current_user.id)
+    """Export conversation history as JSON (streamed)"""
+    fmt = request.args.get('format', 'json')
+    if fmt not in FORMATS:
+        return jsonify({'success': False, 'error': f'Unsupported format: {fmt}'}), 400
     
-    export_data = {
-        'user_id': current_user.id,
-        'export_date': datetime.utcnow().isoformat(),
-        'total_messages': len(messages),
-        'messages': [msg.to_dict() for msg in messages],
-        'preferences': preferences,
-        'stats': MemoryService.get_conversation_stats(current_user.id)
-    }
-    
-    return jsonify(export_data)
+    return export_response('memories', current_user.id, fmt)
 
 
 @memory_bp.route('/api/memories', methods=['GET'])
 @login_required
 def get_memories():
-    """Get all AI memories (conversation history + preferences) for display"""
+    """
+    Get AI memories (conversation history + preferences) for display
+    
+    Messages are returned newest first, 100 per page; pass next_cursor back
+    as ?cursor= for older ones. Preferences and stats come with the first page.
+    """
     try:
-        # Get recent messages (last 100)
-        messages = ChatMessage.query.filter_by(
-            user_id=current_user.id
-        ).order_by(ChatMessage.timestamp.desc()).limit(100).all()
+        cursor = request.args.get('cursor')
+        limit = min(request.args.get('limit', 100, type=int), 500)
         
-        # Get preferences
-        preferences = MemoryService.get_user_preferences(current_user.id)
+        query = ChatMessage.query.filter_by(user_id=current_user.id)
+        try:
+            messages, next_cursor = keyset_page(query, ChatMessage.timestamp, ChatMessage.id, cursor, limit)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        # Get stats
-        stats = MemoryService.get_conversation_stats(current_user.id)
+        memories = {
+            'messages': [msg.to_dict() for msg in messages],
+            'next_cursor': next_cursor
+        }
+        if not cursor:
+            memories['preferences'] = MemoryService.get_user_preferences(current_user.id)
+            memories['stats'] = MemoryService.get_conversation_stats(current_user.id)
         
-        return jsonify({
-            'success': True,
-            'memories': {
-                'messages': [msg.to_dict() for msg in messages],
-                'preferences': preferences,
-                'stats': stats
-            }
-        })
+        return jsonify({'success': True, 'memories': memories})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -224,89 +240,121 @@ def get_memories():
 @memory_bp.route('/api/memories/export', methods=['GET'])
 @login_required
 def export_memories_json():
-    """Export all memories as downloadable JSON file"""
+    """
+    Export all memories as a downloadable file
+    
+    Query params:
+        format: 'json' (default) or 'ndjson'
+        background: '1' to build a compressed file in the background instead
+            (returns 202; poll status_url, then fetch download_url)
+        compression: 'gzip' (default) or 'zip' for background exports
+    """
     try:
-        # Get ALL messages (no limit for export)
-        messages = ChatMessage.query.filter_by(
-            user_id=current_user.id
-        ).order_by(ChatMessage.timestamp).all()
-        
-        preferences = MemoryService.get_user_preferences(current_user.id)
-        stats = MemoryService.get_conversation_stats(current_user.id)
-        
-        export_data = {
-            'user': {
-                'id': current_user.id,
-                'name': current_user.name,
-                'email': current_user.email
-            },
-            'export_date': datetime.utcnow().isoformat(),
-            'total_messages': len(messages),
-            'messages': [msg.to_dict() for msg in messages],
-            'preferences': preferences,
-            'stats': stats
-        }
-        
-        from flask import Response
-        import json
+        fmt = request.args.get('format', 'json')
+        compression = request.args.get('compression', 'gzip')
+        if fmt not in FORMATS or compression not in COMPRESSIONS:
+            return jsonify({'success': False, 'error': 'Unsupported export format'}), 400
         
-        response = Response(
-            json.dumps(export_data, indent=2),
-            mimetype='application/json',
-            headers={
-                'Content-Disposition': f'attachment; filename=mybella_memories_{current_user.id}_{datetime.utcnow().strftime("%Y%m%d")}.json'
-            }
-        )
+        if request.args.get('background') == '1':
+            export = request_export(current_user.id, 'memories', fmt, compression)
+            
+            return jsonify({
+                'success': True,
+                'export_id': export.id,
+                'status_url': url_for('memory.export_status', export_id=export.id),
+                'download_url': url_for('memory.export_download', export_id=export.id)
+            }), 202
         
-        return response
+        return export_response('memories', current_user.id, fmt)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@memory_bp.route('/api/exports/<int:export_id>')
+@login_required
+def export_status(export_id):
+    """Progress of a background export"""
+    export = get_export(export_id, current_user.id)
+    if export is None:
+        return jsonify({'success': False, 'error': 'Export not found'}), 404
+    
+    return jsonify({'success': True, 'export': export.to_dict()})
+
+
+@memory_bp.route('/api/exports/<int:export_id>/download')
+@login_required
+def export_download(export_id):
+    """Download a finished background export"""
+    export = get_export(export_id, current_user.id)
+    if export is None or export.status != 'done':
+        return jsonify({'success': False, 'error': 'Export not ready'}), 404
+    
+    return send_file(export.path, as_attachment=True, download_name=export.download_name)
+
+
 @memory_bp.route('/api/memories/delete', methods=['POST'])
 @login_required
 def delete_memories():
-    """Delete selected memories or all memories"""
+    """
+    Delete selected memories or all memories
+    
+    Returns 202 straight away: the messages, their vectors and Firestore
+    copies are deleted in the background (poll status_url for progress) and
+    are hidden from memory retrieval in the meantime.
+    """
     try:
         data = request.get_json()
         delete_all = data.get('delete_all', False)
         message_ids = data.get('message_ids', [])
         
         from backend.database.models.models import db
-        from backend.database.models.memory_models import UserPreference
+        from backend.services.chat.memory_deletion import request_deletion
         
         if delete_all:
             # Delete ALL messages and preferences
-            ChatMessage.query.filter_by(user_id=current_user.id).delete()
-            UserPreference.query.filter_by(user_id=current_user.id).delete()
-            db.session.commit()
+            deletion = request_deletion(current_user.id)
             
             return jsonify({
                 'success': True,
-                'message': 'All memories deleted successfully'
-            })
+                'message': 'All memories are being deleted',
+                'deletion_id': deletion.id,
+                'status_url': url_for('memory.deletion_status', deletion_id=deletion.id)
+            }), 202
         
         elif message_ids:
             # Delete specific messages
-            ChatMessage.query.filter(
-                ChatMessage.id.in_(message_ids),
-                ChatMessage.user_id == current_user.id
-            ).delete(synchronize_session=False)
-            db.session.commit()
+            deletion = request_deletion(current_user.id, message_ids=message_ids)
             
             return jsonify({
                 'success': True,
-                'message': f'Deleted {len(message_ids)} memories'
-            })
+                'message': f'Deleting {len(message_ids)} memories',
+                'deletion_id': deletion.id,
+                'status_url': url_for('memory.deletion_status', deletion_id=deletion.id)
+            }), 202
         
         else:
             return jsonify({
                 'success': False,
                 'error': 'No deletion criteria provided'
             }), 400
-            
+    
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+
+@memory_bp.route('/api/memories/delete/<int:deletion_id>')
+@login_required
+def deletion_status(deletion_id):
+    """Progress of a background memory deletion"""
+    from backend.services.chat.memory_deletion import get_deletion
+    
+    deletion = get_deletion(deletion_id, current_user.id)
+    if deletion is None:
+        return jsonify({'success': False, 'error': 'Deletion not found'}), 404
+    
+    return jsonify({'success': True, 'deletion': deletion.to_dict()})
@@ -124,6 +124,7 @@ def user_detail(user_id):
 def messages():
     """Admin message monitoring"""
     page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     per_page = 50
     
     user_filter = request.args.get('user_id', type=int)
@@ -134,7 +135,8 @@ def messages():
             page=page,
             per_page=per_page,
             user_id=user_filter,
-            persona_filter=persona_filter
+            persona_filter=persona_filter,
+            cursor=cursor
         )
         
         return render_template('admin/messages.html', 
@@ -16,8 +16,7 @@ from flask import (
 from flask_login import login_required, current_user
 from backend.database.models.models import db, UserSettings
 from backend.database.utils.utils import get_persona, get_mode
-from backend.services.firebase.firebase_service import delete_persona_chats
-from backend.services.chat.pinecone_service import pinecone_delete_persona
+from backend.services.chat.memory_deletion import request_deletion
 from backend.funcs.users import (
     UserCRUDError,
     get_user_settings,
@@ -124,14 +123,10 @@ def api_persona_select():
 @login_required
 def api_memory_reset():
     """Reset memory for a specific persona"""
-    user_id = str(current_user.id)
     persona = (request.form.get('persona') or get_persona()).capitalize()
     
-    # Delete from Pinecone
-    pinecone_delete_persona(user_id, persona)
-    
-    # Delete from Firestore
-    delete_persona_chats(user_id, persona)
+    # Chat history, vectors and Firestore copies are deleted in the background
+    request_deletion(current_user.id, persona=persona)
     
     flash(f"Reset memory for {persona}.", "info")
     return redirect(url_for('main.settings'))
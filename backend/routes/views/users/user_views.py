@@ -5,7 +5,7 @@ Handles user dashboard, profile, and user settings
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
-from backend.database.models.models import db, User, UserSettings, Message, Chat
+from backend.database.models.models import User, UserSettings, Chat
 from backend.database.utils.utils import get_persona, get_mode
 from backend.funcs.users import (
     UserCRUDError,
@@ -13,12 +13,14 @@ from backend.funcs.users import (
     change_user_password,
     get_user_statistics,
     get_user_messages,
-    search_user_messages,
+    search_user_messages_paginated,
+    get_user_messages_page,
     update_user_settings,
     delete_user_account,
     get_user_profile_picture_url
 )
 from sqlalchemy import func
+from backend.services.activity_rollups import breakdown_counts
 
 user_views_bp = Blueprint('user_views', __name__)
 
@@ -190,50 +192,44 @@ def change_password():
 def chat_history():
     """User's chat history"""
     page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     per_page = 20
     persona_filter = request.args.get('persona', '')
     search_term = request.args.get('search', '')
     
     try:
+        # Keyset pagination: follow next_cursor instead of page numbers
         if search_term:
             # Use search function for filtering by content
-            messages = search_user_messages(
+            messages_page = search_user_messages_paginated(
                 user_id=current_user.id,
                 search_term=search_term,
-                limit=per_page
+                cursor=cursor,
+                per_page=per_page,
+                persona_filter=persona_filter if persona_filter else None
             )
-            total_count = len(messages)
-            has_prev = False
-            has_next = False
         else:
-            # Use regular get messages function with pagination
-            offset = (page - 1) * per_page
-            messages = get_user_messages(
+            messages_page = get_user_messages_page(
                 user_id=current_user.id,
-                limit=per_page,
-                offset=offset,
+                cursor=cursor,
+                per_page=per_page,
                 persona_filter=persona_filter if persona_filter else None
             )
-            
-            # Get total count for pagination (simplified)
-            total_messages = Message.query.filter_by(user_id=current_user.id)
-            if persona_filter:
-                total_messages = total_messages.filter_by(persona=persona_filter)
-            total_count = total_messages.count()
-            
-            has_prev = page > 1
-            has_next = (page * per_page) < total_count
+        messages = messages_page['messages']
+        next_cursor = messages_page['next_cursor']
+        total_count = messages_page['total']
+        
+        has_prev = bool(cursor)
+        has_next = messages_page['has_next']
         
         # Get user's personas for filter
-        user_personas = db.session.query(Message.persona).filter_by(
-            user_id=current_user.id
-        ).distinct().all()
-        personas = [p[0] for p in user_personas if p[0]]
+        personas = list(breakdown_counts('messages.persona', current_user.id))
         
         pagination = {
             'page': page,
             'has_prev': has_prev,
             'has_next': has_next,
+            'next_cursor': next_cursor,
             'total': total_count
         }
         
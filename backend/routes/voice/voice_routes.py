@@ -7,6 +7,7 @@ from flask import Blueprint, render_template, jsonify, request
 from flask_login import login_required, current_user
 from backend.database.models.models import db, PersonaProfile
 from backend.database.utils.utils import get_user_id, get_persona_voice_id
+from backend.services.admission import admission_controlled
 
 voice_bp = Blueprint('voice', __name__, url_prefix='/voice')
 
@@ -62,6 +63,7 @@ def manage():
 
 @voice_bp.route('/test', methods=['POST'])
 @login_required
+@admission_controlled('tts')
 def test_voice():
     """Test a voice with sample text"""
     data = request.get_json()
@@ -4,12 +4,9 @@ Handles streak tracking, achievement unlocking, and leaderboard management
 """
 
 from backend.database.models.models import db
-from backend.database.models.wellness_models import MoodEntry
-from backend.database.models.exercise_models import ExerciseCompletion
-from backend.database.models.memory_models import ChatMessage
 from backend.database.models.achievement_models import Achievement, UserAchievement, Streak, LeaderboardEntry
+from backend.services.activity_rollups import lifetime_totals, count_of, active_days
 from datetime import datetime, timedelta
-from sqlalchemy import func, distinct
 from collections import defaultdict
 
 
@@ -97,7 +94,7 @@ class AchievementsService:
         Returns list of newly unlocked achievements
         """
         # Count total mood entries
-        total_moods = MoodEntry.query.filter_by(user_id=user_id).count()
+        total_moods = count_of(lifetime_totals(user_id, 'mood_entries'), 'mood_entries')
         
         # Get mood achievements
         mood_achievements = Achievement.query.filter_by(
@@ -143,7 +140,7 @@ class AchievementsService:
         Returns list of newly unlocked achievements
         """
         # Count total exercises
-        total_exercises = ExerciseCompletion.query.filter_by(user_id=user_id).count()
+        total_exercises = count_of(lifetime_totals(user_id, 'exercise_completions'), 'exercise_completions')
         
         # Get exercise achievements
         exercise_achievements = Achievement.query.filter_by(
@@ -189,12 +186,7 @@ class AchievementsService:
         Returns list of newly unlocked achievements
         """
         # Count distinct conversations (by date)
-        conversations = db.session.query(
-            func.date(ChatMessage.timestamp)
-        ).filter(
-            ChatMessage.user_id == user_id,
-            ChatMessage.role == 'user'
-        ).distinct().count()
+        conversations = active_days(user_id, 'chat_messages.user')
         
         # Get conversation achievements
         conversation_achievements = Achievement.query.filter_by(
@@ -290,18 +282,13 @@ class AchievementsService:
             return streak.current_streak if streak else 0
         
         elif achievement.condition_type == 'total_moods':
-            return MoodEntry.query.filter_by(user_id=user_id).count()
+            return count_of(lifetime_totals(user_id, 'mood_entries'), 'mood_entries')
         
         elif achievement.condition_type == 'total_exercises':
-            return ExerciseCompletion.query.filter_by(user_id=user_id).count()
+            return count_of(lifetime_totals(user_id, 'exercise_completions'), 'exercise_completions')
         
         elif achievement.condition_type == 'total_conversations':
-            return db.session.query(
-                func.date(ChatMessage.timestamp)
-            ).filter(
-                ChatMessage.user_id == user_id,
-                ChatMessage.role == 'user'
-            ).distinct().count()
+            return active_days(user_id, 'chat_messages.user')
         
         elif achievement.condition_type == 'total_points':
             entry = LeaderboardEntry.query.filter_by(user_id=user_id).first()
@@ -332,15 +319,10 @@ class AchievementsService:
         leaderboard_entry = LeaderboardEntry.query.filter_by(user_id=user_id).first()
         total_points = leaderboard_entry.total_points if leaderboard_entry else 0
         
-        # Count activities
-        total_moods = MoodEntry.query.filter_by(user_id=user_id).count()
-        total_exercises = ExerciseCompletion.query.filter_by(user_id=user_id).count()
-        total_conversations = db.session.query(
-            func.date(ChatMessage.timestamp)
-        ).filter(
-            ChatMessage.user_id == user_id,
-            ChatMessage.role == 'user'
-        ).distinct().count()
+        # Count activities from the activity rollups
+        total_moods = count_of(lifetime_totals(user_id, 'mood_entries'), 'mood_entries')
+        total_exercises = count_of(lifetime_totals(user_id, 'exercise_completions'), 'exercise_completions')
+        total_conversations = active_days(user_id, 'chat_messages.user')
         
         return {
             'streak': streak.to_dict(),
@@ -0,0 +1,347 @@
+"""
+Activity rollups for MyBella
+Dashboard stats (message counts, persona breakdowns, mood and exercise
+activity) are read from per-user counters instead of COUNT / GROUP BY over
+the raw chat_messages, messages, mood_entries and exercise_completions
+tables, so a dashboard costs the same for a new user and for years of history.
+
+Two tables hold the counters: daily_activity (user x UTC day x metric) for
+windowed charts and activity_totals (user x metric) for lifetime numbers.
+A session after_flush hook adds every inserted, edited or deleted row of a
+tracked table to both, in the same transaction as the write. Bulk deletes
+(query.delete()) bypass the session, so callers subtract those rows with
+subtract_rows first. scripts/utils/rebuild_activity_rollups.py recomputes
+the counters from the raw tables.
+"""
+
+from collections import defaultdict, namedtuple
+from datetime import date, datetime
+
+from sqlalchemy import event, func, inspect, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from backend.database.models.models import db, Message
+from backend.database.models.memory_models import ChatMessage
+from backend.database.models.wellness_models import MoodEntry
+from backend.database.models.exercise_models import ExerciseCompletion
+from backend.database.models.activity_models import DailyActivity, ActivityTotal
+
+Totals = namedtuple('Totals', 'count total')
+
+
+def _message_metrics(name):
+    def metrics(values):
+        pairs = [(name, 0)]
+        if values['role'] == 'user':
+            pairs.append((f'{name}.user', 0))
+        if values['persona']:
+            pairs.append((f"{name}.persona:{values['persona']}", 0))
+        return pairs
+    return metrics
+
+
+def mood_value(mood):
+    """Numeric 1-10 level of a MoodScale (or plain int) mood"""
+    if mood is None:
+        return 0
+    return mood.value if hasattr(mood, 'value') else int(mood)
+
+
+class RollupSource:
+    """A tracked table: which column gives the day, and the (metric, amount) pairs each row adds"""
+
+    def __init__(self, name, model, day_column, columns, metrics):
+        self.name = name
+        self.model = model
+        self.day_column = day_column
+        self.columns = columns  # Besides user_id and the day column, what the metrics depend on
+        self.metrics = metrics
+
+
+SOURCES = {
+    source.model: source for source in (
+        RollupSource('chat_messages', ChatMessage, 'timestamp', ('role', 'persona'),
+                     _message_metrics('chat_messages')),
+        RollupSource('messages', Message, 'timestamp', ('role', 'persona'), _message_metrics('messages')),
+        RollupSource('mood_entries', MoodEntry, 'entry_date', ('overall_mood',),
+                     lambda v: [('mood_entries', mood_value(v['overall_mood']))]),
+        RollupSource('exercise_completions', ExerciseCompletion, 'completed_at', ('exercise_type', 'duration_minutes'),
+                     lambda v: [('exercise_completions', v['duration_minutes'] or 0),
+                                (f"exercise_completions.type:{v['exercise_type']}", 0)]),
+    )
+}
+
+
+def init_activity_rollups(app):
+    """
+    Start maintaining rollups on every flush
+
+    Rows written before the rollups existed aren't counted until
+    scripts/utils/rebuild_activity_rollups.py is run.
+    """
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+
+
+# ----- Maintenance -----
+
+def _to_day(value):
+    if value is None:
+        return datetime.utcnow().date()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])  # SQLite date() returns text
+
+
+def _add(deltas, source, values, times):
+    """Add a row's metrics to deltas, `times` times (negative to take rows out)"""
+    if values['user_id'] is None:
+        return
+    day = _to_day(values[source.day_column])
+    for metric, amount in source.metrics(values):
+        delta = deltas[(values['user_id'], day, metric)]
+        delta[0] += times
+        delta[1] += times * amount
+
+
+def _previous(obj, attr):
+    """Value of an attribute before this flush"""
+    history = attr.history
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else getattr(obj, attr.key)
+
+
+def _after_flush(session, flush_context):
+    deltas = defaultdict(lambda: [0, 0.0])
+
+    for objects, times in ((session.new, 1), (session.deleted, -1)):
+        for obj in objects:
+            source = SOURCES.get(type(obj))
+            if source is not None:
+                _add(deltas, source, _values(source, obj), times)
+
+    for obj in session.dirty:
+        source = SOURCES.get(type(obj))
+        if source is None:
+            continue
+        attrs = inspect(obj).attrs
+        names = ('user_id', source.day_column) + source.columns
+        if any(attrs[name].history.has_changes() for name in names):
+            _add(deltas, source, {name: _previous(obj, attrs[name]) for name in names}, -1)
+            _add(deltas, source, _values(source, obj), 1)
+
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+def _values(source, obj):
+    return {name: getattr(obj, name) for name in ('user_id', source.day_column) + source.columns}
+
+
+def apply_deltas(connection, deltas):
+    """
+    Upsert counter changes into both rollup tables
+
+    Args:
+        deltas: dict (user_id, day, metric) -> [count, total]
+    """
+    daily, totals = [], defaultdict(lambda: [0, 0.0])
+    for (user_id, day, metric), (count, total) in deltas.items():
+        if count or total:
+            daily.append({'user_id': user_id, 'day': day, 'metric': metric, 'count': count, 'total': total})
+            totals[(user_id, metric)][0] += count
+            totals[(user_id, metric)][1] += total
+
+    if daily:
+        _upsert(connection, DailyActivity.__table__, ('user_id', 'day', 'metric'), daily)
+        _upsert(connection, ActivityTotal.__table__, ('user_id', 'metric'), [
+            {'user_id': user_id, 'metric': metric, 'count': count, 'total': total}
+            for (user_id, metric), (count, total) in totals.items()
+        ])
+
+
+def _upsert(connection, table, keys, rows):
+    """Add each row's count/total to the existing row with the same keys, or insert it"""
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(index_elements=list(keys), set_={
+            'count': table.c['count'] + statement.excluded['count'],
+            'total': table.c.total + statement.excluded.total,
+        })
+        connection.execute(statement, rows)
+        return
+
+    for row in rows:
+        result = connection.execute(
+            update(table).where(*(table.c[key] == row[key] for key in keys)).values(
+                count=table.c['count'] + row['count'],
+                total=table.c.total + row['total']
+            )
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(**row))
+
+
+def _grouped_deltas(source, criteria, deltas, sign=1):
+    """Add the rows matching criteria to deltas with one GROUP BY instead of loading them"""
+    model = source.model
+    day = func.date(getattr(model, source.day_column))
+    columns = [getattr(model, name) for name in source.columns]
+
+    rows = db.session.query(model.user_id, day, *columns, func.count(model.id)) \
+        .filter(*criteria).group_by(model.user_id, day, *columns).all()
+    for user_id, row_day, *values, count in rows:
+        values = dict(zip(source.columns, values), user_id=user_id)
+        values[source.day_column] = row_day
+        _add(deltas, source, values, sign * count)
+
+
+def subtract_rows(model, *criteria):
+    """Take rows about to be bulk-deleted out of the rollups (query.delete() skips the flush hook)"""
+    deltas = defaultdict(lambda: [0, 0.0])
+    _grouped_deltas(SOURCES[model], criteria, deltas, sign=-1)
+    apply_deltas(db.session.connection(), deltas)
+
+
+def clear_user_activity(user_id):
+    """Drop a deleted user's rollups"""
+    DailyActivity.query.filter_by(user_id=user_id).delete()
+    ActivityTotal.query.filter_by(user_id=user_id).delete()
+    db.session.commit()
+
+
+def rebuild_user_activity(user_id):
+    """Recompute one user's rollups from the raw tables, in one transaction"""
+    DailyActivity.query.filter_by(user_id=user_id).delete()
+    ActivityTotal.query.filter_by(user_id=user_id).delete()
+
+    deltas = defaultdict(lambda: [0, 0.0])
+    for source in SOURCES.values():
+        _grouped_deltas(source, [source.model.user_id == user_id], deltas)
+    apply_deltas(db.session.connection(), deltas)
+    db.session.commit()
+
+
+def rebuild_activity(user_id=None):
+    """
+    Recompute rollups from the raw tables, one user at a time
+
+    Returns:
+        int: Number of users rebuilt
+    """
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        user_ids = set()
+        for model in [s.model for s in SOURCES.values()] + [ActivityTotal]:
+            user_ids.update(row[0] for row in db.session.query(model.user_id).distinct())
+        user_ids.discard(None)
+
+    for uid in sorted(user_ids):
+        rebuild_user_activity(uid)
+    return len(user_ids)
+
+
+# ----- Reading -----
+
+def _family(column, prefix):
+    """A metric and its sub-metrics: 'chat_messages' matches 'chat_messages.user' too"""
+    return or_(column == prefix, column.startswith(f'{prefix}.', autoescape=True))
+
+
+def lifetime_totals(user_id, prefix):
+    """{metric: Totals} for a metric family over the user's whole history"""
+    rows = db.session.query(ActivityTotal.metric, ActivityTotal.count, ActivityTotal.total).filter(
+        ActivityTotal.user_id == user_id,
+        _family(ActivityTotal.metric, prefix)
+    ).all()
+    return {metric: Totals(count, total) for metric, count, total in rows}
+
+
+def daily_rows(user_id, prefix, since):
+    """(day, metric, count, total) rows of a metric family from `since` (a date) on, oldest first"""
+    return db.session.query(DailyActivity.day, DailyActivity.metric, DailyActivity.count, DailyActivity.total).filter(
+        DailyActivity.user_id == user_id,
+        DailyActivity.day >= since,
+        _family(DailyActivity.metric, prefix)
+    ).order_by(DailyActivity.day).all()
+
+
+def window_totals(rows):
+    """{metric: Totals} summed over daily_rows"""
+    sums = defaultdict(lambda: [0, 0.0])
+    for _, metric, count, total in rows:
+        sums[metric][0] += count
+        sums[metric][1] += total
+    return {metric: Totals(*values) for metric, values in sums.items()}
+
+
+def daily_counts(rows, metric):
+    """{ISO day: count} of one metric from daily_rows, days without activity left out"""
+    return {day.isoformat(): count for day, row_metric, count, _ in rows if row_metric == metric and count}
+
+
+def breakdown(totals, family):
+    """{name: count} of sub-metrics such as 'chat_messages.persona:<name>'"""
+    prefix = f'{family}:'
+    return {metric[len(prefix):]: t.count for metric, t in totals.items() if metric.startswith(prefix) and t.count}
+
+
+def count_of(totals, metric):
+    return totals[metric].count if metric in totals else 0
+
+
+def metric_count(metric, user_id=None):
+    """Lifetime count of one metric for a user, or summed over every user"""
+    query = db.session.query(func.coalesce(func.sum(ActivityTotal.count), 0)).filter(ActivityTotal.metric == metric)
+    if user_id is not None:
+        query = query.filter(ActivityTotal.user_id == user_id)
+    return query.scalar()
+
+
+def breakdown_counts(family, user_id=None, contains=None):
+    """
+    {name: count} of a family's sub-metrics (e.g. 'messages.persona') for a
+    user, or summed over every user
+
+    Args:
+        contains: Only names containing this text (SQL LIKE, so case-insensitive for ASCII)
+    """
+    prefix = f'{family}:'
+    name = func.substr(ActivityTotal.metric, len(prefix) + 1)
+    query = db.session.query(name, func.sum(ActivityTotal.count)).filter(
+        ActivityTotal.metric.startswith(prefix, autoescape=True)
+    )
+    if user_id is not None:
+        query = query.filter(ActivityTotal.user_id == user_id)
+    if contains:
+        query = query.filter(name.contains(contains, autoescape=True))
+    return {row_name: count for row_name, count in query.group_by(name).all() if count}
+
+
+def active_days(user_id, metric):
+    """Number of days with at least one `metric` event"""
+    return DailyActivity.query.filter(
+        DailyActivity.user_id == user_id,
+        DailyActivity.metric == metric,
+        DailyActivity.count > 0
+    ).count()
+
+
+def totals_for_users(user_ids, metrics):
+    """{user_id: {metric: count}} for a page of users, in one query"""
+    counts = defaultdict(dict)
+    if user_ids:
+        rows = db.session.query(ActivityTotal.user_id, ActivityTotal.metric, ActivityTotal.count).filter(
+            ActivityTotal.user_id.in_(user_ids),
+            ActivityTotal.metric.in_(metrics)
+        ).all()
+        for user_id, metric, count in rows:
+            counts[user_id][metric] = count
+    return counts
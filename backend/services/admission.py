@@ -0,0 +1,198 @@
+"""
+Admission control for MyBella
+Caps how many requests each LLM/TTS-bound endpoint group may run at once,
+so a slow upstream can't tie up every worker thread and stall the rest of
+the site (static pages, main_bp, user_views_bp).
+
+Each group has a concurrency limit and a bounded wait queue. A request that
+would have to queue longer than ADMISSION_MAX_WAIT (estimated from the live
+average service time, which tracks upstream latency) or that finds the
+queue full is rejected immediately with 503 and a Retry-After header.
+
+Usage:
+    from backend.services.admission import admission_controlled
+
+    @api_bp.route('/chat', methods=['POST'])
+    @login_required
+    @admission_controlled('chat')
+    def api_chat():
+        ...
+"""
+
+import math
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, jsonify, make_response
+
+# Per-group defaults; override with ADMISSION_<GROUP>_CONCURRENCY / _QUEUE env vars
+GROUP_DEFAULTS = {
+    'chat': {'max_concurrency': 16, 'max_queue': 32},
+    'tts': {'max_concurrency': 8, 'max_queue': 16},
+}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of queued"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """Concurrency limit + bounded FIFO-ish wait queue for one endpoint group"""
+
+    def __init__(self, name, max_concurrency, max_queue, max_wait=10.0, initial_latency=2.0, smoothing=0.2):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.smoothing = smoothing
+        self.avg_latency = initial_latency  # EWMA of request service time in seconds
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    def estimated_wait(self, position):
+        """Seconds until the request at this queue position would get a slot"""
+        return position * self.avg_latency / self.max_concurrency
+
+    def _reject(self, reason, wait):
+        self.rejected += 1
+        retry_after = max(1, math.ceil(wait))
+        raise AdmissionRejected(f"{self.name}: {reason}", retry_after)
+
+    def acquire(self):
+        """
+        Take a slot, queueing up to max_wait seconds
+
+        Raises:
+            AdmissionRejected: queue full, estimated wait too long, or no slot in time
+        """
+        with self._cond:
+            if self.active < self.max_concurrency and not self.waiting:
+                self.active += 1
+                self.admitted += 1
+                return
+
+            position = self.waiting + 1
+            if position > self.max_queue:
+                self._reject("queue full", self.estimated_wait(position))
+
+            estimate = self.estimated_wait(position)
+            if estimate > self.max_wait:
+                self._reject(f"estimated wait {estimate:.1f}s", estimate)
+
+            self.waiting += 1
+            deadline = time.monotonic() + self.max_wait
+            try:
+                while self.active >= self.max_concurrency:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._reject("timed out waiting for a slot", self.estimated_wait(self.waiting))
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+
+            self.active += 1
+            self.admitted += 1
+
+    def release(self, elapsed):
+        """Free a slot and fold the request's service time into the latency average"""
+        with self._cond:
+            self.active -= 1
+            self.avg_latency += self.smoothing * (elapsed - self.avg_latency)
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'active': self.active,
+                'waiting': self.waiting,
+                'max_concurrency': self.max_concurrency,
+                'max_queue': self.max_queue,
+                'avg_latency_seconds': round(self.avg_latency, 3),
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+            }
+
+
+# Global limiters, one per group (created on first use)
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name):
+    """Get (or create from config) the limiter for an endpoint group"""
+    limiter = _limiters.get(name)
+    if limiter is not None:
+        return limiter
+
+    config = current_app.config
+    defaults = GROUP_DEFAULTS.get(name, GROUP_DEFAULTS['chat'])
+    prefix = f"ADMISSION_{name.upper()}"
+
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = AdmissionLimiter(
+                name,
+                max_concurrency=config.get(f'{prefix}_CONCURRENCY') or defaults['max_concurrency'],
+                max_queue=config.get(f'{prefix}_QUEUE') or defaults['max_queue'],
+                max_wait=config.get('ADMISSION_MAX_WAIT', 10.0),
+            )
+    return _limiters[name]
+
+
+def _busy_response(error):
+    response = jsonify({
+        "error": "We're handling a lot of conversations right now. Please try again in a moment.",
+        "retry_after": error.retry_after
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def admission_controlled(group):
+    """
+    Decorator: run the view only when the group has capacity, else 503
+
+    Streamed responses (SSE, send_file) keep their slot until the response
+    is closed, since that's when the upstream work actually finishes.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('ADMISSION_ENABLED', True):
+                return view(*args, **kwargs)
+
+            limiter = get_limiter(group)
+            try:
+                limiter.acquire()
+            except AdmissionRejected as e:
+                current_app.logger.warning(f"Shedding request: {e}")
+                return _busy_response(e)
+
+            start = time.monotonic()
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                limiter.release(time.monotonic() - start)
+                raise
+
+            if response.is_streamed:
+                response.call_on_close(lambda: limiter.release(time.monotonic() - start))
+            else:
+                limiter.release(time.monotonic() - start)
+            return response
+        return wrapper
+    return decorator
+
+
+def get_admission_stats():
+    """Per-group limiter stats, for health/debug endpoints"""
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
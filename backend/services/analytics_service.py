@@ -3,12 +3,9 @@ Analytics Service for MyBella
 Aggregates data from mood tracking, exercises, conversations, and activities
 """
 
-from backend.database.models.models import db
 from backend.database.models.wellness_models import MoodEntry
-from backend.database.models.exercise_models import ExerciseCompletion
-from backend.database.models.memory_models import ChatMessage
+from backend.services.activity_rollups import daily_rows, window_totals, daily_counts, breakdown, count_of
 from datetime import datetime, timedelta
-from sqlalchemy import func, case
 from collections import defaultdict
 
 
@@ -27,19 +24,11 @@ class AnalyticsService:
         Returns:
             Dict with mood data for charts
         """
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        cutoff_date = (datetime.utcnow() - timedelta(days=days)).date()
         
-        # Get all mood entries in time period
-        mood_entries = MoodEntry.query.filter(
-            MoodEntry.user_id == user_id,
-            MoodEntry.timestamp >= cutoff_date
-        ).order_by(MoodEntry.timestamp).all()
-        
-        # Organize by date
-        daily_moods = defaultdict(list)
-        for entry in mood_entries:
-            date_key = entry.timestamp.date().isoformat()
-            daily_moods[date_key].append(entry.mood_level)
+        # Daily mood totals from the activity rollups
+        rows = [row for row in daily_rows(user_id, 'mood_entries', cutoff_date) if row.count]
+        daily_moods = {row.day.isoformat(): row.total / row.count for row in rows}
         
         # Calculate daily averages
         dates = []
@@ -54,8 +43,7 @@ class AnalyticsService:
             dates.append(date_str)
             
             if date_str in daily_moods:
-                avg_mood = sum(daily_moods[date_str]) / len(daily_moods[date_str])
-                mood_values.append(round(avg_mood, 1))
+                mood_values.append(round(daily_moods[date_str], 1))
             else:
                 mood_values.append(None)  # No data for this day
             
@@ -64,7 +52,7 @@ class AnalyticsService:
         return {
             'labels': dates,
             'values': mood_values,
-            'total_entries': len(mood_entries)
+            'total_entries': sum(row.count for row in rows)
         }
     
     @staticmethod
@@ -116,33 +104,12 @@ class AnalyticsService:
         Returns:
             Dict with exercise stats
         """
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        cutoff_date = (datetime.utcnow() - timedelta(days=days)).date()
         
-        # Get all completions
-        completions = ExerciseCompletion.query.filter(
-            ExerciseCompletion.user_id == user_id,
-            ExerciseCompletion.completed_at >= cutoff_date
-        ).all()
-        
-        # Count by type
-        type_counts = defaultdict(int)
-        total_minutes = 0
-        
-        for completion in completions:
-            type_counts[completion.exercise_type] += 1
-            if completion.duration_minutes:
-                total_minutes += completion.duration_minutes
-        
-        # Get daily activity
-        daily_activity = db.session.query(
-            func.date(ExerciseCompletion.completed_at).label('date'),
-            func.count(ExerciseCompletion.id).label('count')
-        ).filter(
-            ExerciseCompletion.user_id == user_id,
-            ExerciseCompletion.completed_at >= cutoff_date
-        ).group_by(
-            func.date(ExerciseCompletion.completed_at)
-        ).all()
+        # Completions, minutes and types per day from the activity rollups
+        rows = daily_rows(user_id, 'exercise_completions', cutoff_date)
+        totals = window_totals(rows)
+        completions = totals.get('exercise_completions')
         
         # Fill in all dates
         dates = []
@@ -151,7 +118,7 @@ class AnalyticsService:
         current_date = (datetime.utcnow() - timedelta(days=days)).date()
         end_date = datetime.utcnow().date()
         
-        activity_dict = {str(d): c for d, c in daily_activity}
+        activity_dict = daily_counts(rows, 'exercise_completions')
         
         while current_date <= end_date:
             date_str = str(current_date)
@@ -160,9 +127,9 @@ class AnalyticsService:
             current_date += timedelta(days=1)
         
         return {
-            'total_completions': len(completions),
-            'total_minutes': total_minutes,
-            'by_type': dict(type_counts),
+            'total_completions': completions.count if completions else 0,
+            'total_minutes': int(completions.total) if completions else 0,
+            'by_type': breakdown(totals, 'exercise_completions.type'),
             'daily_activity': {
                 'labels': dates,
                 'values': activity_counts
@@ -181,38 +148,13 @@ class AnalyticsService:
         Returns:
             Dict with conversation stats
         """
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        
-        # Get all messages
-        messages = ChatMessage.query.filter(
-            ChatMessage.user_id == user_id,
-            ChatMessage.timestamp >= cutoff_date
-        ).all()
+        cutoff_date = (datetime.utcnow() - timedelta(days=days)).date()
         
-        # Count by persona
-        persona_counts = defaultdict(int)
-        user_messages = 0
-        ai_messages = 0
-        
-        for message in messages:
-            if message.role == 'user':
-                user_messages += 1
-            else:
-                ai_messages += 1
-                
-            if message.persona:
-                persona_counts[message.persona] += 1
-        
-        # Get daily message count
-        daily_messages = db.session.query(
-            func.date(ChatMessage.timestamp).label('date'),
-            func.count(ChatMessage.id).label('count')
-        ).filter(
-            ChatMessage.user_id == user_id,
-            ChatMessage.timestamp >= cutoff_date
-        ).group_by(
-            func.date(ChatMessage.timestamp)
-        ).all()
+        # Message counts per day, role and persona from the activity rollups
+        rows = daily_rows(user_id, 'chat_messages', cutoff_date)
+        totals = window_totals(rows)
+        total_messages = count_of(totals, 'chat_messages')
+        user_messages = count_of(totals, 'chat_messages.user')
         
         # Fill in all dates
         dates = []
@@ -221,7 +163,7 @@ class AnalyticsService:
         current_date = (datetime.utcnow() - timedelta(days=days)).date()
         end_date = datetime.utcnow().date()
         
-        messages_dict = {str(d): c for d, c in daily_messages}
+        messages_dict = daily_counts(rows, 'chat_messages')
         
         while current_date <= end_date:
             date_str = str(current_date)
@@ -230,10 +172,10 @@ class AnalyticsService:
             current_date += timedelta(days=1)
         
         return {
-            'total_messages': len(messages),
+            'total_messages': total_messages,
             'user_messages': user_messages,
-            'ai_messages': ai_messages,
-            'by_persona': dict(persona_counts),
+            'ai_messages': total_messages - user_messages,
+            'by_persona': breakdown(totals, 'chat_messages.persona'),
             'daily_activity': {
                 'labels': dates,
                 'values': message_counts
@@ -252,54 +194,31 @@ class AnalyticsService:
         Returns:
             Dict with all analytics data
         """
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        
-        # Get counts
-        mood_count = MoodEntry.query.filter(
-            MoodEntry.user_id == user_id,
-            MoodEntry.timestamp >= cutoff_date
-        ).count()
+        cutoff_date = (datetime.utcnow() - timedelta(days=days)).date()
         
-        exercise_count = ExerciseCompletion.query.filter(
-            ExerciseCompletion.user_id == user_id,
-            ExerciseCompletion.completed_at >= cutoff_date
-        ).count()
+        # Get counts from the activity rollups
+        mood_rows = daily_rows(user_id, 'mood_entries', cutoff_date)
+        moods = window_totals(mood_rows).get('mood_entries')
+        mood_count = moods.count if moods else 0
         
-        message_count = ChatMessage.query.filter(
-            ChatMessage.user_id == user_id,
-            ChatMessage.timestamp >= cutoff_date,
-            ChatMessage.role == 'user'
-        ).count()
+        exercise_count = count_of(window_totals(daily_rows(user_id, 'exercise_completions', cutoff_date)),
+                                  'exercise_completions')
+        message_count = count_of(window_totals(daily_rows(user_id, 'chat_messages.user', cutoff_date)),
+                                 'chat_messages.user')
         
         # Calculate average mood
-        avg_mood_result = db.session.query(
-            func.avg(MoodEntry.mood_level)
-        ).filter(
-            MoodEntry.user_id == user_id,
-            MoodEntry.timestamp >= cutoff_date
-        ).scalar()
-        
-        avg_mood = round(avg_mood_result, 1) if avg_mood_result else 0
+        avg_mood = round(moods.total / mood_count, 1) if mood_count else 0
         
         # Get most active day
-        most_active = db.session.query(
-            func.date(MoodEntry.timestamp).label('date'),
-            func.count(MoodEntry.id).label('count')
-        ).filter(
-            MoodEntry.user_id == user_id,
-            MoodEntry.timestamp >= cutoff_date
-        ).group_by(
-            func.date(MoodEntry.timestamp)
-        ).order_by(
-            func.count(MoodEntry.id).desc()
-        ).first()
+        mood_days = daily_counts(mood_rows, 'mood_entries')
+        most_active = max(mood_days, key=mood_days.get) if mood_days else None
         
         return {
             'mood_checkins': mood_count,
             'exercises_completed': exercise_count,
             'conversations': message_count,
             'average_mood': avg_mood,
-            'most_active_day': str(most_active[0]) if most_active else None,
+            'most_active_day': most_active,
             'time_period_days': days
         }
     
@@ -3,42 +3,100 @@ Chat service for MyBella
 Handles AI chat interactions, system prompts, and conversation logic
 """
 
-import requests
 from flask import current_app
-from backend.services.chat.pinecone_service import retrieve_chunks
+from backend.services.llm import get_llm_router
+from backend.services.chat.memory_retriever import retrieve_memory
+from backend.services.chat.response_cache import get_response_cache, mood_bucket
+from backend.services.chat.prompt_builder import (
+    get_prompt_template, build_dynamic_context, build_chat_messages, record_prompt_usage
+)
 from backend.services.mood_service import MoodService
 
-def build_system_prompt(persona, mode, retrieved_chunks=None, user_id=None):
+CHAT_MODEL = "gpt-4o-mini"
+
+DEMO_RESPONSE = "(demo) {persona}: I hear you. Tell me more about how you're feeling."
+FALLBACK_RESPONSE = "(demo) Sorry, I had trouble reaching the AI. Let's keep chatting."
+
+def build_system_prompt(persona, mode, retrieved_chunks=None, user_id=None, mood_context=None):
     """
     Build system prompt for AI chat based on persona, mode, and user's mood
     
+    Static persona/mode instructions come first and the per-turn context
+    (remembered notes, mood tone) last - see prompt_builder. Chat requests
+    send the two parts as separate messages; this single-string form is kept
+    for callers that need one prompt.
+    
     Args:
         persona: Persona name (Isabella, Maya, Alex, etc.)
         mode: Chat mode (Wellness, Companion, etc.)
         retrieved_chunks: Memory chunks from vector database
         user_id: User ID for mood-aware tone adjustment
+        mood_context: Pre-fetched MoodService.get_mood_context() result (optional)
     
     Returns:
         str: Complete system prompt with mood-based tone adjustment
     """
-    base_prompt = f"You are {persona}, an empathetic AI companion in {mode} mode. Be concise, warm, and supportive."
+    prompt = get_prompt_template(persona, mode).static_prompt
+    dynamic = build_dynamic_context(retrieved_chunks, user_id=user_id, mood_context=mood_context)
+    return f"{prompt}\n\n{dynamic}" if dynamic else prompt
+
+def _build_chat_payload(user_text, persona, mode, user_id, persona_id=None, chunks=None, mood_context=None,
+                        history=None):
+    """
+    Build the OpenAI chat completions payload for a user message
+    
+    Retrieves memory chunks and the mood-aware system prompt so the blocking
+    and streaming paths send exactly the same request. Callers that already
+    fetched chunks, mood context or history (see StageExecutor) can pass them in.
+    
+    Messages are laid out for provider prefix caching (static persona prompt,
+    summary and history first; notes and mood tone last), and
+    prompt_cache_key keeps requests for the same persona/mode on one cache.
+    """
+    # Retrieve relevant memory chunks
+    if chunks is None:
+        chunks = retrieve_memory(user_id, persona, user_text)
+    
+    messages, template = build_chat_messages(user_text, persona, mode, chunks, user_id=user_id,
+                                             mood_context=mood_context, history=history)
+    
+    return {
+        "model": CHAT_MODEL,
+        "messages": messages,
+        "temperature": 0.7,
+        "max_tokens": 250,
+        "prompt_cache_key": template.cache_key
+    }
+
+def _check_response_cache(user_text, persona, mode, user_id, chunks, mood_context, use_cache, history=None):
+    """
+    Look up a low-context prompt in the opt-in response cache
     
-    if mode == "Wellness":
-        base_prompt += " Avoid romance or intimacy; focus on CBT-style reframing, journaling, and supportive check-ins."
+    Returns:
+        tuple: (cache_key or None, cached reply or None, mood_context) - cache_key
+        is set whenever the reply may be stored afterwards
+    """
+    cache = get_response_cache() if use_cache else None
     
-    if retrieved_chunks:
-        notes = "\n".join(f"- {chunk}" for chunk in retrieved_chunks)
-        base_prompt += f"\nUse these remembered notes if relevant:\n{notes}"
+    # Replies grounded in retrieved memories or earlier turns are personal - never share them
+    has_history = bool(history and (history.get('summary') or history.get('messages')))
+    if cache is None or chunks or has_history or not cache.is_cacheable(user_text):
+        return None, None, mood_context
     
-    # 🎭 MOOD-AWARE TONE ADJUSTMENT
-    if user_id:
-        base_prompt = MoodService.get_mood_adjusted_prompt(base_prompt, user_id)
+    # The mood bucket is part of the key, so fetch mood once here and reuse it for the prompt
+    if mood_context is None and user_id:
+        mood_context = MoodService.get_mood_context(user_id)
     
-    return base_prompt
+    cache_key = (user_text, persona, mode, mood_bucket(mood_context))
+    return cache_key, cache.lookup(*cache_key), mood_context
 
-def get_ai_response(user_text, persona, mode, user_id, persona_id=None):
+def get_ai_response(user_text, persona, mode, user_id, persona_id=None, chunks=None, mood_context=None,
+                    use_cache=True, history=None):
     """
-    Get AI response using OpenAI API with mood-aware tone adjustment
+    Get AI response from the LLM router with mood-aware tone adjustment
+    
+    The router handles hedging, circuit breaking and provider failover; the
+    fallback reply is only used when every provider fails.
     
     Args:
         user_text: User's message
@@ -46,41 +104,102 @@ def get_ai_response(user_text, persona, mode, user_id, persona_id=None):
         mode: Chat mode
         user_id: User ID
         persona_id: Persona ID for memory isolation
+        chunks: Pre-fetched memory chunks (optional, retrieved if None)
+        mood_context: Pre-fetched mood context (optional)
+        use_cache: Allow the opt-in response cache (callers disable it for crisis messages)
+        history: Pre-built conversation context window (optional)
     
     Returns:
         str: AI response text
     """
-    openai_api_key = current_app.config.get('OPENAI_API_KEY')
+    router = get_llm_router()
     
-    if not openai_api_key:
-        return f"(demo) {persona}: I hear you. Tell me more about how you're feeling."
+    if not router.providers:
+        return DEMO_RESPONSE.format(persona=persona)
     
     try:
-        # Retrieve relevant memory chunks
-        chunks = retrieve_chunks(user_id, persona, user_text)
+        if chunks is None:
+            chunks = retrieve_memory(user_id, persona, user_text)
+        
+        cache_key, cached, mood_context = _check_response_cache(
+            user_text, persona, mode, user_id, chunks, mood_context, use_cache, history=history
+        )
+        if cached:
+            return cached
         
-        # Build mood-aware system prompt
-        system_prompt = build_system_prompt(persona, mode, chunks, user_id=user_id)
+        payload = _build_chat_payload(user_text, persona, mode, user_id, persona_id=persona_id,
+                                      chunks=chunks, mood_context=mood_context, history=history)
         
-        url = "https://api.openai.com/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {openai_api_key}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "model": "gpt-4o-mini",
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_text}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 250
-        }
+        result = router.complete(payload)
+        record_prompt_usage(result.get("usage"))
+        reply = result["choices"][0]["message"]["content"]
         
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
-        return response.json()["choices"][0]["message"]["content"]
+        if cache_key:
+            get_response_cache().store(*cache_key, reply)
+        return reply
         
     except Exception as e:
         current_app.logger.debug(f"Chat API error: {e}")
-        return "(demo) Sorry, I had trouble reaching the AI. Let's keep chatting."
\ No newline at end of file
+        return FALLBACK_RESPONSE
+
+def stream_ai_response(user_text, persona, mode, user_id, persona_id=None, chunks=None, mood_context=None,
+                       use_cache=True, history=None):
+    """
+    Stream AI response tokens from the LLM router as they are generated
+    
+    Same prompt and fallbacks as get_ai_response(), but yields text deltas
+    so callers can forward them over Socket.IO or Server-Sent Events.
+    
+    Args:
+        user_text: User's message
+        persona: Persona name
+        mode: Chat mode
+        user_id: User ID
+        persona_id: Persona ID for memory isolation
+        chunks: Pre-fetched memory chunks (optional, retrieved if None)
+        mood_context: Pre-fetched mood context (optional)
+        use_cache: Allow the opt-in response cache (callers disable it for crisis messages)
+        history: Pre-built conversation context window (optional)
+    
+    Yields:
+        str: Text deltas; joined together they form the full response
+    """
+    router = get_llm_router()
+    
+    if not router.providers:
+        yield DEMO_RESPONSE.format(persona=persona)
+        return
+    
+    produced = []
+    try:
+        if chunks is None:
+            chunks = retrieve_memory(user_id, persona, user_text)
+        
+        cache_key, cached, mood_context = _check_response_cache(
+            user_text, persona, mode, user_id, chunks, mood_context, use_cache, history=history
+        )
+        if cached:
+            yield cached
+            return
+        
+        payload = _build_chat_payload(user_text, persona, mode, user_id, persona_id=persona_id,
+                                      chunks=chunks, mood_context=mood_context, history=history)
+        payload["stream_options"] = {"include_usage": True}  # Final chunk reports usage (incl. cached tokens)
+        
+        for chunk in router.stream(payload):
+            if chunk.get("usage"):
+                record_prompt_usage(chunk["usage"], label='chat_stream')
+            
+            choices = chunk.get("choices") or []
+            delta = choices[0].get("delta", {}).get("content") if choices else None
+            if delta:
+                produced.append(delta)
+                yield delta
+        
+        if cache_key and produced:
+            get_response_cache().store(*cache_key, ''.join(produced))
+                    
+    except Exception as e:
+        current_app.logger.debug(f"Chat stream error: {e}")
+        if not produced:
+            yield FALLBACK_RESPONSE
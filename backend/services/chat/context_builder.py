@@ -0,0 +1,186 @@
+"""
+Conversation context builder for MyBella chat
+Assembles recent ChatMessage turns for a persona into a token-budgeted
+history window. Older turns are folded into a rolling summary on the
+persona's ConversationMemory row (updated in the background by the
+memory.summarize job, see summarizer.py); once turns are covered by the
+summary only the last few of them are still sent verbatim, so prompt size
+stays small as history grows.
+"""
+
+import json
+
+from flask import current_app
+from sqlalchemy import desc
+
+from backend.database.models.models import db
+from backend.database.models.memory_models import ChatMessage, ConversationMemory
+
+try:
+    import tiktoken
+except ImportError:  # Optional - falls back to a character-based estimate
+    tiktoken = None
+
+# Session id of the per-persona ConversationMemory row holding the rolling summary
+ROLLING_SESSION_ID = 'rolling'
+
+# gpt-4o / gpt-4o-mini tokenizer
+TOKENIZER_ENCODING = 'o200k_base'
+
+# Chat format overhead per message (role + separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+
+    if _encoding is None:
+        _encoding = False
+        if tiktoken is not None:
+            try:
+                _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+            except Exception:
+                pass
+
+    return _encoding or None
+
+
+def count_tokens(text):
+    """Count tokens with the model tokenizer (approximate if tiktoken is unavailable)"""
+    if not text:
+        return 0
+
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+
+    # ~4 characters per token for English text
+    return max(1, len(text) // 4)
+
+
+def count_message_tokens(messages):
+    """Count tokens for a list of chat messages including per-message overhead"""
+    return sum(count_tokens(m['content']) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def get_rolling_memory(user_id, persona, persona_id=None, create=False):
+    """Get the ConversationMemory row that holds a persona's rolling summary"""
+    memory = ConversationMemory.query.filter_by(
+        user_id=user_id,
+        persona=persona,
+        session_id=ROLLING_SESSION_ID
+    ).first()
+
+    if memory is None and create:
+        memory = ConversationMemory(
+            user_id=user_id,
+            persona=persona,
+            persona_id=persona_id,
+            session_id=ROLLING_SESSION_ID,
+            summarized_through_id=0
+        )
+        db.session.add(memory)
+        db.session.flush()
+
+    return memory
+
+
+def load_facts(memory):
+    """A memory's important_facts (stored as a JSON list) as a list"""
+    if not memory or not memory.important_facts:
+        return []
+    try:
+        facts = json.loads(memory.important_facts)
+    except ValueError:
+        return [memory.important_facts]
+    return facts if isinstance(facts, list) else [str(facts)]
+
+
+def _load_window(user_id, persona, budget, max_messages, checkpoint=0, recent_summarized=None):
+    """
+    Walk a persona's messages newest-first until the token budget is spent
+
+    Args:
+        checkpoint: Last message id covered by the rolling summary
+        recent_summarized: Stop after this many messages the summary already covers
+            (None = fill the budget)
+
+    Returns:
+        tuple: (window rows newest-first, id of the newest message that didn't fit or None, tokens used)
+    """
+    recent = ChatMessage.query.filter_by(
+        user_id=user_id,
+        persona=persona
+    ).order_by(desc(ChatMessage.id)).limit(max_messages + 1).all()
+
+    window = []
+    used = 0
+    summarized = 0
+    for message in recent[:max_messages]:
+        cost = count_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+        if used + cost > budget:
+            break
+        if message.id <= checkpoint:
+            if recent_summarized is not None and summarized >= recent_summarized:
+                break
+            summarized += 1
+        window.append(message)
+        used += cost
+
+    overflow_id = recent[len(window)].id if len(recent) > len(window) else None
+    return window, overflow_id, used
+
+
+def empty_window():
+    """A context window with no history (anonymous users, or history couldn't be loaded)"""
+    return {'summary': None, 'facts': [], 'messages': [], 'tokens': 0, 'needs_summary': False}
+
+
+def build_context_window(user_id, persona, budget=None):
+    """
+    Build the conversation history to send with the next user message
+
+    Args:
+        user_id: User ID
+        persona: Persona name (messages are stored per persona)
+        budget: Token budget for raw history (default CONTEXT_HISTORY_TOKENS)
+
+    Returns:
+        dict: {
+            'summary': str or None - rolling summary of turns older than the window,
+            'facts': list of str - lasting facts about the user from the summarizer,
+            'messages': list of {'role', 'content'} in chronological order,
+            'tokens': int - tokens used by messages,
+            'needs_summary': bool - enough new turns (or turns outside the window)
+                aren't summarized yet
+        }
+    """
+    config = current_app.config
+    budget = budget or config.get('CONTEXT_HISTORY_TOKENS', 1500)
+    max_messages = config.get('CONTEXT_MAX_MESSAGES', 50)
+
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        # Anonymous/demo users have no stored history
+        return empty_window()
+
+    memory = get_rolling_memory(user_id, persona)
+    checkpoint = (memory.summarized_through_id or 0) if memory else 0
+    has_summary = bool(memory and memory.summary)
+    window, overflow_id, used = _load_window(
+        user_id, persona, budget, max_messages, checkpoint,
+        config.get('CONTEXT_RECENT_TURNS', 6) if has_summary else None
+    )
+    unsummarized = sum(1 for m in window if m.id > checkpoint)
+
+    return {
+        'summary': memory.summary if memory else None,
+        'facts': load_facts(memory),
+        'messages': [{'role': m.role, 'content': m.content} for m in reversed(window)],
+        'tokens': used,
+        'needs_summary': (unsummarized >= config.get('MEMORY_SUMMARY_MIN_MESSAGES', 10)
+                          or (overflow_id is not None and overflow_id > checkpoint)),
+    }
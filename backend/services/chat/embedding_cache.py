@@ -0,0 +1,203 @@
+"""
+Embedding cache for MyBella
+Content-addressed cache of text embeddings keyed by (model, sha256(text)),
+so identical strings are embedded once: the user text embedded for memory
+retrieval is reused when the same text is upserted, and canned crisis/demo
+replies stop costing an embeddings call every time.
+
+An in-process LRU sits in front of a SQLite file shared by the web and
+worker processes. The file is size-bounded: every evict_every rows a process
+writes, it counts the rows and evicts the least recently used past
+max_entries (so the file can briefly run over by a few batches).
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from flask import current_app
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, text_hash)
+);
+CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used);
+"""
+
+# Hashes per IN (...) lookup, well under SQLite's bound-variable limit (999 before 3.32)
+LOOKUP_CHUNK = 500
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-level (memory LRU + SQLite) embedding cache safe for threads and processes"""
+
+    def __init__(self, db_path, memory_entries=2048, max_entries=100000, evict_every=None):
+        self.db_path = db_path
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.evict_every = evict_every or max(1, max_entries // 100)
+        self._unchecked_writes = self.evict_every  # Check on this process's first write
+        self._memory = OrderedDict()  # (model, text_hash) -> float32 array
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        """One connection per thread (sqlite3 connections can't be shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key, vector):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get_many(self, model, texts):
+        """
+        Look up cached embeddings
+
+        Returns:
+            list: One entry per text - a list of floats, or None on a miss
+        """
+        keys = [(model, text_hash(text)) for text in texts]
+        results = [None] * len(keys)
+        missing = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    results[i] = vector.tolist()
+                else:
+                    missing.setdefault(key[1], []).append(i)
+
+        if missing:
+            digests = list(missing)
+            rows = []
+            for start in range(0, len(digests), LOOKUP_CHUNK):
+                chunk = digests[start:start + LOOKUP_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                rows.extend(self._conn().execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk]
+                ).fetchall())
+
+            found = []
+            for digest, blob in rows:
+                vector = np.frombuffer(blob, dtype=np.float32)
+                self._remember((model, digest), vector)
+                for i in missing[digest]:
+                    results[i] = vector.tolist()
+                found.append(digest)
+
+            if found:
+                self._conn().executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(time.time(), model, digest) for digest in found]
+                )
+
+            with self._lock:
+                self.disk_hits += sum(len(missing[digest]) for digest in found)
+                self.misses += sum(len(indexes) for digest, indexes in missing.items() if digest not in found)
+
+        return results
+
+    def put_many(self, model, texts, vectors):
+        """Store embeddings for texts, evicting the least recently used rows past max_entries now and then"""
+        now = time.time()
+        rows = []
+
+        for text, values in zip(texts, vectors):
+            vector = np.asarray(values, dtype=np.float32)
+            digest = text_hash(text)
+            self._remember((model, digest), vector)
+            rows.append((model, digest, vector.tobytes(), now))
+
+        conn = self._conn()
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)", rows
+        )
+
+        with self._lock:
+            self._unchecked_writes += len(rows)
+            if self._unchecked_writes < self.evict_every:
+                return
+            self._unchecked_writes = 0
+        self._evict(conn)
+
+    def _evict(self, conn):
+        """Delete the least recently used rows past max_entries"""
+        excess = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+
+    def stats(self):
+        with self._lock:
+            total = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_entries': len(self._memory),
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.memory_hits + self.disk_hits) / total, 3) if total else 0.0,
+            }
+
+
+# Global cache (created on first use when enabled)
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """Get the embedding cache, or None when EMBEDDING_CACHE_ENABLED is off"""
+    global _cache
+
+    config = current_app.config
+    if not config.get('EMBEDDING_CACHE_ENABLED', True) or not config.get('EMBEDDING_CACHE_DB'):
+        return None
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache(
+                    config['EMBEDDING_CACHE_DB'],
+                    memory_entries=config.get('EMBEDDING_CACHE_MEMORY_ENTRIES', 2048),
+                    max_entries=config.get('EMBEDDING_CACHE_MAX_ENTRIES', 100000),
+                )
+    return _cache
+
+
+def get_embedding_cache_stats():
+    """Cache hit/miss counts, for health/debug endpoints"""
+    return _cache.stats() if _cache else {}
@@ -0,0 +1,148 @@
+"""
+Idempotency store for MyBella chat
+Deduplicates /api/chat requests that carry the same client_message_id, so
+double-clicks and mobile retries don't each pay for an LLM call, embeddings
+and a full set of DB writes.
+
+- The first request for a key runs normally and records its response.
+- Duplicates that arrive while it is running wait for that response.
+- Duplicates that arrive later replay the stored response until it expires.
+
+Keys are scoped per user. The store is per process; with several workers a
+retry can still land on another process, which just runs it once there.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+NEW = 'new'
+REPLAY = 'replay'
+PENDING = 'pending'
+
+MAX_KEY_LENGTH = 128
+
+
+class IdempotencyStore:
+    """Thread-safe in-flight coalescing plus a TTL store of completed responses"""
+
+    def __init__(self, ttl=300, max_entries=10000, wait_timeout=60):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self._entries = OrderedDict()  # key -> entry dict
+        self._lock = threading.Lock()
+        self.replays = 0
+        self.coalesced = 0
+
+    def begin(self, key):
+        """
+        Claim a key or get the response recorded for it
+
+        Blocks while another request holds the key. If that request is
+        abandoned, the caller takes over the key instead.
+
+        Returns:
+            tuple: (state, response) where state is NEW (caller must later call
+            complete() or abandon()), REPLAY (response is the stored payload)
+            or PENDING (still in flight after wait_timeout)
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        waited = False
+
+        while True:
+            with self._lock:
+                self._expire()
+                entry = self._entries.get(key)
+
+                if entry is None:
+                    self._entries[key] = {'done': threading.Event(), 'response': None, 'completed_at': None}
+                    while len(self._entries) > self.max_entries:
+                        _, evicted = self._entries.popitem(last=False)
+                        evicted['done'].set()  # Waiters on an evicted in-flight key claim it again
+                    return NEW, None
+
+                if entry['completed_at'] is not None:
+                    if waited:
+                        self.coalesced += 1
+                    else:
+                        self.replays += 1
+                    return REPLAY, entry['response']
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not entry['done'].wait(remaining):
+                return PENDING, None
+            waited = True
+
+    def complete(self, key, response):
+        """Record the response for a claimed key and wake waiting duplicates"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry['response'] = response
+            entry['completed_at'] = time.monotonic()
+            self._entries.move_to_end(key)
+        entry['done'].set()
+
+    def abandon(self, key):
+        """Release a claimed key after a failure so a retry can run it again"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry['done'].set()
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        expired = [key for key, entry in self._entries.items()
+                   if entry['completed_at'] is not None and entry['completed_at'] < cutoff]
+        for key in expired:
+            del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            in_flight = sum(1 for entry in self._entries.values() if entry['completed_at'] is None)
+            return {
+                'entries': len(self._entries),
+                'in_flight': in_flight,
+                'replays': self.replays,
+                'coalesced': self.coalesced,
+            }
+
+
+def make_key(user_id, client_message_id):
+    """Scope a client-supplied id to the user, or None when it is missing or unusable"""
+    if not isinstance(client_message_id, str):
+        return None
+    client_message_id = client_message_id.strip()
+    if not client_message_id or len(client_message_id) > MAX_KEY_LENGTH:
+        return None
+    return (str(user_id), client_message_id)
+
+
+# Global store (created on first use)
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_idempotency_store():
+    """Get the idempotency store"""
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = current_app.config
+                _store = IdempotencyStore(
+                    ttl=config.get('IDEMPOTENCY_TTL', 300),
+                    max_entries=config.get('IDEMPOTENCY_MAX_ENTRIES', 10000),
+                    wait_timeout=config.get('IDEMPOTENCY_WAIT_TIMEOUT', 60),
+                )
+    return _store
+
+
+def get_idempotency_stats():
+    """Store stats, for health/debug endpoints"""
+    return _store.stats() if _store else {}
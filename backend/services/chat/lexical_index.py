@@ -0,0 +1,340 @@
+"""
+Lexical index for MyBella chat memory and message search
+Full-text index over the content of chat_messages and messages (the legacy
+table used by chat history and admin search):
+
+- SQLite: FTS5 external-content tables (<table>_fts, porter stemming) kept
+  in sync by triggers on insert, update and delete, ranked with BM25
+- Postgres: a generated tsvector column with a GIN index, which Postgres
+  keeps in sync itself, ranked with ts_rank. Adding the column rewrites the
+  table, so it is created by scripts/migrations/add_message_search_index.py
+  rather than on startup
+
+Used by the hybrid memory retriever (any-term match) and by user/admin
+message search (all terms, ranked, highlighted, keyset-paginated). Without an
+index search falls back to a substring scan.
+"""
+
+import base64
+import re
+
+from flask import current_app
+from markupsafe import Markup, escape
+from sqlalchemy import inspect, text
+
+from backend.database.models.models import db
+
+INDEXED_TABLES = ('chat_messages', 'messages')
+
+FTS_SCHEMA = [
+    """CREATE VIRTUAL TABLE {table}_fts USING fts5(
+        content, content='{table}', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+        INSERT INTO {table}_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+        INSERT INTO {table}_fts({table}_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF content ON {table} BEGIN
+        INSERT INTO {table}_fts({table}_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO {table}_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+]
+
+# Applied by scripts/migrations/add_message_search_index.py
+TSVECTOR_SCHEMA = [
+    """ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', coalesce(content, ''))) STORED""",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)",
+]
+
+# Words too common to help recall a memory
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'do', 'for', 'from', 'had', 'has', 'have', 'he',
+    'her', 'his', 'how', 'i', 'if', 'im', 'in', 'is', 'it', 'its', 'just', 'me', 'my', 'no', 'not', 'of', 'on',
+    'or', 'so', 'that', 'the', 'their', 'them', 'there', 'they', 'this', 'to', 'was', 'we', 'were', 'what',
+    'when', 'which', 'who', 'why', 'will', 'with', 'you', 'your',
+}
+
+_WORDS = re.compile(r"\w+", re.UNICODE)
+
+# Highlight markers: inserted by the database, swapped for <mark> after HTML-escaping
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+SNIPPET_WORDS = 16
+DEFAULT_COUNT_CAP = 1000
+
+search_backend = None  # 'fts5', 'tsvector' or None (substring scan)
+
+
+def init_lexical_index(app):
+    """
+    Create the SQLite full-text index for each indexed table (backfilling
+    existing rows on first run), or check the Postgres migration has run
+    """
+    global search_backend
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        try:
+            with db.engine.begin() as conn:
+                for table in INDEXED_TABLES:
+                    if dialect == 'sqlite':
+                        _create_fts5(conn, table)
+                    elif dialect == 'postgresql':
+                        columns = [column['name'] for column in inspect(conn).get_columns(table)]
+                        if 'search_vector' not in columns:
+                            app.logger.warning(f"Lexical index skipped: {table}.search_vector missing, "
+                                               "run scripts/migrations/add_message_search_index.py")
+                            return
+                    else:
+                        app.logger.info(f"Lexical index skipped: no full-text support for {dialect}")
+                        return
+
+            search_backend = 'fts5' if dialect == 'sqlite' else 'tsvector'
+            app.logger.info(f"Lexical index ready ({search_backend} over {', '.join(INDEXED_TABLES)})")
+        except Exception as e:
+            app.logger.warning(f"Lexical index skipped: {e}")
+
+
+def _create_fts5(conn, table):
+    exists = conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+    ), {'name': f"{table}_fts"}).first()
+
+    if not exists:
+        conn.execute(text(FTS_SCHEMA[0].format(table=table)))
+        conn.execute(text(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')"))
+    for statement in FTS_SCHEMA[1:]:
+        conn.execute(text(statement.format(table=table)))
+
+
+def _terms(query_text, drop_stopwords):
+    terms = []
+    for word in _WORDS.findall((query_text or '').lower()):
+        if drop_stopwords and (len(word) < 2 or word in STOPWORDS):
+            continue
+        if word not in terms:
+            terms.append(word)
+    return terms
+
+
+def build_match_query(query_text, max_terms=12):
+    """Turn free text into an FTS5 OR query of quoted terms, or None if nothing is searchable"""
+    terms = _terms(query_text, drop_stopwords=True)[:max_terms]
+    if not terms:
+        return None
+    return ' OR '.join(f'"{term}"' for term in terms)
+
+
+def build_search_query(query_text, max_terms=12):
+    """
+    Query matching messages that contain every term (the last one as a
+    prefix, so results show up while a word is still being typed)
+
+    Returns:
+        str or None: FTS5 MATCH or Postgres to_tsquery syntax for the active backend
+    """
+    terms = _terms(query_text, drop_stopwords=False)[:max_terms]
+    if not terms:
+        return None
+    if search_backend == 'tsvector':
+        return ' & '.join(terms[:-1] + [f"{terms[-1]}:*"])
+    return ' '.join([f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*'])
+
+
+def highlight(snippet):
+    """HTML-safe snippet with matched terms wrapped in <mark>"""
+    escaped = str(escape(snippet or ''))
+    return Markup(escaped.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>'))
+
+
+def search_chat_messages(user_id, persona, query_text, limit=20):
+    """
+    Chat messages for one user and persona matching any query term, best first
+
+    Returns:
+        list: {'id', 'text', 'timestamp', 'score'} dicts (higher score is better)
+    """
+    if search_backend is None:
+        return []
+
+    terms = _terms(query_text, drop_stopwords=True)[:12]
+    if not terms:
+        return []
+
+    params = {'user_id': user_id, 'persona': persona.lower(), 'limit': limit}
+    if search_backend == 'fts5':
+        params['match'] = build_match_query(query_text)
+        sql = (
+            "SELECT m.id, m.content, m.timestamp, -bm25(chat_messages_fts) AS score "
+            "FROM chat_messages_fts JOIN chat_messages m ON m.id = chat_messages_fts.rowid "
+            "WHERE chat_messages_fts MATCH :match AND m.user_id = :user_id AND lower(m.persona) = :persona "
+            "ORDER BY score DESC LIMIT :limit"
+        )
+    else:
+        params['match'] = ' | '.join(terms)
+        sql = (
+            "SELECT m.id, m.content, m.timestamp, ts_rank(m.search_vector, q) AS score "
+            "FROM chat_messages m, to_tsquery('english', :match) q "
+            "WHERE m.search_vector @@ q AND m.user_id = :user_id AND lower(m.persona) = :persona "
+            "ORDER BY score DESC LIMIT :limit"
+        )
+
+    try:
+        rows = db.session.execute(text(sql), params).fetchall()
+    except Exception as e:
+        current_app.logger.debug(f"Lexical search skip: {e}")
+        return []
+
+    return [{'id': row[0], 'text': row[1], 'timestamp': row[2], 'score': row[3]} for row in rows]
+
+
+def encode_search_cursor(score, row_id, counted):
+    """Opaque cursor for the search result just after a row (the first page's total rides along)"""
+    raw = f"{score!r}|{row_id}|{counted}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_search_cursor(cursor):
+    """
+    Returns:
+        tuple: (score, id, counted) of the result the cursor points after
+
+    Raises:
+        ValueError: The cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        score, row_id, counted = raw.split('|')
+        return float(score), int(row_id), int(counted)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def search_messages(table, query_text, user_id=None, persona=None, cursor=None, per_page=20):
+    """
+    Ranked, highlighted, keyset-paginated full-text search
+
+    Each page starts after the previous page's last (score, id), so deep pages
+    cost the same as the first. Matches are counted once, on the first page,
+    and only up to SEARCH_COUNT_CAP; later pages carry that total in the cursor.
+
+    Args:
+        table: 'chat_messages' or 'messages'
+        user_id: Only this user's messages (None = every user, for admins)
+        persona: Only this persona's messages
+        cursor: next_cursor of the previous page (None = first page)
+
+    Returns:
+        dict: {'results': [{'id', 'score', 'snippet'}], 'total', 'total_capped', 'per_page',
+        'has_next', 'next_cursor'} where snippet is HTML-safe Markup with matches in <mark>
+
+    Raises:
+        ValueError: The cursor is malformed
+    """
+    if table not in INDEXED_TABLES:
+        raise ValueError(f"Not an indexed table: {table}")
+
+    after = decode_search_cursor(cursor) if cursor else None
+    empty = {'results': [], 'total': 0, 'total_capped': False, 'per_page': per_page,
+             'has_next': False, 'next_cursor': None}
+    match = build_search_query(query_text)
+    if match is None:
+        return empty
+
+    filters, params = [], {'match': match, 'limit': per_page + 1}
+    if user_id is not None:
+        filters.append("m.user_id = :user_id")
+        params['user_id'] = user_id
+    if persona:
+        filters.append("lower(m.persona) = :persona")
+        params['persona'] = persona.lower()
+
+    if search_backend == 'fts5':
+        score = f"-bm25({table}_fts)"
+        source = f"{table}_fts JOIN {table} m ON m.id = {table}_fts.rowid WHERE {table}_fts MATCH :match"
+        snippet = f"snippet({table}_fts, 0, char(2), char(3), '…', {SNIPPET_WORDS})"
+    elif search_backend == 'tsvector':
+        score = "ts_rank(m.search_vector, q)::float8"  # float8 so the cursor's score compares exactly
+        source = f"{table} m, to_tsquery('english', :match) q WHERE m.search_vector @@ q"
+        snippet = ("ts_headline('english', m.content, q, "
+                   f"'StartSel=' || chr(2) || ',StopSel=' || chr(3) || ',MaxFragments=1,MaxWords={SNIPPET_WORDS}')")
+    else:
+        # No index: substring scan, newest first
+        params['pattern'] = f"%{query_text.strip()}%"
+        score = "0.0"
+        source = f"{table} m WHERE m.content LIKE :pattern"
+        snippet = "m.content"
+    source += ''.join(f" AND {condition}" for condition in filters)
+
+    page_source = source
+    if after is not None:
+        params.update(after_score=after[0], after_id=after[1])
+        page_source += f" AND ({score} < :after_score OR ({score} = :after_score AND m.id < :after_id))"
+
+    cap = current_app.config.get('SEARCH_COUNT_CAP', DEFAULT_COUNT_CAP)
+    try:
+        if after is None:
+            counted = db.session.execute(
+                text(f"SELECT count(*) FROM (SELECT 1 FROM {source} LIMIT :cap) matches"), dict(params, cap=cap + 1)
+            ).scalar() or 0
+        else:
+            counted = after[2]
+        rows = db.session.execute(text(
+            f"SELECT m.id, {score} AS score, {snippet} AS snippet FROM {page_source} "
+            "ORDER BY score DESC, m.id DESC LIMIT :limit"
+        ), params).fetchall()
+    except Exception as e:
+        current_app.logger.warning(f"Message search failed: {e}")
+        return empty
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_search_cursor(float(rows[-1][1] or 0), rows[-1][0], counted)
+
+    results = [{
+        'id': row[0],
+        'score': float(row[1] or 0),
+        'snippet': highlight(row[2] if search_backend else _substring_snippet(row[2], query_text)),
+    } for row in rows]
+    return {
+        'results': results,
+        'total': min(counted, cap),
+        'total_capped': counted > cap,
+        'per_page': per_page,
+        'has_next': next_cursor is not None,
+        'next_cursor': next_cursor,
+    }
+
+
+def _substring_snippet(content, query_text, radius=80):
+    """Snippet around the first case-insensitive match, with markers (fallback path)"""
+    needle = query_text.strip()
+    start = content.lower().find(needle.lower())
+    if start < 0:
+        return content[:2 * radius]
+    end = start + len(needle)
+    prefix = '…' if start > radius else ''
+    suffix = '…' if end + radius < len(content) else ''
+    return (f"{prefix}{content[max(start - radius, 0):start]}{HIGHLIGHT_START}{content[start:end]}"
+            f"{HIGHLIGHT_END}{content[end:end + radius]}{suffix}")
+
+
+def load_ranked(model, page):
+    """Model rows for a search_messages page, in rank order, each with .snippet and .search_score"""
+    hits = {hit['id']: hit for hit in page['results']}
+    if not hits:
+        return []
+    rows = {row.id: row for row in model.query.filter(model.id.in_(hits)).all()}
+
+    ranked = []
+    for message_id, hit in hits.items():
+        row = rows.get(message_id)
+        if row is not None:
+            row.snippet = hit['snippet']
+            row.search_score = hit['score']
+            ranked.append(row)
+    return ranked
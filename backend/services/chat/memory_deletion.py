@@ -0,0 +1,332 @@
+"""
+Memory deletion pipeline for MyBella
+Deleting memory touches three stores: chat_messages (SQL, also the lexical
+index and activity rollups), vector memory and the Firestore copies. A
+request records a MemoryDeletion plus tombstones and returns at once; a
+'memory.delete' job then deletes from every store in chunks, recording
+progress as it goes.
+
+Until the job finishes, tombstones hide the deleted memory: vector matches
+for tombstoned records are dropped from retrieval, and queued vector upserts
+for deleted messages are skipped so they can't bring the memory back.
+
+Vectors are content-addressed, so near-identical messages ("ok", "Ok!")
+share one; a vector is only deleted once no surviving message uses it.
+
+The rolling summary row of each persona in scope (summary, topics, mood and
+facts the summarizer drew from the deleted messages) goes too: removed for a
+persona reset or delete-all, cleared for selected messages so the next
+summarizer run rebuilds it from the messages that remain.
+"""
+
+import json
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, or_
+
+from backend.database.models.models import db
+from backend.database.models.memory_models import (
+    ChatMessage, ConversationMemory, MemoryDeletion, MemoryTombstone, UserPreference
+)
+from backend.services.activity_rollups import subtract_rows
+from backend.services.chat.context_builder import ROLLING_SESSION_ID
+from backend.services.chat.retrieval_cache import get_retrieval_cache
+from backend.services.firebase.firebase_service import delete_chat_messages, delete_persona_chats, delete_user_chats
+from backend.services.jobs import enqueue_jobs
+from backend.services.vector_store import get_vector_store, vector_id
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def _chunk_size():
+    return int(current_app.config.get('MEMORY_DELETE_CHUNK_SIZE') or DEFAULT_CHUNK_SIZE)
+
+
+def parse_message_ids(values):
+    """
+    ChatMessage ids from a request body
+
+    Raises:
+        ValueError: If values isn't a list of integers (or digit strings)
+    """
+    if not isinstance(values, list) or not all(
+        (isinstance(v, int) and not isinstance(v, bool)) or (isinstance(v, str) and v.isdigit()) for v in values
+    ):
+        raise ValueError('message_ids must be a list of message ids')
+    return sorted({int(v) for v in values})
+
+
+def request_deletion(user_id, persona=None, message_ids=None):
+    """
+    Record a deletion and queue it
+
+    Args:
+        persona: Only this persona's memory (None = every persona)
+        message_ids: Only these ChatMessage ids (None = everything in scope)
+
+    Returns:
+        MemoryDeletion: The pending deletion (poll it via get_deletion)
+
+    Raises:
+        ValueError: If message_ids aren't all integers
+    """
+    deletion = MemoryDeletion(user_id=user_id, persona=persona, status='pending')
+
+    if message_ids is not None:
+        message_ids = parse_message_ids(message_ids)
+        rows = db.session.query(ChatMessage.persona, ChatMessage.content).filter(
+            ChatMessage.user_id == user_id,
+            ChatMessage.id.in_(message_ids)
+        ).all()
+        deletion.message_ids = json.dumps(message_ids)
+        db.session.add(deletion)
+        db.session.flush()
+        db.session.add_all(MemoryTombstone(
+            deletion_id=deletion.id,
+            user_id=user_id,
+            persona_key=(row_persona or '').lower(),
+            vector_id=vector_id(str(user_id), row_persona or '', content)
+        ) for row_persona, content in rows)
+    else:
+        query = db.session.query(func.max(ChatMessage.id)).filter(ChatMessage.user_id == user_id)
+        if persona:
+            query = query.filter(func.lower(ChatMessage.persona) == persona.lower())
+        deletion.through_message_id = query.scalar() or 0
+        db.session.add(deletion)
+        db.session.flush()
+        db.session.add(MemoryTombstone(
+            deletion_id=deletion.id,
+            user_id=user_id,
+            persona_key=persona.lower() if persona else None,
+            through_message_id=deletion.through_message_id
+        ))
+
+    db.session.commit()
+    enqueue_jobs([('memory.delete', {'deletion_id': deletion.id})])
+    return deletion
+
+
+def get_deletion(deletion_id, user_id):
+    """A user's deletion (for progress polling), or None"""
+    return MemoryDeletion.query.filter_by(id=deletion_id, user_id=user_id).first()
+
+
+def _tombstones(user_id, persona):
+    if not str(user_id).isdigit():
+        return []  # Demo/session users have no stored memory to delete
+    return MemoryTombstone.query.filter(
+        MemoryTombstone.user_id == int(user_id),
+        or_(MemoryTombstone.persona_key.is_(None), MemoryTombstone.persona_key == (persona or '').lower())
+    ).all()
+
+
+def filter_tombstoned_matches(user_id, persona, matches):
+    """Drop vector matches for memory that is being deleted"""
+    try:
+        tombstones = _tombstones(user_id, persona)
+    except Exception as e:
+        current_app.logger.debug(f"Tombstone lookup skip: {e}")
+        return matches
+
+    if any(t.vector_id is None for t in tombstones):
+        return []  # Whole persona is being deleted; its vectors carry no message ids to tell new from old
+    dead = {t.vector_id for t in tombstones}
+    return [match for match in matches if match['id'] not in dead]
+
+
+def filter_tombstoned_payloads(payloads):
+    """Drop queued memory.upsert payloads for messages deleted after they were queued"""
+    live = []
+    for payload in payloads:
+        tombstones = _tombstones(payload['user_id'], payload['persona'])
+        dead = {t.vector_id for t in tombstones if t.vector_id}
+        message_id = payload.get('message_id')
+        covered = any(
+            t.vector_id is None and (message_id is None or message_id <= t.through_message_id)
+            for t in tombstones
+        )
+        if not covered and vector_id(str(payload['user_id']), payload['persona'], payload['text']) not in dead:
+            live.append(payload)
+    return live
+
+
+def run_deletion(deletion_id):
+    """
+    Carry out a deletion (the 'memory.delete' job)
+
+    Safe to retry: every step deletes whatever is still there, and message
+    rows are removed from SQL last so a retried chunk can still find the
+    vectors and Firestore copies that belong to them.
+    """
+    deletion = db.session.get(MemoryDeletion, deletion_id)
+    if deletion is None or deletion.status == 'done':
+        return
+
+    deletion.status = 'running'
+    deletion.error = None
+    db.session.commit()
+
+    try:
+        if deletion.message_ids is not None:
+            _delete_messages(deletion)
+        else:
+            _delete_scope(deletion)
+
+        deletion.status = 'done'
+        deletion.completed_at = datetime.utcnow()
+        MemoryTombstone.query.filter_by(deletion_id=deletion.id).delete()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        deletion.status = 'failed'
+        deletion.error = str(e)[:500]
+        db.session.commit()
+        raise
+
+    _invalidate_retrieval_cache(deletion)
+
+
+def _backfill_vector_ids(user_id):
+    """Fill ChatMessage.vector_id on a user's messages stored before the column existed"""
+    while True:
+        messages = ChatMessage.query.filter(
+            ChatMessage.user_id == user_id,
+            ChatMessage.vector_id.is_(None)
+        ).limit(_chunk_size()).all()
+        if not messages:
+            return
+        for message in messages:
+            message.vector_id = vector_id(str(message.user_id), message.persona or '', message.content)
+        db.session.commit()
+
+
+def _delete_messages(deletion):
+    """Delete selected messages from every store, one chunk of ids at a time"""
+    user_id = str(deletion.user_id)
+    store = get_vector_store()
+    ids = json.loads(deletion.message_ids)
+    _backfill_vector_ids(deletion.user_id)
+
+    for start in range(0, len(ids), _chunk_size()):
+        chunk = ids[start:start + _chunk_size()]
+        rows = db.session.query(ChatMessage.id, ChatMessage.persona, ChatMessage.vector_id).filter(
+            ChatMessage.user_id == deletion.user_id,
+            ChatMessage.id.in_(chunk)
+        ).all()
+
+        # Keep vectors another message still uses (later chunks of this deletion included;
+        # the last chunk holding one deletes it)
+        shared = {row[0] for row in db.session.query(ChatMessage.vector_id).filter(
+            ChatMessage.user_id == deletion.user_id,
+            ChatMessage.vector_id.in_({row.vector_id for row in rows}),
+            ChatMessage.id.notin_(chunk)
+        ).distinct()}
+
+        by_persona = {}
+        for row in rows:
+            by_persona.setdefault(row.persona or '', set()).add(row.vector_id)
+
+        for persona, vector_ids in by_persona.items():
+            vector_ids -= shared
+            if store is not None and vector_ids:
+                deletion.vectors_deleted += store.delete_ids(user_id, persona, vector_ids) or 0
+        deletion.firestore_deleted += delete_chat_messages(user_id, [row.id for row in rows], raise_errors=True)
+
+        criteria = (ChatMessage.user_id == deletion.user_id, ChatMessage.id.in_(chunk))
+        subtract_rows(ChatMessage, *criteria)
+        deletion.sql_deleted += ChatMessage.query.filter(*criteria).delete(synchronize_session=False)
+        db.session.commit()
+
+    # Tombstones outlive a failed attempt, so a retry still knows which personas were touched
+    personas = {row[0] for row in db.session.query(MemoryTombstone.persona_key).filter_by(deletion_id=deletion.id)}
+    for memory in _rolling_memories(deletion.user_id).filter(func.lower(ConversationMemory.persona).in_(personas)):
+        memory.summary = None
+        memory.key_topics = None
+        memory.user_mood = None
+        memory.important_facts = None
+        memory.summarized_through_id = 0
+    db.session.commit()
+
+
+def _rolling_memories(user_id):
+    return ConversationMemory.query.filter(
+        ConversationMemory.user_id == user_id,
+        ConversationMemory.session_id == ROLLING_SESSION_ID
+    )
+
+
+def _delete_scope(deletion):
+    """Delete a persona's (or all of a user's) memory: bulk vector/Firestore deletes, then SQL in chunks"""
+    user_id = str(deletion.user_id)
+    store = get_vector_store()
+
+    if store is not None:
+        removed = store.delete(user_id, deletion.persona) if deletion.persona else store.delete_user(user_id)
+        deletion.vectors_deleted += removed or 0
+        _restore_newer_vectors(deletion)
+    if deletion.persona:
+        deletion.firestore_deleted += delete_persona_chats(user_id, deletion.persona, raise_errors=True)
+    else:
+        deletion.firestore_deleted += delete_user_chats(user_id, raise_errors=True)
+    db.session.commit()
+
+    while True:
+        query = db.session.query(ChatMessage.id).filter(
+            ChatMessage.user_id == deletion.user_id,
+            ChatMessage.id <= deletion.through_message_id
+        )
+        if deletion.persona:
+            query = query.filter(func.lower(ChatMessage.persona) == deletion.persona.lower())
+        chunk = [row[0] for row in query.order_by(ChatMessage.id).limit(_chunk_size()).all()]
+        if not chunk:
+            break
+
+        subtract_rows(ChatMessage, ChatMessage.id.in_(chunk))
+        deletion.sql_deleted += ChatMessage.query.filter(ChatMessage.id.in_(chunk)).delete(synchronize_session=False)
+        db.session.commit()
+
+    # The rolling summary and facts were drawn from the deleted messages
+    memories = _rolling_memories(deletion.user_id)
+    if deletion.persona:
+        memories = memories.filter(func.lower(ConversationMemory.persona) == deletion.persona.lower())
+    memory_ids = [memory.id for memory in memories]
+    if memory_ids:
+        ChatMessage.query.filter(ChatMessage.memory_id.in_(memory_ids)).update(
+            {'memory_id': None}, synchronize_session=False
+        )
+        ConversationMemory.query.filter(ConversationMemory.id.in_(memory_ids)).delete(synchronize_session=False)
+    db.session.commit()
+
+    if not deletion.persona:
+        UserPreference.query.filter_by(user_id=deletion.user_id).delete()
+        db.session.commit()
+
+
+def _restore_newer_vectors(deletion):
+    """
+    Queue vector upserts again for messages sent after the request: the bulk
+    vector delete took their vectors too, though their rows are kept
+    """
+    query = db.session.query(ChatMessage.id, ChatMessage.persona, ChatMessage.content).filter(
+        ChatMessage.user_id == deletion.user_id,
+        ChatMessage.id > deletion.through_message_id
+    )
+    if deletion.persona:
+        query = query.filter(func.lower(ChatMessage.persona) == deletion.persona.lower())
+
+    jobs = [('memory.upsert', {'user_id': str(deletion.user_id), 'persona': persona or '', 'text': content,
+                               'message_id': message_id})
+            for message_id, persona, content in query.order_by(ChatMessage.id)]
+    for start in range(0, len(jobs), _chunk_size()):
+        enqueue_jobs(jobs[start:start + _chunk_size()])
+
+
+def _invalidate_retrieval_cache(deletion):
+    cache = get_retrieval_cache()
+    if cache is None:
+        return
+    if deletion.persona:
+        cache.invalidate(deletion.user_id, deletion.persona)
+    else:
+        cache.invalidate_user(deletion.user_id)
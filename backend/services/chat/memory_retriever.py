@@ -0,0 +1,165 @@
+"""
+Hybrid memory retrieval for MyBella
+Fuses vector search (the active VectorStore) with BM25 keyword search over
+chat history (lexical_index) using reciprocal rank fusion, then boosts recent
+memories.
+
+The vector leg (embedding call + vector query) gets a strict latency budget.
+When it is slow or down, the turn goes ahead with lexical results only
+instead of waiting; the late embedding still lands in the embedding cache.
+"""
+
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func
+
+from backend.database.models.models import db
+from backend.database.models.memory_models import ChatMessage
+from backend.services.chat.lexical_index import search_chat_messages
+from backend.services.chat.pinecone_service import retrieve_chunks
+from backend.services.vector_store import dedupe_text
+
+# Own pool: the vector leg is submitted from chat stages already running on
+# the stage pool, and nesting on that pool could deadlock under load
+_pool = None
+_pool_lock = threading.Lock()
+
+DEFAULT_VECTOR_WORKERS = 8
+
+_stats = {'queries': 0, 'vector_timeouts': 0, 'vector_errors': 0, 'lexical_only': 0, 'fused': 0}
+_stats_lock = threading.Lock()
+
+
+def _get_pool(app):
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = int(app.config.get('MEMORY_VECTOR_WORKERS') or DEFAULT_VECTOR_WORKERS)
+                _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='memory-vector')
+    return _pool
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Merge ranked lists of texts with reciprocal rank fusion
+
+    Texts are matched across lists by dedupe_text, so the same memory found by
+    both legs is counted once with both contributions.
+
+    Returns:
+        dict: dedupe key -> {'text', 'score'}
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, text in enumerate(ranking):
+            key = dedupe_text(text)
+            entry = fused.setdefault(key, {'text': text, 'score': 0.0})
+            entry['score'] += 1.0 / (k + rank + 1)
+    return fused
+
+
+def recency_boost(timestamp, now, weight, half_life_days):
+    """Multiplier in [1, 1 + weight] that halves its bonus every half_life_days"""
+    if timestamp is None or weight <= 0 or half_life_days <= 0:
+        return 1.0
+    age_days = max((now - timestamp).total_seconds() / 86400.0, 0.0)
+    return 1.0 + weight * math.pow(0.5, age_days / half_life_days)
+
+
+def _latest_timestamps(user_id, persona, texts):
+    """Newest chat_messages timestamp for each text (vector matches carry no dates)"""
+    if not texts:
+        return {}
+    try:
+        rows = db.session.query(ChatMessage.content, func.max(ChatMessage.timestamp)).filter(
+            ChatMessage.user_id == user_id,
+            func.lower(ChatMessage.persona) == persona.lower(),
+            ChatMessage.content.in_(texts)
+        ).group_by(ChatMessage.content).all()
+    except Exception as e:
+        current_app.logger.debug(f"Memory timestamp lookup skip: {e}")
+        return {}
+    return {content: timestamp for content, timestamp in rows if timestamp is not None}
+
+
+def _vector_leg(app, user_id, persona, query_text, top_k):
+    with app.app_context():
+        return retrieve_chunks(user_id, persona, query_text, top_k=top_k)
+
+
+def retrieve_memory(user_id, persona, query_text, top_k=5):
+    """
+    Retrieve relevant memory chunks with hybrid lexical + vector search
+
+    Drop-in replacement for pinecone_service.retrieve_chunks.
+
+    Returns:
+        list: Up to top_k memory texts, best first
+    """
+    config = current_app.config
+    if not config.get('MEMORY_HYBRID_ENABLED', True):
+        return retrieve_chunks(user_id, persona, query_text, top_k=top_k)
+
+    _count('queries')
+    app = current_app._get_current_object()
+    started = time.monotonic()
+    candidates = max(top_k, int(config.get('MEMORY_LEXICAL_CANDIDATES', 20)))
+
+    vector_future = _get_pool(app).submit(_vector_leg, app, str(user_id), persona, query_text, candidates)
+    lexical = search_chat_messages(user_id, persona, query_text, limit=candidates)
+
+    budget = config.get('MEMORY_VECTOR_BUDGET_MS', 800) / 1000.0
+    try:
+        vector = vector_future.result(timeout=max(budget - (time.monotonic() - started), 0))
+    except FutureTimeout:
+        _count('vector_timeouts')
+        current_app.logger.debug(f"Vector memory over {budget * 1000:.0f}ms budget, using lexical results")
+        vector = []
+    except Exception as e:
+        _count('vector_errors')
+        current_app.logger.debug(f"Vector memory failed, using lexical results: {e}")
+        vector = []
+
+    if not lexical:
+        return vector[:top_k]
+    _count('fused' if vector else 'lexical_only')
+
+    fused = reciprocal_rank_fusion([vector, [hit['text'] for hit in lexical]], k=config.get('MEMORY_RRF_K', 60))
+
+    timestamps = {dedupe_text(hit['text']): hit['timestamp'] for hit in lexical}
+    undated = [entry['text'] for key, entry in fused.items() if key not in timestamps]
+    for text, timestamp in _latest_timestamps(user_id, persona, undated).items():
+        timestamps[dedupe_text(text)] = timestamp
+
+    now = datetime.utcnow()
+    weight = config.get('MEMORY_RECENCY_WEIGHT', 0.3)
+    half_life = config.get('MEMORY_RECENCY_HALF_LIFE_DAYS', 30)
+    for key, entry in fused.items():
+        timestamp = timestamps.get(key)
+        if isinstance(timestamp, str):  # Raw SQL on SQLite returns timestamps as text
+            try:
+                timestamp = datetime.fromisoformat(timestamp)
+            except ValueError:
+                timestamp = None
+        entry['score'] *= recency_boost(timestamp, now, weight, half_life)
+
+    ranked = sorted(fused.values(), key=lambda entry: entry['score'], reverse=True)
+    return [entry['text'] for entry in ranked[:top_k]]
+
+
+def get_memory_retrieval_stats():
+    """Hybrid retrieval counters, for health/debug endpoints"""
+    with _stats_lock:
+        return dict(_stats)
@@ -1,11 +1,21 @@
 """
 Pinecone vector database service for MyBella
 Handles embeddings storage and retrieval for chat memory
+
+Storage goes through the active VectorStore (backend/services/vector_store):
+Pinecone when configured, otherwise the local NumPy backend.
 """
 
 import logging
-import requests
 from flask import current_app
+from backend.services import http_client
+from backend.services.chat.embedding_cache import get_embedding_cache
+from backend.services.chat.retrieval_cache import get_retrieval_cache
+from backend.services.vector_store import get_vector_store, vector_id
+
+EMBEDDING_URL = "https://api.openai.com/v1/embeddings"
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBED_BATCH_SIZE = 256  # Inputs per embeddings request (API allows up to 2048)
 
 # Global Pinecone client and index
 pc = None
@@ -30,7 +40,7 @@ def initialize_pinecone(app):
             if pinecone_index_name not in existing:
                 pc.create_index(
                     name=pinecone_index_name,
-                    dimension=1536,
+                    dimension=app.config.get('EMBEDDING_DIMENSIONS') or 1536,
                     metric="cosine",
                     spec=ServerlessSpec(cloud="aws", region=pinecone_env)
                 )
@@ -45,91 +55,192 @@ def initialize_pinecone(app):
         app.logger.warning(f"Pinecone init skipped: {e}")
         pinecone_ok = False
 
-def embed_text(text):
-    """Create text embedding using OpenAI API"""
+def _chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def embed_texts(texts, model=None):
+    """
+    Create embeddings for several texts using the OpenAI API
+    
+    Texts already in the embedding cache aren't sent again. The rest go out
+    EMBED_BATCH_SIZE at a time, so a whole chat turn (or a batch of turns)
+    costs one round-trip instead of one per message.
+    
+    Args:
+        model: Embedding model (defaults to EMBEDDING_MODEL; the reindex CLI
+            passes another one when migrating models)
+    
+    EMBEDDING_DIMENSIONS asks text-embedding-3 models for shortened vectors
+    (cheaper to store and search); cached entries are kept per size.
+    
+    Returns:
+        list or None: Embeddings in the same order as texts, or None on failure
+    """
     openai_api_key = current_app.config.get('OPENAI_API_KEY')
-    if not openai_api_key:
+    if not openai_api_key or not texts:
         return None
     
+    model = model or EMBEDDING_MODEL
+    dimensions = current_app.config.get('EMBEDDING_DIMENSIONS')
+    cache_model = f"{model}@{dimensions}" if dimensions else model
     try:
-        url = "https://api.openai.com/v1/embeddings"
+        texts = list(texts)
+        cache = get_embedding_cache()
+        vectors = cache.get_many(cache_model, texts) if cache else [None] * len(texts)
+        # Each distinct uncached text is embedded once, even if it repeats in texts
+        pending = list(dict.fromkeys(text for text, vec in zip(texts, vectors) if vec is None))
+        if not pending:
+            return vectors
+        
         headers = {
             "Authorization": f"Bearer {openai_api_key}",
             "Content-Type": "application/json"
         }
-        payload = {
-            "model": "text-embedding-3-small",
-            "input": text
-        }
+        fresh = []
+        
+        for batch in _chunked(pending, EMBED_BATCH_SIZE):
+            payload = {
+                "model": model,
+                "input": batch
+            }
+            if dimensions:
+                payload["dimensions"] = dimensions
+            
+            response = http_client.post('openai', EMBEDDING_URL, headers=headers, json=payload)
+            response.raise_for_status()
+            data = sorted(response.json()["data"], key=lambda item: item["index"])
+            fresh.extend(item["embedding"] for item in data)
+        
+        if cache:
+            try:
+                cache.put_many(cache_model, pending, fresh)
+            except Exception as e:
+                current_app.logger.debug(f"Embedding cache write skip: {e}")
         
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
-        return response.json()["data"][0]["embedding"]
+        by_text = dict(zip(pending, fresh))
+        return [vec if vec is not None else by_text[text] for text, vec in zip(texts, vectors)]
         
     except Exception as e:
         current_app.logger.debug(f"Embed failed: {e}")
         return None
 
-def pinecone_upsert(user_id, persona, text):
-    """Store text embedding in Pinecone"""
-    if not pinecone_ok or not index:
-        return
+def embed_text(text):
+    """Create text embedding using OpenAI API"""
+    vectors = embed_texts([text])
+    return vectors[0] if vectors else None
+
+def pinecone_upsert_many(items, raise_errors=False, store=None, model=None):
+    """
+    Store several text embeddings in the vector store
     
-    vec = embed_text(text)
-    if not vec:
-        return
+    Embeds every text in one request and upserts them together. Vector IDs
+    are content-addressed, so repeats of a message (including near-identical
+    short ones) within the batch or across turns collapse into one vector.
+    Errors are logged and swallowed unless raise_errors is set (used by the
+    job queue so failed upserts get retried).
+    
+    Args:
+        items: Iterable of (user_id, persona, text) tuples
+        store: Target VectorStore (defaults to the active one)
+        model: Embedding model (defaults to EMBEDDING_MODEL)
+    
+    Returns:
+        int: Number of vectors written
+    """
+    store = store or get_vector_store()
+    if store is None:
+        return 0
+    
+    unique = {}
+    for user_id, persona, text in items:
+        if text:
+            unique.setdefault(vector_id(user_id, persona, text), (user_id, persona, text))
+    if not unique:
+        return 0
+    items = list(unique.values())
+    
+    vectors = embed_texts([text for _, _, text in items], model=model)
+    if not vectors:
+        if raise_errors and current_app.config.get('OPENAI_API_KEY'):
+            raise RuntimeError("Embedding request failed")
+        return 0
     
     try:
-        vector_id = f"{user_id}:{persona}:{str(abs(hash(text)))[:12]}"
-        index.upsert([{
-            "id": vector_id,
+        records = [{
+            "id": record_id,
             "values": vec,
             "metadata": {
                 "user_id": user_id,
                 "persona": persona,
                 "text": text
             }
-        }])
+        } for (record_id, (user_id, persona, text)), vec in zip(unique.items(), vectors)]
+        
+        store.upsert(records)
+        if store is get_vector_store() and get_retrieval_cache():
+            get_retrieval_cache().apply_upsert(records)
+        return len(records)
     except Exception as e:
-        current_app.logger.debug(f"Pinecone upsert skip: {e}")
+        if raise_errors:
+            raise
+        current_app.logger.debug(f"Vector upsert skip ({store.name}): {e}")
+        return 0
+
+def pinecone_upsert(user_id, persona, text, raise_errors=False):
+    """
+    Store text embedding in the vector store
+    
+    Errors are logged and swallowed unless raise_errors is set (used by the
+    job queue so failed upserts get retried).
+    """
+    pinecone_upsert_many([(user_id, persona, text)], raise_errors=raise_errors)
 
 def pinecone_delete_persona(user_id, persona):
     """Delete all vectors for a specific user and persona"""
-    if not pinecone_ok or not index:
+    store = get_vector_store()
+    if store is None:
         return
     
     try:
-        index.delete(filter={"user_id": user_id, "persona": persona})
+        store.delete(user_id, persona)
     except Exception as e:
-        current_app.logger.debug(f"Pinecone delete skip: {e}")
+        current_app.logger.debug(f"Vector delete skip ({store.name}): {e}")
+    
+    # After the delete, so a query racing it can't re-cache deleted vectors
+    if get_retrieval_cache():
+        get_retrieval_cache().invalidate(user_id, persona)
 
 def retrieve_chunks(user_id, persona, query_text, top_k=5):
-    """Retrieve relevant text chunks from Pinecone based on query"""
+    """
+    Retrieve relevant text chunks from the vector store based on query
+    
+    Queries close to a recent one in the same conversation are answered from
+    the retrieval cache without a vector query.
+    """
     chunks = []
+    store = get_vector_store()
     
     try:
-        if pinecone_ok and current_app.config.get('OPENAI_API_KEY'):
+        if store is not None and current_app.config.get('OPENAI_API_KEY'):
             query_vector = embed_text(query_text)
             if not query_vector:
                 return chunks
             
-            result = index.query(
-                vector=query_vector,
-                top_k=top_k,
-                include_metadata=True
-            )
-            
-            # Handle both dict and object response formats
-            matches = result.get('matches') if isinstance(result, dict) else getattr(result, 'matches', []) or []
+            cache = get_retrieval_cache()
+            matches = cache.lookup(user_id, persona, query_vector, top_k) if cache else None
+            if matches is None:
+                matches = store.query(query_vector, user_id, persona, top_k=top_k)
+                if cache:
+                    cache.store(user_id, persona, query_vector, top_k, matches)
             
-            for match in matches:
-                metadata = match.get("metadata", {})
-                if (metadata.get("user_id") == user_id and 
-                    metadata.get("persona", "").lower() == persona.lower()):
-                    chunks.append(metadata.get("text", ""))
+            # Imported here: memory_deletion needs the job queue, whose handlers import this module
+            from backend.services.chat.memory_deletion import filter_tombstoned_matches
+            for match in filter_tombstoned_matches(user_id, persona, matches):
+                chunks.append(match['metadata'].get("text", ""))
                     
     except Exception as e:
-        current_app.logger.debug(f"Pinecone retrieve skip: {e}")
+        current_app.logger.debug(f"Vector retrieve skip: {e}")
     
     return chunks[:top_k]
 
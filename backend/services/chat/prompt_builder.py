@@ -0,0 +1,165 @@
+"""
+Prompt assembly for MyBella chat
+Lays out chat requests so provider-side prompt caching can reuse the prefix:
+the per-persona/mode instructions come first and never change between turns,
+then the rolling summary and recent history (append-only between summaries),
+and only then the per-turn parts (retrieved memories, mood tone) right before
+the user message.
+
+Cached-token counts reported by the API are tracked so the hit rate can be
+checked on /health/readyz.
+"""
+
+import hashlib
+import threading
+from functools import lru_cache
+
+from flask import current_app
+
+from backend.services.mood_service import MoodService
+
+MODE_INSTRUCTIONS = {
+    "Wellness": "Avoid romance or intimacy; focus on CBT-style reframing, journaling, and supportive check-ins.",
+}
+
+
+class PromptTemplate:
+    """Compiled static system prompt for one persona and mode"""
+
+    def __init__(self, persona, mode):
+        self.persona = persona
+        self.mode = mode
+
+        parts = [f"You are {persona}, an empathetic AI companion in {mode} mode. Be concise, warm, and supportive."]
+        if mode in MODE_INSTRUCTIONS:
+            parts.append(MODE_INSTRUCTIONS[mode])
+
+        self.static_prompt = " ".join(parts)
+        # Routes requests sharing this prefix to the same cache shard
+        self.cache_key = "mybella-" + hashlib.sha1(self.static_prompt.encode('utf-8')).hexdigest()[:16]
+
+
+@lru_cache(maxsize=256)
+def get_prompt_template(persona, mode):
+    """Get the compiled template for a persona/mode (built once per process)"""
+    return PromptTemplate(persona, mode)
+
+
+def build_dynamic_context(retrieved_chunks=None, user_id=None, mood_context=None):
+    """
+    Build the per-turn context block (remembered notes and mood tone)
+
+    Returns:
+        str or None: Context for a system message placed just before the user message
+    """
+    parts = []
+
+    if retrieved_chunks:
+        notes = "\n".join(f"- {chunk}" for chunk in retrieved_chunks)
+        parts.append(f"Use these remembered notes if relevant:\n{notes}")
+
+    # 🎭 MOOD-AWARE TONE ADJUSTMENT
+    if mood_context is None and user_id:
+        mood_context = MoodService.get_mood_context(user_id)
+    if mood_context and mood_context.get('has_recent_mood'):
+        parts.append(MoodService.format_mood_section(mood_context))
+
+    return "\n\n".join(parts) if parts else None
+
+
+def build_chat_messages(user_text, persona, mode, retrieved_chunks=None, user_id=None, mood_context=None,
+                        history=None):
+    """
+    Assemble chat messages in cache-friendly order
+
+    Args:
+        user_text: User's message
+        persona: Persona name
+        mode: Chat mode
+        retrieved_chunks: Memory chunks from vector database
+        user_id: User ID for mood-aware tone adjustment
+        mood_context: Pre-fetched MoodService.get_mood_context() result (optional)
+        history: context_builder.build_context_window() result (optional)
+
+    Returns:
+        tuple: (messages list, PromptTemplate)
+    """
+    template = get_prompt_template(persona, mode)
+    messages = [{"role": "system", "content": template.static_prompt}]
+
+    if history:
+        memory_parts = []
+        if history.get('summary'):
+            memory_parts.append(f"Summary of earlier conversation:\n{history['summary']}")
+        if history.get('facts'):
+            memory_parts.append("Things to remember about the user:\n" + "\n".join(f"- {f}" for f in history['facts']))
+        if memory_parts:
+            messages.append({"role": "system", "content": "\n\n".join(memory_parts)})
+        messages.extend(history.get('messages') or [])
+
+    dynamic = build_dynamic_context(retrieved_chunks, user_id=user_id, mood_context=mood_context)
+    if dynamic:
+        messages.append({"role": "system", "content": dynamic})
+
+    messages.append({"role": "user", "content": user_text})
+    return messages, template
+
+
+class PromptCacheStats:
+    """Running totals of prompt and cached prompt tokens reported by the API"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.requests_with_hits = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, usage):
+        """
+        Record an API usage block
+
+        Returns:
+            int: Cached prompt tokens for this request
+        """
+        if not usage:
+            return 0
+
+        details = usage.get('prompt_tokens_details') or {}
+        cached = details.get('cached_tokens') or 0
+
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += usage.get('prompt_tokens') or 0
+            self.cached_tokens += cached
+            if cached:
+                self.requests_with_hits += 1
+        return cached
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'requests_with_hits': self.requests_with_hits,
+            'prompt_tokens': self.prompt_tokens,
+            'cached_tokens': self.cached_tokens,
+            'cached_ratio': round(self.cached_tokens / self.prompt_tokens, 3) if self.prompt_tokens else 0.0,
+        }
+
+
+# Global stats (process-wide, like the HTTP client stats)
+prompt_cache_stats = PromptCacheStats()
+
+
+def record_prompt_usage(usage, label='chat'):
+    """Record the usage block of a chat completion and log its prefix-cache hit"""
+    cached = prompt_cache_stats.record(usage)
+    if usage:
+        current_app.logger.debug(
+            f"[{label}] prompt_tokens={usage.get('prompt_tokens')} cached_tokens={cached}"
+        )
+    return cached
+
+
+def get_prompt_cache_stats():
+    """Prompt-cache totals, for health/debug endpoints"""
+    return prompt_cache_stats.stats()
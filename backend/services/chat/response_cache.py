@@ -0,0 +1,179 @@
+"""
+Response cache for MyBella chat
+Opt-in cache (RESPONSE_CACHE_ENABLED=1) for short, low-context openers
+("hi", "I'm feeling anxious today") that would otherwise get an identical
+system prompt and a fresh LLM call every time.
+
+Entries are partitioned by persona, mode and mood bucket (the system prompt
+inputs) and matched by normalized fingerprint first, then by embedding
+similarity. Each entry collects a few reply variants before it starts
+serving them, so cached replies don't feel canned.
+"""
+
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from flask import current_app
+
+from backend.services.chat.pinecone_service import embed_text
+
+_NON_WORD = re.compile(r"[^\w\s']+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_prompt(text):
+    """Lowercase, drop punctuation/emoji and collapse whitespace"""
+    text = _NON_WORD.sub(' ', (text or '').lower())
+    return _SPACES.sub(' ', text).strip()
+
+
+def mood_bucket(mood_context):
+    """Bucket mood context by the tone adjustment it adds to the system prompt"""
+    if not mood_context or not mood_context.get('tone_adjustment'):
+        return 'none'
+    return hashlib.sha1(mood_context['tone_adjustment'].encode('utf-8')).hexdigest()[:8]
+
+
+class ResponseCache:
+    """Thread-safe LRU + TTL cache of chat replies with embedding-similarity lookup"""
+
+    def __init__(self, max_entries=2000, ttl=3600, similarity=0.95, variants=3, max_chars=80):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.variants = variants
+        self.max_chars = max_chars
+        self._entries = OrderedDict()  # (partition, fingerprint) -> entry dict
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def is_cacheable(self, user_text):
+        """Only short openers are worth caching"""
+        normalized = normalize_prompt(user_text)
+        return bool(normalized) and len(normalized) <= self.max_chars
+
+    def lookup(self, user_text, persona, mode, bucket):
+        """
+        Find a cached reply for this prompt
+
+        Returns:
+            str or None: A randomly sampled variant, or None on a miss (including
+            entries that are still collecting variants)
+        """
+        partition = (persona.lower(), mode, bucket)
+        fingerprint = normalize_prompt(user_text)
+
+        with self._lock:
+            self._expire()
+            entry = self._entries.get((partition, fingerprint))
+
+        if entry is None:
+            entry = self._similar_entry(partition, fingerprint)
+
+        with self._lock:
+            if entry is None or len(entry['variants']) < self.variants:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(entry['key'])
+            self.hits += 1
+            return random.choice(entry['variants'])
+
+    def store(self, user_text, persona, mode, bucket, reply):
+        """Add reply as a variant for this prompt (creating the entry if needed)"""
+        partition = (persona.lower(), mode, bucket)
+        fingerprint = normalize_prompt(user_text)
+        key = (partition, fingerprint)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # Duplicates are kept: sampling then follows how often the model gives each reply
+                if len(entry['variants']) < self.variants:
+                    entry['variants'].append(reply)
+                self._entries.move_to_end(key)
+                return
+
+        vector = self._embed(fingerprint)
+
+        with self._lock:
+            self._entries[key] = {
+                'key': key,
+                'vector': vector,
+                'variants': [reply],
+                'created_at': time.time(),
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _similar_entry(self, partition, fingerprint):
+        """Closest entry in the same partition by cosine similarity, if above threshold"""
+        with self._lock:
+            candidates = [e for (p, _), e in self._entries.items() if p == partition and e['vector'] is not None]
+        if not candidates:
+            return None
+
+        query = self._embed(fingerprint)
+        if query is None:
+            return None
+
+        matrix = np.stack([e['vector'] for e in candidates])
+        scores = matrix @ query
+        best = int(np.argmax(scores))
+        return candidates[best] if scores[best] >= self.similarity else None
+
+    def _embed(self, text):
+        """Unit-normalized embedding, or None when embeddings are unavailable"""
+        values = embed_text(text)
+        if not values:
+            return None
+        vector = np.asarray(values, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        expired = [key for key, entry in self._entries.items() if entry['created_at'] < cutoff]
+        for key in expired:
+            del self._entries[key]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+# Global cache (created on first use when enabled)
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Get the response cache, or None when RESPONSE_CACHE_ENABLED is off"""
+    global _cache
+
+    config = current_app.config
+    if not config.get('RESPONSE_CACHE_ENABLED'):
+        return None
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    max_entries=config.get('RESPONSE_CACHE_MAX_ENTRIES', 2000),
+                    ttl=config.get('RESPONSE_CACHE_TTL', 3600),
+                    similarity=config.get('RESPONSE_CACHE_SIMILARITY', 0.95),
+                    variants=config.get('RESPONSE_CACHE_VARIANTS', 3),
+                    max_chars=config.get('RESPONSE_CACHE_MAX_CHARS', 80),
+                )
+    return _cache
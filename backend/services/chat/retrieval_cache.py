@@ -0,0 +1,172 @@
+"""
+Retrieval cache for MyBella chat memory
+Per-conversation cache of recent vector query results. During back-and-forth
+chatting the next message usually asks about the same things, so a query
+whose embedding is close enough to a cached query's reuses its matches
+instead of running another vector query.
+
+Writes go through the cache: every vector upsert is scored against the
+cached queries of its conversation and slotted into their result lists, and
+deleting a persona's memory drops its entries. A TTL bounds staleness from
+writes made by another process (a separately run job worker).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from flask import current_app
+
+
+def _unit(values):
+    vector = np.asarray(values, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+
+class RetrievalCache:
+    """Thread-safe LRU of conversations, each holding a few (query vector, matches) entries"""
+
+    def __init__(self, max_conversations=5000, entries_per_conversation=4, similarity=0.92, ttl=600):
+        self.max_conversations = max_conversations
+        self.entries_per_conversation = entries_per_conversation
+        self.similarity = similarity
+        self.ttl = ttl
+        self._conversations = OrderedDict()  # (user_id, persona) -> list of entry dicts, newest last
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.patches = 0
+
+    @staticmethod
+    def _key(user_id, persona):
+        return str(user_id), (persona or '').lower()
+
+    def lookup(self, user_id, persona, query_vector, top_k):
+        """
+        Cached matches for a query close to this one
+
+        Returns:
+            list or None: Up to top_k {'id', 'score', 'metadata'} dicts, or None on a miss
+        """
+        query = _unit(query_vector)
+        key = self._key(user_id, persona)
+        cutoff = time.time() - self.ttl
+
+        with self._lock:
+            entries = [e for e in self._conversations.get(key, []) if e['created_at'] >= cutoff]
+            best, best_score = None, self.similarity
+            for entry in entries:
+                if entry['top_k'] < top_k or query is None:
+                    continue
+                score = float(entry['query'] @ query)
+                if score >= best_score:
+                    best, best_score = entry, score
+
+            if best is None:
+                self.misses += 1
+                return None
+
+            self._conversations.move_to_end(key)
+            self.hits += 1
+            return [dict(match) for match in best['matches'][:top_k]]
+
+    def store(self, user_id, persona, query_vector, top_k, matches):
+        """Remember the matches a vector query returned"""
+        query = _unit(query_vector)
+        if query is None:
+            return
+        key = self._key(user_id, persona)
+
+        with self._lock:
+            entries = self._conversations.setdefault(key, [])
+            entries.append({
+                'query': query,
+                'top_k': top_k,
+                'matches': [dict(match) for match in matches],
+                'created_at': time.time(),
+            })
+            del entries[:-self.entries_per_conversation]
+            self._conversations.move_to_end(key)
+            while len(self._conversations) > self.max_conversations:
+                self._conversations.popitem(last=False)
+
+    def apply_upsert(self, records):
+        """
+        Patch cached results with freshly upserted vectors
+
+        Each record is scored against the cached queries of its conversation
+        and inserted where it ranks, exactly as a new query would return it.
+        """
+        with self._lock:
+            for record in records:
+                metadata = record.get('metadata') or {}
+                entries = self._conversations.get(self._key(metadata.get('user_id'), metadata.get('persona')))
+                if not entries:
+                    continue
+
+                vector = _unit(record['values'])
+                if vector is None:
+                    continue
+
+                for entry in entries:
+                    matches = [m for m in entry['matches'] if m['id'] != record['id']]
+                    score = float(entry['query'] @ vector)
+                    if len(matches) >= entry['top_k'] and score <= matches[-1]['score']:
+                        continue
+                    matches.append({'id': record['id'], 'score': score, 'metadata': dict(metadata)})
+                    matches.sort(key=lambda m: m['score'], reverse=True)
+                    entry['matches'] = matches[:entry['top_k']]
+                    self.patches += 1
+
+    def invalidate(self, user_id, persona):
+        with self._lock:
+            self._conversations.pop(self._key(user_id, persona), None)
+
+    def invalidate_user(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            for key in [key for key in self._conversations if key[0] == user_id]:
+                del self._conversations[key]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'conversations': len(self._conversations),
+                'hits': self.hits,
+                'misses': self.misses,
+                'patches': self.patches,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+# Global cache (created on first use when enabled)
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_retrieval_cache():
+    """Get the retrieval cache, or None when RETRIEVAL_CACHE_ENABLED is off"""
+    global _cache
+
+    config = current_app.config
+    if not config.get('RETRIEVAL_CACHE_ENABLED', True):
+        return None
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RetrievalCache(
+                    max_conversations=config.get('RETRIEVAL_CACHE_MAX_CONVERSATIONS', 5000),
+                    entries_per_conversation=config.get('RETRIEVAL_CACHE_ENTRIES', 4),
+                    similarity=config.get('RETRIEVAL_CACHE_SIMILARITY', 0.92),
+                    ttl=config.get('RETRIEVAL_CACHE_TTL', 600),
+                )
+    return _cache
+
+
+def get_retrieval_cache_stats():
+    """Cache hit/miss/patch counts, for health/debug endpoints"""
+    return _cache.stats() if _cache else {}
@@ -0,0 +1,123 @@
+"""
+Stage executor for MyBella chat requests
+Runs independent per-request stages (DB lookups, crisis check, memory retrieval)
+concurrently on a shared bounded thread pool and records per-stage timings
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from flask import current_app
+
+# Shared pool for all requests - bounded so a traffic spike can't spawn unbounded threads
+_pool = None
+_pool_lock = threading.Lock()
+
+DEFAULT_STAGE_WORKERS = 8
+
+
+def _get_pool(app):
+    """Create the shared stage pool on first use (size from CHAT_STAGE_WORKERS)"""
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = int(app.config.get('CHAT_STAGE_WORKERS') or DEFAULT_STAGE_WORKERS)
+                _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='chat-stage')
+
+    return _pool
+
+
+class StageExecutor:
+    """
+    Request-scoped fan-out of independent stages
+
+    Usage:
+        stages = StageExecutor()
+        stages.submit('crisis', detect_crisis, user_text)
+        stages.submit('chunks', retrieve_chunks, user_id, persona, user_text)
+        results = stages.join()
+
+        with stages.timed('llm'):
+            ...
+
+        response.headers['Server-Timing'] = stages.server_timing()
+
+    Each stage runs inside its own app context, so it gets its own database
+    session - stages must return plain values rather than ORM objects.
+    """
+
+    def __init__(self, app=None):
+        self.app = app or current_app._get_current_object()
+        self.timings = {}
+        self._futures = {}
+        self._started = time.perf_counter()
+
+    def submit(self, name, func, *args, **kwargs):
+        """Schedule a stage on the shared pool"""
+        self._futures[name] = _get_pool(self.app).submit(self._run, name, func, args, kwargs)
+        return self
+
+    def _run(self, name, func, args, kwargs):
+        start = time.perf_counter()
+        try:
+            with self.app.app_context():
+                return func(*args, **kwargs)
+        finally:
+            self.timings[name] = (time.perf_counter() - start) * 1000
+
+    def join(self):
+        """
+        Wait for every submitted stage
+
+        Returns:
+            dict: Stage name -> result
+
+        Raises:
+            The first stage exception (after all stages have finished), so a
+            failing stage behaves as it did when stages ran inline.
+        """
+        start = time.perf_counter()
+        results = {}
+        error = None
+
+        for name, future in self._futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                if error is None:
+                    error = e
+
+        self.timings['join'] = (time.perf_counter() - start) * 1000
+        self._futures = {}
+
+        if error is not None:
+            raise error
+
+        return results
+
+    @contextmanager
+    def timed(self, name):
+        """Record the duration of an inline (non-parallel) stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = (time.perf_counter() - start) * 1000
+
+    def total_ms(self):
+        """Wall-clock time since the executor was created"""
+        return (time.perf_counter() - self._started) * 1000
+
+    def server_timing(self):
+        """Format timings as a Server-Timing header value (visible in browser devtools)"""
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.timings.items()]
+        parts.append(f"total;dur={self.total_ms():.1f}")
+        return ", ".join(parts)
+
+    def log_timings(self, label='chat'):
+        """Write per-stage timings to the app debug log"""
+        summary = " ".join(f"{name}={ms:.1f}ms" for name, ms in self.timings.items())
+        self.app.logger.debug(f"[{label}] stages {summary} total={self.total_ms():.1f}ms")
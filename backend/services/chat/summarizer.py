@@ -0,0 +1,176 @@
+"""
+Incremental conversation summarizer for MyBella
+Keeps each persona conversation's rolling ConversationMemory row up to date:
+summary, key_topics, user_mood and important_facts.
+
+A run only reads messages newer than the row's summarized_through_id
+checkpoint and asks the model to merge them into the stored fields, so its
+cost depends on how much was said since the last run, not on history length.
+Conversations of the same user queued together (the memory.summarize batch
+job) share one LLM request, up to MEMORY_SUMMARY_BATCH_CONVERSATIONS at a
+time. A request never mixes users: one user's transcript must not reach
+another user's prompt, and a reply is mapped back to conversations by index,
+so text in one user's messages can't rewrite another user's summary.
+
+These fields are personal data derived from the messages: memory_deletion
+clears or drops the row along with them, and data_export's memory export
+includes it.
+"""
+
+import json
+import re
+from datetime import datetime
+
+from flask import current_app
+
+from backend.database.models.models import db
+from backend.database.models.memory_models import ChatMessage
+from backend.services.chat.context_builder import get_rolling_memory, load_facts
+from backend.services.llm import get_llm_router
+
+MAX_TOPICS = 10
+MAX_FACTS = 20
+# Completion tokens per conversation on top of the summary (topics, mood, facts, JSON syntax)
+FIELD_TOKENS = 200
+
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def pending_messages(user_id, persona, checkpoint, limit):
+    """Messages of a conversation not yet folded into its summary, oldest first"""
+    return ChatMessage.query.filter(
+        ChatMessage.user_id == user_id,
+        ChatMessage.persona == persona,
+        ChatMessage.id > checkpoint
+    ).order_by(ChatMessage.id).limit(limit).all()
+
+
+def summarize_conversations(conversations):
+    """
+    Fold new messages into the summaries of the given conversations
+
+    Args:
+        conversations: Iterable of (user_id, persona, persona_id); duplicates are merged
+
+    Raises on API errors or an unreadable reply so the job queue retries;
+    groups that finished before the error keep their progress.
+    """
+    router = get_llm_router()
+    if not router.providers:
+        return
+
+    config = current_app.config
+    limit = config.get('CONTEXT_SUMMARY_BATCH', 100)
+    group_size = max(1, config.get('MEMORY_SUMMARY_BATCH_CONVERSATIONS', 8))
+
+    work, seen = {}, set()  # user_id -> [(memory, pending)]
+    for user_id, persona, persona_id in conversations:
+        if (user_id, persona) in seen:
+            continue
+        seen.add((user_id, persona))
+
+        memory = get_rolling_memory(user_id, persona, persona_id=persona_id, create=True)
+        pending = pending_messages(user_id, persona, memory.summarized_through_id or 0, limit)
+        if pending:
+            work.setdefault(user_id, []).append((memory, pending))
+    db.session.commit()
+
+    for user_work in work.values():
+        for start in range(0, len(user_work), group_size):
+            group = user_work[start:start + group_size]
+            updates = _request_updates(router, group)
+            for i, (memory, pending) in enumerate(group):
+                if i in updates:
+                    apply_update(memory, updates[i], pending)
+            db.session.commit()
+
+
+def apply_update(memory, update, pending):
+    """Store a conversation's merged summary fields and move its checkpoint past pending"""
+    summary = (update.get('summary') or '').strip()
+    if summary:
+        memory.summary = summary
+
+    topics = [str(t).strip() for t in update.get('key_topics') or [] if str(t).strip()]
+    if topics:
+        memory.key_topics = ','.join(t.replace(',', ' ') for t in topics[:MAX_TOPICS])
+
+    mood = (update.get('user_mood') or '').strip()
+    if mood:
+        memory.user_mood = mood[:50]
+
+    facts = [str(f).strip() for f in update.get('important_facts') or [] if str(f).strip()]
+    if facts:
+        memory.important_facts = json.dumps(facts[:MAX_FACTS])
+
+    memory.summarized_through_id = pending[-1].id
+    memory.message_count = (memory.message_count or 0) + len(pending)
+    memory.last_updated = datetime.utcnow()
+
+
+def _conversation_block(index, memory, pending):
+    persona = memory.persona
+    transcript = "\n".join(f"{'User' if m.role == 'user' else persona}: {m.content}" for m in pending)
+    current = {
+        'summary': memory.summary or '',
+        'key_topics': memory.key_topics.split(',') if memory.key_topics else [],
+        'user_mood': memory.user_mood or '',
+        'important_facts': load_facts(memory),
+    }
+    return (f"### Conversation {index} (user with {persona})\n"
+            f"Current state: {json.dumps(current, ensure_ascii=False)}\n"
+            f"New messages:\n{transcript}")
+
+
+def _request_updates(router, group):
+    """
+    One LLM request for a group of conversations, all of the same user
+
+    Returns:
+        dict: conversation index -> updated fields
+    """
+    from backend.services.chat.chat_service import CHAT_MODEL
+
+    summary_tokens = current_app.config.get('CONTEXT_SUMMARY_TOKENS', 300)
+    payload = {
+        "model": CHAT_MODEL,
+        "messages": [
+            {
+                "role": "system",
+                "content": (
+                    "You maintain memory for conversations between a user and an AI companion. For each "
+                    "conversation, merge the new messages into its current state and return the updated state. "
+                    "summary: third person, facts about the user, people and events they mentioned, feelings "
+                    f"and ongoing topics, no small talk, under {summary_tokens} tokens. "
+                    f"key_topics: up to {MAX_TOPICS} short topic labels, most relevant first. "
+                    "user_mood: one or two words for the user's current mood. "
+                    f"important_facts: up to {MAX_FACTS} short lasting facts about the user worth remembering. "
+                    'Reply with JSON only: {"conversations": [{"id": <number>, "summary": "...", '
+                    '"key_topics": [...], "user_mood": "...", "important_facts": [...]}]}'
+                )
+            },
+            {
+                "role": "user",
+                "content": "\n\n".join(
+                    _conversation_block(i, memory, pending) for i, (memory, pending) in enumerate(group)
+                )
+            }
+        ],
+        "temperature": 0.2,
+        "max_tokens": (summary_tokens + FIELD_TOKENS) * len(group),
+        "response_format": {"type": "json_object"}
+    }
+
+    result = router.complete(payload)
+    content = _FENCE.sub('', result["choices"][0]["message"]["content"].strip())
+    data = json.loads(content)
+
+    updates = {}
+    for item in data.get('conversations') or []:
+        try:
+            index = int(item.get('id'))
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < len(group):
+            updates[index] = item
+    return updates
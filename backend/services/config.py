@@ -36,9 +36,140 @@ def configure_app(app):
         PINECONE_API_KEY=os.getenv("PINECONE_API_KEY", ""),
         PINECONE_ENV=os.getenv("PINECONE_ENVIRONMENT", "us-east-1"),
         PINECONE_INDEX=os.getenv("PINECONE_INDEX", "mybella-memory"),
-        MAX_UPLOAD_MB=int(os.getenv("MAX_UPLOAD_MB", "10"))
+        MAX_UPLOAD_MB=int(os.getenv("MAX_UPLOAD_MB", "10")),
+        CHAT_STAGE_WORKERS=int(os.getenv("CHAT_STAGE_WORKERS", "8")),  # Shared pool for parallel pre-chat lookups
+        HTTP2_ENABLED=os.getenv("HTTP2_ENABLED", "0") == "1",  # Needs httpx[http2]; falls back to HTTP/1.1 keep-alive
+        HTTP_PREWARM=os.getenv("HTTP_PREWARM", "1") == "1"  # Open upstream connections at startup
     )
 
+    # Upstream HTTP pools (see backend/services/http_client.py): timeouts in seconds, requests in flight per service
+    app.config['HTTP_OPENAI_CONNECT_TIMEOUT'] = float(os.getenv("HTTP_OPENAI_CONNECT_TIMEOUT", "5"))
+    app.config['HTTP_OPENAI_TIMEOUT'] = float(os.getenv("HTTP_OPENAI_TIMEOUT", "30"))
+    app.config['HTTP_OPENAI_MAX_CONCURRENCY'] = int(os.getenv("HTTP_OPENAI_MAX_CONCURRENCY", "32"))
+    app.config['HTTP_ELEVENLABS_CONNECT_TIMEOUT'] = float(os.getenv("HTTP_ELEVENLABS_CONNECT_TIMEOUT", "5"))
+    app.config['HTTP_ELEVENLABS_TIMEOUT'] = float(os.getenv("HTTP_ELEVENLABS_TIMEOUT", "60"))
+    app.config['HTTP_ELEVENLABS_MAX_CONCURRENCY'] = int(os.getenv("HTTP_ELEVENLABS_MAX_CONCURRENCY", "8"))
+    # LLM fallback endpoint pool; empty = the OpenAI pool's defaults
+    app.config['HTTP_LLM_FALLBACK_CONNECT_TIMEOUT'] = float(os.getenv("HTTP_LLM_FALLBACK_CONNECT_TIMEOUT") or 0) or None
+    app.config['HTTP_LLM_FALLBACK_TIMEOUT'] = float(os.getenv("HTTP_LLM_FALLBACK_TIMEOUT") or 0) or None
+    app.config['HTTP_LLM_FALLBACK_MAX_CONCURRENCY'] = int(os.getenv("HTTP_LLM_FALLBACK_MAX_CONCURRENCY") or 0) or None
+
+    # Background job queue (separate SQLite file so job writes never lock the app DB)
+    app.config['JOB_QUEUE_DB'] = os.getenv(
+        "JOB_QUEUE_DB", os.path.abspath(os.path.join('backend', 'database', 'instances', 'jobs.db'))
+    )
+    app.config['JOB_MAX_ATTEMPTS'] = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+    # Batchable jobs (vector upserts) wait this long for jobs from later turns, then run together
+    app.config['JOB_BATCH_WINDOW'] = float(os.getenv("JOB_BATCH_WINDOW", "0.25"))
+    app.config['JOB_BATCH_SIZE'] = int(os.getenv("JOB_BATCH_SIZE", "100"))
+    # Set to 0 when running `python -m backend.services.jobs.worker` separately
+    app.config['JOB_WORKER_IN_PROCESS'] = os.getenv("JOB_WORKER_IN_PROCESS", "1") == "1"
+    # Long-running job types get their own worker lane so they never hold up chat side effects
+    app.config['JOB_SLOW_TYPES'] = [t.strip() for t in os.getenv(
+        "JOB_SLOW_TYPES", "memory.delete,data.export").split(',') if t.strip()]
+    # A claimed job whose worker stops heartbeating for this long is handed to another worker
+    app.config['JOB_VISIBILITY_TIMEOUT'] = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "120"))
+
+    # Embedding cache keyed by (model, sha256(text)): in-process LRU over a shared SQLite file
+    app.config['EMBEDDING_CACHE_ENABLED'] = os.getenv("EMBEDDING_CACHE_ENABLED", "1") == "1"
+    app.config['EMBEDDING_CACHE_DB'] = os.getenv(
+        "EMBEDDING_CACHE_DB", os.path.abspath(os.path.join('backend', 'database', 'instances', 'embeddings.db'))
+    )
+    app.config['EMBEDDING_CACHE_MEMORY_ENTRIES'] = int(os.getenv("EMBEDDING_CACHE_MEMORY_ENTRIES", "2048"))
+    app.config['EMBEDDING_CACHE_MAX_ENTRIES'] = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+
+    # Vector memory backend: auto (Pinecone if configured, else local), pinecone, local or none
+    app.config['VECTOR_STORE'] = os.getenv("VECTOR_STORE", "auto")
+    app.config['VECTOR_STORE_DIR'] = os.getenv(
+        "VECTOR_STORE_DIR", os.path.abspath(os.path.join('backend', 'database', 'instances', 'vectors'))
+    )
+    # Local shards with at least this many vectors get an IVF index with int8 codes (0 = always exact search)
+    app.config['LOCAL_ANN_MIN_VECTORS'] = int(os.getenv("LOCAL_ANN_MIN_VECTORS", "5000"))
+    app.config['LOCAL_ANN_NPROBE'] = int(os.getenv("LOCAL_ANN_NPROBE", "12"))  # IVF lists scanned per query
+    # Shortened text-embedding-3 output (e.g. 512); empty = the model's full size. Changing it needs a reindex
+    app.config['EMBEDDING_DIMENSIONS'] = int(os.getenv("EMBEDDING_DIMENSIONS") or 0) or None
+    # Also search vectors written before per-user namespaces (turn off once they are reindexed)
+    app.config['PINECONE_LEGACY_FALLBACK'] = os.getenv("PINECONE_LEGACY_FALLBACK", "1") == "1"
+
+    # Per-conversation cache of vector query results, patched on every upsert
+    app.config['RETRIEVAL_CACHE_ENABLED'] = os.getenv("RETRIEVAL_CACHE_ENABLED", "1") == "1"
+    # Queries at least this similar to a cached one in the conversation reuse its matches
+    app.config['RETRIEVAL_CACHE_SIMILARITY'] = float(os.getenv("RETRIEVAL_CACHE_SIMILARITY", "0.92"))
+    app.config['RETRIEVAL_CACHE_TTL'] = int(os.getenv("RETRIEVAL_CACHE_TTL", "600"))
+    app.config['RETRIEVAL_CACHE_ENTRIES'] = int(os.getenv("RETRIEVAL_CACHE_ENTRIES", "4"))
+    app.config['RETRIEVAL_CACHE_MAX_CONVERSATIONS'] = int(os.getenv("RETRIEVAL_CACHE_MAX_CONVERSATIONS", "5000"))
+    # Background memory deletion: messages deleted per chunk (one commit and progress update each)
+    app.config['MEMORY_DELETE_CHUNK_SIZE'] = int(os.getenv("MEMORY_DELETE_CHUNK_SIZE", "500"))
+    # Streaming data export: rows fetched per keyset batch; background export files and how long they are kept
+    app.config['EXPORT_BATCH_SIZE'] = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+    app.config['EXPORT_DIR'] = os.getenv(
+        "EXPORT_DIR", os.path.abspath(os.path.join('backend', 'database', 'instances', 'exports'))
+    )
+    app.config['EXPORT_RETENTION_HOURS'] = int(os.getenv("EXPORT_RETENTION_HOURS", "24"))
+    # Message search: matches are counted on the first page only, up to this many (more show as "1000+")
+    app.config['SEARCH_COUNT_CAP'] = int(os.getenv("SEARCH_COUNT_CAP", "1000"))
+
+    # Hybrid memory retrieval: BM25 over chat history fused with vector search (reciprocal rank fusion)
+    app.config['MEMORY_HYBRID_ENABLED'] = os.getenv("MEMORY_HYBRID_ENABLED", "1") == "1"
+    # Past this the vector leg is dropped and the turn uses lexical results only
+    app.config['MEMORY_VECTOR_BUDGET_MS'] = int(os.getenv("MEMORY_VECTOR_BUDGET_MS", "800"))
+    app.config['MEMORY_VECTOR_WORKERS'] = int(os.getenv("MEMORY_VECTOR_WORKERS", "8"))
+    app.config['MEMORY_LEXICAL_CANDIDATES'] = int(os.getenv("MEMORY_LEXICAL_CANDIDATES", "20"))
+    app.config['MEMORY_RRF_K'] = int(os.getenv("MEMORY_RRF_K", "60"))
+    app.config['MEMORY_RECENCY_WEIGHT'] = float(os.getenv("MEMORY_RECENCY_WEIGHT", "0.3"))
+    app.config['MEMORY_RECENCY_HALF_LIFE_DAYS'] = float(os.getenv("MEMORY_RECENCY_HALF_LIFE_DAYS", "30"))
+
+    # Opt-in response cache for short, low-context openers (see backend/services/chat/response_cache.py)
+    app.config['RESPONSE_CACHE_ENABLED'] = os.getenv("RESPONSE_CACHE_ENABLED", "0") == "1"
+    app.config['RESPONSE_CACHE_TTL'] = int(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+    app.config['RESPONSE_CACHE_MAX_ENTRIES'] = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+    app.config['RESPONSE_CACHE_SIMILARITY'] = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95"))
+    app.config['RESPONSE_CACHE_VARIANTS'] = int(os.getenv("RESPONSE_CACHE_VARIANTS", "3"))
+    app.config['RESPONSE_CACHE_MAX_CHARS'] = int(os.getenv("RESPONSE_CACHE_MAX_CHARS", "80"))
+
+    # /api/chat idempotency: duplicates of a client_message_id wait for or replay the first response
+    app.config['IDEMPOTENCY_TTL'] = int(os.getenv("IDEMPOTENCY_TTL", "300"))
+    app.config['IDEMPOTENCY_MAX_ENTRIES'] = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+    app.config['IDEMPOTENCY_WAIT_TIMEOUT'] = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "60"))
+
+    # Admission control for LLM/TTS-bound endpoints (see backend/services/admission.py)
+    app.config['ADMISSION_ENABLED'] = os.getenv("ADMISSION_ENABLED", "1") == "1"
+    app.config['ADMISSION_MAX_WAIT'] = float(os.getenv("ADMISSION_MAX_WAIT", "10"))  # Longest a request may queue
+    app.config['ADMISSION_CHAT_CONCURRENCY'] = int(os.getenv("ADMISSION_CHAT_CONCURRENCY", "16"))
+    app.config['ADMISSION_CHAT_QUEUE'] = int(os.getenv("ADMISSION_CHAT_QUEUE", "32"))
+    app.config['ADMISSION_TTS_CONCURRENCY'] = int(os.getenv("ADMISSION_TTS_CONCURRENCY", "8"))
+    app.config['ADMISSION_TTS_QUEUE'] = int(os.getenv("ADMISSION_TTS_QUEUE", "16"))
+
+    # LLM providers in priority order (openai, fallback = any OpenAI-compatible endpoint, stub = offline replies)
+    app.config['LLM_PROVIDERS'] = os.getenv("LLM_PROVIDERS", "openai,fallback")
+    app.config['LLM_OPENAI_MODEL'] = os.getenv("LLM_OPENAI_MODEL")  # Defaults to the model in the request payload
+    app.config['LLM_FALLBACK_BASE_URL'] = os.getenv("LLM_FALLBACK_BASE_URL")  # e.g. http://localhost:11434/v1
+    app.config['LLM_FALLBACK_API_KEY'] = os.getenv("LLM_FALLBACK_API_KEY")
+    app.config['LLM_FALLBACK_MODEL'] = os.getenv("LLM_FALLBACK_MODEL")
+    # Whether the fallback endpoint accepts response_format json_object (dropped from its requests otherwise)
+    app.config['LLM_FALLBACK_JSON_MODE'] = os.getenv("LLM_FALLBACK_JSON_MODE", "0") == "1"
+    app.config['LLM_TIMEOUT'] = float(os.getenv("LLM_TIMEOUT", "20"))  # Overall deadline across hedges and failover
+    app.config['LLM_HEDGE_ENABLED'] = os.getenv("LLM_HEDGE_ENABLED", "1") == "1"
+    app.config['LLM_HEDGE_QUANTILE'] = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+    app.config['LLM_HEDGE_MIN_DELAY'] = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.5"))
+    app.config['LLM_HEDGE_BUDGET'] = float(os.getenv("LLM_HEDGE_BUDGET", "0.1"))
+    app.config['LLM_BREAKER_FAILURES'] = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+    app.config['LLM_BREAKER_RESET'] = float(os.getenv("LLM_BREAKER_RESET", "30"))
+    # Threads for completions and hedges (0 = ADMISSION_CHAT_CONCURRENCY x 2 + 4, so every admitted request can hedge)
+    app.config['LLM_MAX_WORKERS'] = int(os.getenv("LLM_MAX_WORKERS", "0"))
+
+    # Multi-turn context: recent turns up to a token budget, older turns folded into a rolling summary
+    app.config['CONTEXT_HISTORY_TOKENS'] = int(os.getenv("CONTEXT_HISTORY_TOKENS", "1500"))
+    app.config['CONTEXT_MAX_MESSAGES'] = int(os.getenv("CONTEXT_MAX_MESSAGES", "50"))
+    app.config['CONTEXT_SUMMARY_TOKENS'] = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "300"))
+    # Most new messages of one conversation folded into its summary per summarizer run
+    app.config['CONTEXT_SUMMARY_BATCH'] = int(os.getenv("CONTEXT_SUMMARY_BATCH", "100"))
+    # Turns already covered by the summary that are still sent verbatim
+    app.config['CONTEXT_RECENT_TURNS'] = int(os.getenv("CONTEXT_RECENT_TURNS", "6"))
+    # Summarize once this many turns are unsummarized; conversations (of one user) per summarizer LLM request
+    app.config['MEMORY_SUMMARY_MIN_MESSAGES'] = int(os.getenv("MEMORY_SUMMARY_MIN_MESSAGES", "10"))
+    app.config['MEMORY_SUMMARY_BATCH_CONVERSATIONS'] = int(os.getenv("MEMORY_SUMMARY_BATCH_CONVERSATIONS", "8"))
+
     # File upload limits
     app.config["MAX_CONTENT_LENGTH"] = app.config["MAX_UPLOAD_MB"] * 1024 * 1024
 
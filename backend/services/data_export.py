@@ -0,0 +1,306 @@
+"""
+Streaming data export for MyBella
+Exports are produced row by row: each table is walked in keyset batches on
+(timestamp, id), selecting plain columns so no ORM objects build up in the
+session, and serialized incrementally as JSON or NDJSON. Memory use stays
+flat however long a user's history is.
+
+An export can be streamed straight into a response (export_response), or
+written by a 'data.export' job to a gzip/zip file the user downloads later
+(request_export / run_export).
+"""
+
+import gzip
+import json
+import os
+import uuid
+import zipfile
+from datetime import datetime, timedelta
+
+from flask import Response, current_app, stream_with_context
+from sqlalchemy import and_, or_
+
+from backend.database.models.models import db, User, UserSettings, Message, Chat
+from backend.database.models.memory_models import ChatMessage, ConversationMemory, DataExport
+from backend.services.chat.context_builder import ROLLING_SESSION_ID, load_facts
+from backend.services.jobs import enqueue_jobs
+from backend.services.memory_service import MemoryService
+
+FORMATS = ('json', 'ndjson')
+COMPRESSIONS = ('gzip', 'zip')
+DEFAULT_BATCH_SIZE = 1000
+FLUSH_BYTES = 64 * 1024
+
+MIMETYPES = {'json': 'application/json', 'ndjson': 'application/x-ndjson'}
+
+
+def _batch_size():
+    return int(current_app.config.get('EXPORT_BATCH_SIZE') or DEFAULT_BATCH_SIZE)
+
+
+def iter_rows(columns, filters, timestamp_column, id_column, batch_size=None):
+    """
+    Yield rows as dicts ordered by (timestamp, id), one keyset batch at a time
+
+    Each batch is a fresh indexed range query starting after the last row of
+    the previous one, so deep batches cost the same as the first and no
+    long-lived cursor holds the database.
+    """
+    batch_size = batch_size or _batch_size()
+    names = [column.key for column in columns]
+    timestamp_at, id_at = names.index(timestamp_column.key), names.index(id_column.key)
+    last = None
+
+    while True:
+        query = db.session.query(*columns).filter(*filters)
+        if last is not None:
+            last_timestamp, last_id = last
+            if last_timestamp is None:  # NULL timestamps sort first
+                after = or_(timestamp_column.isnot(None), and_(timestamp_column.is_(None), id_column > last_id))
+            else:
+                after = or_(timestamp_column > last_timestamp,
+                            and_(timestamp_column == last_timestamp, id_column > last_id))
+            query = query.filter(after)
+
+        rows = query.order_by(timestamp_column.asc().nulls_first(), id_column).limit(batch_size).all()
+        for row in rows:
+            yield dict(zip(names, row))
+        if len(rows) < batch_size:
+            return
+        last = (rows[-1][timestamp_at], rows[-1][id_at])
+
+
+def _rolling_summaries(user_id):
+    """What the summarizer remembers about a user: one row per persona"""
+    memories = ConversationMemory.query.filter_by(user_id=user_id, session_id=ROLLING_SESSION_ID) \
+        .order_by(ConversationMemory.id)
+    for memory in memories:
+        yield {
+            'persona': memory.persona,
+            'summary': memory.summary,
+            'key_topics': memory.key_topics.split(',') if memory.key_topics else [],
+            'user_mood': memory.user_mood,
+            'important_facts': load_facts(memory),
+            'last_updated': memory.last_updated,
+        }
+
+
+def memory_export(user_id):
+    """
+    A user's chat memory export: messages, then the rolling summaries and
+    facts drawn from them
+
+    Returns:
+        tuple: (header dict, [(section name, row iterator factory)])
+    """
+    user = db.session.get(User, user_id)
+    header = {
+        'user_id': user_id,
+        'user': {'id': user.id, 'name': user.name, 'email': user.email} if user else None,
+        'export_date': datetime.utcnow().isoformat(),
+        'total_messages': ChatMessage.query.filter_by(user_id=user_id).count(),
+        'preferences': MemoryService.get_user_preferences(user_id),
+        'stats': MemoryService.get_conversation_stats(user_id),
+    }
+    columns = [ChatMessage.id, ChatMessage.role, ChatMessage.content, ChatMessage.persona,
+               ChatMessage.timestamp, ChatMessage.sentiment]
+    sections = [
+        ('messages', lambda: iter_rows(columns, [ChatMessage.user_id == user_id],
+                                       ChatMessage.timestamp, ChatMessage.id)),
+        ('summaries', lambda: _rolling_summaries(user_id)),
+    ]
+    return header, sections
+
+
+def user_data_export(user_id):
+    """
+    Everything stored for a user (admin export)
+
+    Returns:
+        tuple: (header dict, [(section name, row iterator factory)]), or None if the user doesn't exist
+    """
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+
+    settings = UserSettings.query.filter_by(user_id=user_id).first()
+    header = {
+        'user_info': {
+            'id': user.id,
+            'name': user.name,
+            'email': user.email,
+            'role': user.role,
+            'active': user.active,
+            'created_at': user.created_at.isoformat() if user.created_at else None
+        },
+        'settings': {
+            'current_persona': settings.current_persona,
+            'mode': settings.mode,
+            'tts_enabled': settings.tts_enabled,
+            'age_confirmed': settings.age_confirmed,
+            'show_ads': settings.show_ads,
+        } if settings else None,
+        'export_timestamp': datetime.utcnow().isoformat(),
+    }
+    message_columns = [Message.id, Message.role, Message.content, Message.persona, Message.timestamp]
+    chat_columns = [Chat.id, Chat.title, Chat.persona, Chat.mode, Chat.created_at, Chat.updated_at]
+    sections = [
+        ('messages', lambda: iter_rows(message_columns, [Message.user_id == user_id], Message.timestamp, Message.id)),
+        ('chats', lambda: iter_rows(chat_columns, [Chat.user_id == user_id], Chat.created_at, Chat.id)),
+    ]
+    return header, sections
+
+
+EXPORTS = {'memories': memory_export, 'user_data': user_data_export}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _dumps(value):
+    return json.dumps(value, default=_json_default, ensure_ascii=False)
+
+
+def _render_json(header, sections):
+    yield '{' + ', '.join(f"{_dumps(key)}: {_dumps(value)}" for key, value in header.items())
+    separator = ', ' if header else ''
+    for name, rows in sections:
+        yield f"{separator}{_dumps(name)}: ["
+        separator = ', '
+        for i, row in enumerate(rows()):
+            yield (', ' if i else '') + _dumps(row)
+        yield ']'
+    yield '}\n'
+
+
+def _render_ndjson(header, sections):
+    yield _dumps({'section': 'header', 'data': header}) + '\n'
+    for name, rows in sections:
+        for row in rows():
+            yield _dumps({'section': name, 'data': row}) + '\n'
+
+
+def render_export(header, sections, fmt='json'):
+    """Yield the export as text chunks of roughly FLUSH_BYTES"""
+    pieces = _render_ndjson(header, sections) if fmt == 'ndjson' else _render_json(header, sections)
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= FLUSH_BYTES:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def export_response(kind, user_id, fmt='json'):
+    """
+    Streaming download response for an export
+
+    Returns:
+        Response or None: None if there is nothing to export (unknown user)
+    """
+    export = EXPORTS[kind](user_id)
+    if export is None:
+        return None
+
+    header, sections = export
+    filename = f"mybella_{kind}_{user_id}_{datetime.utcnow().strftime('%Y%m%d')}.{fmt}"
+    return Response(
+        stream_with_context(render_export(header, sections, fmt)),
+        mimetype=MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+
+def request_export(user_id, kind='memories', fmt='ndjson', compression='gzip', requested_by=None):
+    """
+    Record a background export and queue it
+
+    Returns:
+        DataExport: The pending export (poll it via get_export)
+    """
+    export = DataExport(user_id=user_id, requested_by=requested_by, kind=kind, format=fmt,
+                        compression=compression, status='pending')
+    db.session.add(export)
+    db.session.commit()
+    enqueue_jobs([('data.export', {'export_id': export.id})])
+    return export
+
+
+def get_export(export_id, user_id=None):
+    """An export (optionally only if it belongs to user_id), or None"""
+    query = DataExport.query.filter_by(id=export_id)
+    if user_id is not None:
+        query = query.filter_by(user_id=user_id)
+    return query.first()
+
+
+def run_export(export_id):
+    """
+    Write an export to a compressed file (the 'data.export' job)
+
+    The file is written under a temporary name and renamed when complete,
+    so a download never sees a partial file.
+    """
+    export = db.session.get(DataExport, export_id)
+    if export is None or export.status == 'done':
+        return
+
+    export.status = 'running'
+    export.error = None
+    db.session.commit()
+
+    directory = current_app.config['EXPORT_DIR']
+    extension = 'zip' if export.compression == 'zip' else f'{export.format}.gz'
+    path = os.path.join(directory, f"{export.user_id}-{uuid.uuid4().hex}.{extension}")
+    tmp_path = f"{path}.tmp"
+
+    try:
+        os.makedirs(directory, exist_ok=True)
+        header, sections = EXPORTS[export.kind](export.user_id)
+        chunks = render_export(header, sections, export.format)
+        if export.compression == 'zip':
+            with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                with archive.open(f"mybella_{export.kind}.{export.format}", 'w', force_zip64=True) as f:
+                    for chunk in chunks:
+                        f.write(chunk.encode('utf-8'))
+        else:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        os.replace(tmp_path, path)
+
+        export.path = path
+        export.size_bytes = os.path.getsize(path)
+        export.status = 'done'
+        export.completed_at = datetime.utcnow()
+        export.expires_at = export.completed_at + timedelta(hours=current_app.config.get('EXPORT_RETENTION_HOURS', 24))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        export.status = 'failed'
+        export.error = str(e)[:500]
+        db.session.commit()
+        raise
+
+    purge_expired_exports()
+
+
+def purge_expired_exports():
+    """Remove export files past their retention"""
+    expired = DataExport.query.filter(DataExport.status == 'done', DataExport.expires_at < datetime.utcnow()).all()
+    for export in expired:
+        try:
+            os.remove(export.path)
+        except (FileNotFoundError, TypeError):
+            pass
+        export.status = 'expired'
+    if expired:
+        db.session.commit()
@@ -4,8 +4,8 @@ Handles voice synthesis and voice uploading
 """
 
 import base64
-import requests
 from flask import current_app, session
+from backend.services import http_client
 from backend.database.utils.utils import get_persona_voice_id, set_persona_voice_id
 
 def generate_speech(text, persona, user_id, voice_id=None):
@@ -36,7 +36,7 @@ def generate_speech(text, persona, user_id, voice_id=None):
             }
         }
         
-        response = requests.post(tts_url, headers=headers, json=payload, timeout=60)
+        response = http_client.post('elevenlabs', tts_url, headers=headers, json=payload)
         response.raise_for_status()
         
         audio_b64 = base64.b64encode(response.content).decode('utf-8')
@@ -83,7 +83,8 @@ def upload_voice(file, voice_name, persona, user_id):
         data = {"name": voice_name}
         
         # Try primary upload method
-        response = requests.post(
+        response = http_client.post(
+            'elevenlabs',
             url,
             headers=headers,
             files={"files": (file.filename, file.stream, file.mimetype or "audio/mpeg")},
@@ -105,7 +106,8 @@ def upload_voice(file, voice_name, persona, user_id):
             except Exception:
                 pass
             
-            response2 = requests.post(
+            response2 = http_client.post(
+                'elevenlabs',
                 url,
                 headers=headers,
                 files={"file": (file.filename, file.stream, file.mimetype or "audio/mpeg")},
@@ -156,10 +158,10 @@ def upload_voice(file, voice_name, persona, user_id):
 def _find_voice_by_name(voice_name, api_key):
     """Find voice ID by name in user's ElevenLabs voices"""
     try:
-        response = requests.get(
+        response = http_client.get(
+            'elevenlabs',
             "https://api.elevenlabs.io/v1/voices",
-            headers={"xi-api-key": api_key},
-            timeout=60
+            headers={"xi-api-key": api_key}
         )
         voices_data = response.json()
         
@@ -48,19 +48,31 @@ def initialize_firebase(app):
         app.logger.warning(f"Firestore init skipped: {e}")
         firebase_ok = False
 
-def store_message_firestore(user_id, persona, role, text):
-    """Store a message in Firestore"""
+def store_message_firestore(user_id, persona, role, text, message_id=None, raise_errors=False):
+    """
+    Store a message in Firestore (raise_errors lets the job queue retry failures)
+    
+    With a message_id (the ChatMessage id) the document is stored under that id,
+    so a retried job overwrites instead of duplicating and deletes can find it.
+    """
     if not firebase_ok or not fstore:
         return
     
     try:
         collection_name = current_app.config.get('FIREBASE_DB_COLLECTION', 'mybella')
-        fstore.collection(collection_name).document(user_id).collection("chats").add({
+        chats = fstore.collection(collection_name).document(user_id).collection("chats")
+        data = {
             "persona": persona,
             "role": role,
             "text": text
-        })
+        }
+        if message_id is None:
+            chats.add(data)
+        else:
+            chats.document(str(message_id)).set(dict(data, message_id=message_id))
     except Exception as e:
+        if raise_errors:
+            raise
         current_app.logger.debug(f"Firestore store skip: {e}")
 
 def get_persona_voice_id(user_id, persona):
@@ -91,27 +103,69 @@ def set_persona_voice_id(user_id, persona, voice_id):
     except Exception as e:
         current_app.logger.debug(f"Firestore persona voice set skip: {e}")
 
-def delete_persona_chats(user_id, persona):
-    """Delete all chats for a specific persona from Firestore"""
+def _user_chats(user_id):
+    collection_name = current_app.config.get('FIREBASE_DB_COLLECTION', 'mybella')
+    return fstore.collection(collection_name).document(user_id).collection("chats")
+
+def _delete_documents(documents):
+    """Delete streamed documents in batched writes (Firestore allows 500 per batch); returns the count"""
+    batch = fstore.batch()
+    count = 0
+    for doc in documents:
+        batch.delete(doc.reference)
+        count += 1
+        if count % 400 == 0:
+            batch.commit()
+            batch = fstore.batch()
+    batch.commit()
+    return count
+
+def delete_persona_chats(user_id, persona, raise_errors=False):
+    """Delete all chats for a specific persona from Firestore; returns the number deleted"""
     if not firebase_ok or not fstore:
-        return
+        return 0
     
     try:
-        collection_name = current_app.config.get('FIREBASE_DB_COLLECTION', 'mybella')
-        chats = fstore.collection(collection_name).document(user_id).collection("chats").where("persona", "==", persona).stream()
-        
-        batch = fstore.batch()
-        count = 0
-        for chat in chats:
-            batch.delete(chat.reference)
-            count += 1
-            if count % 400 == 0:
-                batch.commit()
-                batch = fstore.batch()
-        batch.commit()
-        
+        return _delete_documents(_user_chats(user_id).where("persona", "==", persona).stream())
     except Exception as e:
+        if raise_errors:
+            raise
         current_app.logger.debug(f"Firestore reset skip: {e}")
+        return 0
+
+def delete_chat_messages(user_id, message_ids, raise_errors=False):
+    """
+    Delete the Firestore copies of specific chat messages; returns the number deleted
+    
+    Copies are looked up by ChatMessage id (their document id). Copies stored
+    before messages were keyed that way aren't matched; a persona or full
+    memory reset removes them.
+    """
+    if not firebase_ok or not fstore or not message_ids:
+        return 0
+    
+    try:
+        chats = _user_chats(user_id)
+        snapshots = fstore.get_all([chats.document(str(message_id)) for message_id in message_ids])
+        return _delete_documents(snapshot for snapshot in snapshots if snapshot.exists)
+    except Exception as e:
+        if raise_errors:
+            raise
+        current_app.logger.debug(f"Firestore message delete skip: {e}")
+        return 0
+
+def delete_user_chats(user_id, raise_errors=False):
+    """Delete every chat a user has in Firestore; returns the number deleted"""
+    if not firebase_ok or not fstore:
+        return 0
+    
+    try:
+        return _delete_documents(_user_chats(user_id).stream())
+    except Exception as e:
+        if raise_errors:
+            raise
+        current_app.logger.debug(f"Firestore user delete skip: {e}")
+        return 0
 
 def get_firebase_status():
     """Get current Firebase connection status"""
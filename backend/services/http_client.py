@@ -0,0 +1,247 @@
+"""
+Shared HTTP client for MyBella
+One pooled, keep-alive client per upstream service (OpenAI, ElevenLabs)
+with per-service timeouts, concurrency caps and optional HTTP/2.
+All outbound API calls should go through here instead of bare requests.post.
+
+Usage:
+    from backend.services import http_client
+
+    response = http_client.post('openai', url, headers=headers, json=payload)
+
+    with http_client.stream_lines('openai', 'POST', url, headers=headers, json=payload) as lines:
+        for line in lines:
+            ...
+"""
+
+import threading
+from contextlib import contextmanager
+
+import requests
+from flask import current_app, has_app_context
+from requests.adapters import HTTPAdapter
+
+# Per-service defaults; the HTTP_<SERVICE>_TIMEOUT / _CONNECT_TIMEOUT / _MAX_CONCURRENCY app config overrides them
+SERVICE_DEFAULTS = {
+    'openai': {
+        'base_url': 'https://api.openai.com',
+        'connect_timeout': 5.0,
+        'timeout': 30.0,
+        'max_concurrency': 32,
+        'api_key_config': 'OPENAI_API_KEY',
+    },
+    'elevenlabs': {
+        'base_url': 'https://api.elevenlabs.io',
+        'connect_timeout': 5.0,
+        'timeout': 60.0,
+        'max_concurrency': 8,
+        'api_key_config': 'ELEVENLABS_API_KEY',
+    },
+}
+
+
+class HTTPClientBusyError(Exception):
+    """Raised when a service's concurrency cap is reached and no slot frees up in time"""
+    pass
+
+
+class ServiceClient:
+    """Pooled client for a single upstream service"""
+
+    def __init__(self, name, base_url, timeout, connect_timeout, max_concurrency, http2=False, acquire_timeout=10.0):
+        self.name = name
+        self.base_url = base_url
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_concurrency = max_concurrency
+        self.acquire_timeout = acquire_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self.requests_made = 0
+        self.rejected = 0
+
+        self.http2 = http2 and _httpx_http2_available()
+        if self.http2:
+            import httpx
+            self._client = httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+                timeout=httpx.Timeout(timeout, connect=connect_timeout)
+            )
+        else:
+            self._client = requests.Session()
+            # Keep up to max_concurrency warm connections per host (default pool is 10)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_concurrency)
+            self._client.mount('https://', adapter)
+            self._client.mount('http://', adapter)
+
+    @contextmanager
+    def _slot(self):
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise HTTPClientBusyError(f"{self.name}: {self.max_concurrency} requests already in flight")
+
+        with self._lock:
+            self._in_flight += 1
+            self.requests_made += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def _timeout(self, timeout):
+        """Translate a requests-style timeout (seconds or (connect, read)) for the active backend"""
+        if timeout is None:
+            timeout = (self.connect_timeout, self.timeout)
+        elif not isinstance(timeout, tuple):
+            timeout = (self.connect_timeout, timeout)
+
+        if self.http2:
+            import httpx
+            return httpx.Timeout(timeout[1], connect=timeout[0])
+        return timeout
+
+    def request(self, method, url, timeout=None, **kwargs):
+        """Send a request and read the full response body"""
+        with self._slot():
+            return self._client.request(method, url, timeout=self._timeout(timeout), **kwargs)
+
+    @contextmanager
+    def stream_lines(self, method, url, timeout=None, **kwargs):
+        """
+        Send a request and iterate over the decoded response lines
+
+        The concurrency slot and connection are held until the block exits.
+        Raises for HTTP error statuses before yielding.
+        """
+        with self._slot():
+            if self.http2:
+                with self._client.stream(method, url, timeout=self._timeout(timeout), **kwargs) as response:
+                    response.raise_for_status()
+                    yield response.iter_lines()
+            else:
+                with self._client.request(method, url, timeout=self._timeout(timeout), stream=True, **kwargs) as response:
+                    response.raise_for_status()
+                    yield response.iter_lines(decode_unicode=True)
+
+    def prewarm(self):
+        """Open a connection (TCP + TLS) so the first real request skips the handshake"""
+        try:
+            self._client.request('HEAD', self.base_url, timeout=self._timeout(None))
+        except Exception:
+            pass
+
+    def stats(self):
+        return {
+            'in_flight': self._in_flight,
+            'max_concurrency': self.max_concurrency,
+            'requests': self.requests_made,
+            'rejected': self.rejected,
+            'http2': self.http2,
+        }
+
+
+def _httpx_http2_available():
+    try:
+        import httpx  # noqa: F401
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+# Global clients (created by init_http_clients, or lazily with defaults)
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _build_client(name, config, http2=False):
+    defaults = SERVICE_DEFAULTS[name]
+    prefix = f"HTTP_{name.upper()}_"
+
+    def setting(key):
+        value = config.get(prefix + key.upper())
+        return defaults[key] if value is None else value
+
+    return ServiceClient(
+        name,
+        base_url=defaults['base_url'],
+        timeout=float(setting('timeout')),
+        connect_timeout=float(setting('connect_timeout')),
+        max_concurrency=int(setting('max_concurrency')),
+        http2=http2,
+    )
+
+
+def init_http_clients(app):
+    """Create the per-service clients and pre-warm connections in the background"""
+    http2 = app.config.get('HTTP2_ENABLED', False)
+
+    with _clients_lock:
+        for name in SERVICE_DEFAULTS:
+            _clients[name] = _build_client(name, app.config, http2=http2)
+
+    if http2 and not _httpx_http2_available():
+        app.logger.warning("HTTP2_ENABLED set but httpx[http2] is not installed; using HTTP/1.1 keep-alive")
+
+    if app.config.get('HTTP_PREWARM', True):
+        # Only warm services that are actually configured
+        names = [name for name, defaults in SERVICE_DEFAULTS.items()
+                 if defaults['api_key_config'] and app.config.get(defaults['api_key_config'])]
+        threading.Thread(target=prewarm_http_clients, args=(names,), name='http-prewarm', daemon=True).start()
+
+
+def register_service(name, base_url, **overrides):
+    """
+    Add an upstream service at runtime (e.g. an extra OpenAI-compatible LLM endpoint)
+
+    overrides can set connect_timeout, timeout and max_concurrency; the
+    HTTP_<NAME>_* app config still takes precedence.
+    """
+    defaults = dict(SERVICE_DEFAULTS['openai'], base_url=base_url, api_key_config=None)
+    defaults.update(overrides)
+
+    with _clients_lock:
+        SERVICE_DEFAULTS[name] = defaults
+        _clients.pop(name, None)
+
+
+def prewarm_http_clients(names=None):
+    for name in names or SERVICE_DEFAULTS:
+        get_client(name).prewarm()
+
+
+def get_client(name):
+    """Get the pooled client for a service"""
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = _build_client(name, current_app.config if has_app_context() else {})
+    return client
+
+
+def request(service, method, url, **kwargs):
+    return get_client(service).request(method, url, **kwargs)
+
+
+def get(service, url, **kwargs):
+    return get_client(service).request('GET', url, **kwargs)
+
+
+def post(service, url, **kwargs):
+    return get_client(service).request('POST', url, **kwargs)
+
+
+def stream_lines(service, method, url, **kwargs):
+    return get_client(service).stream_lines(method, url, **kwargs)
+
+
+def get_http_client_stats():
+    """Per-service pool usage, for health/debug endpoints"""
+    return {name: client.stats() for name, client in _clients.items()}
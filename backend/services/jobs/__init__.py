@@ -0,0 +1,15 @@
+"""
+Job Queue Package
+Durable background jobs for MyBella
+"""
+
+from .job_queue import JobQueue, get_job_queue, enqueue_jobs
+from .worker import init_job_queue, run_worker
+
+__all__ = [
+    'JobQueue',
+    'get_job_queue',
+    'enqueue_jobs',
+    'init_job_queue',
+    'run_worker'
+]
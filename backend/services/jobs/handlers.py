@@ -0,0 +1,85 @@
+"""
+Job handlers for the MyBella job queue
+Maps job types to the functions that perform them. Handlers must raise on
+failure so the queue can retry them.
+"""
+
+from flask import current_app
+from backend.services.firebase.firebase_service import store_message_firestore
+from backend.services.chat.pinecone_service import pinecone_upsert_many
+from backend.services.chat.summarizer import summarize_conversations
+from backend.services.chat.memory_deletion import filter_tombstoned_payloads, run_deletion
+from backend.services.data_export import run_export
+
+_handlers = {}
+_batch_types = set()
+
+
+def job_handler(job_type, batch=False):
+    """
+    Register a function as the handler for job_type
+
+    Batch handlers take a single list of payloads, so the worker can hand
+    them every due job of that type at once.
+    """
+    def decorator(func):
+        _handlers[job_type] = func
+        if batch:
+            _batch_types.add(job_type)
+        return func
+    return decorator
+
+
+def get_handler(job_type):
+    return _handlers.get(job_type)
+
+
+def is_batch_handler(job_type):
+    return job_type in _batch_types
+
+
+def run_inline(job_type, payload):
+    """Run a job immediately in the current app context (no retries)"""
+    handler = get_handler(job_type)
+    if handler is None:
+        current_app.logger.warning(f"No handler for job type {job_type}")
+        return
+
+    try:
+        if is_batch_handler(job_type):
+            handler([payload])
+        else:
+            handler(**payload)
+    except Exception as e:
+        current_app.logger.debug(f"Inline job {job_type} failed: {e}")
+
+
+@job_handler('firestore.store_message')
+def store_message(user_id, persona, role, text, message_id=None):
+    """Copy a chat message to Firestore"""
+    store_message_firestore(user_id, persona, role, text, message_id=message_id, raise_errors=True)
+
+
+@job_handler('memory.upsert', batch=True)
+def memory_upsert(payloads):
+    """Embed chat messages and store them in vector memory (one embedding request for the batch)"""
+    payloads = filter_tombstoned_payloads(payloads)
+    pinecone_upsert_many([(p['user_id'], p['persona'], p['text']) for p in payloads], raise_errors=True)
+
+
+@job_handler('memory.delete')
+def memory_delete(deletion_id):
+    """Delete chat memory from SQL, vector memory and Firestore in chunks"""
+    run_deletion(deletion_id)
+
+
+@job_handler('data.export')
+def data_export(export_id):
+    """Write a user's export to a compressed file for download"""
+    run_export(export_id)
+
+
+@job_handler('memory.summarize', batch=True)
+def memory_summarize(payloads):
+    """Fold new chat turns into conversation summaries (one LLM request per group of conversations)"""
+    summarize_conversations((p['user_id'], p['persona'], p.get('persona_id')) for p in payloads)
@@ -0,0 +1,324 @@
+"""
+Durable job queue for MyBella
+SQLite-backed queue for side effects that don't need to block a response
+(Firestore copies, vector memory upserts). Jobs survive restarts, are retried
+with exponential backoff and dead-lettered after max_attempts.
+"""
+
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_DEAD = 'dead'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_type TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_at REAL NOT NULL,
+    locked_by TEXT,
+    locked_at REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_run_at ON jobs (status, run_at);
+"""
+
+
+class JobQueue:
+    """
+    SQLite job queue safe for multiple threads and processes
+
+    Finished jobs are deleted; failed jobs are rescheduled until they run out
+    of attempts and then kept with status 'dead' for inspection/requeue.
+    Jobs left 'running' by a crashed worker are reclaimed after
+    visibility_timeout seconds; workers extend() the claim on jobs that are
+    still running, so a long job isn't picked up a second time.
+    """
+
+    def __init__(self, db_path, max_attempts=5, backoff_base=2.0, backoff_max=300.0, visibility_timeout=300.0):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.visibility_timeout = visibility_timeout
+        self._local = threading.local()
+        self._wakeup = threading.Condition()
+        self._generation = 0  # Bumped on every enqueue in this process
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        """One connection per thread (sqlite3 connections can't be shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, job_type, payload, delay=0.0, max_attempts=None):
+        """Add one job; returns its id"""
+        return self.enqueue_many([(job_type, payload)], delay=delay, max_attempts=max_attempts)[0]
+
+    def enqueue_many(self, jobs, delay=0.0, max_attempts=None):
+        """
+        Add several jobs in a single transaction
+
+        Args:
+            jobs: Iterable of (job_type, payload dict) tuples
+
+        Returns:
+            list: New job ids
+        """
+        now = time.time()
+        attempts = max_attempts or self.max_attempts
+        conn = self._conn()
+        ids = []
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for job_type, payload in jobs:
+                cursor = conn.execute(
+                    "INSERT INTO jobs (job_type, payload, status, max_attempts, run_at, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (job_type, json.dumps(payload), STATUS_PENDING, attempts, now + delay, now, now)
+                )
+                ids.append(cursor.lastrowid)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        self._notify()
+        return ids
+
+    def claim(self, worker_id, job_types=None, exclude_types=None):
+        """
+        Lock the next due job for this worker
+
+        Args:
+            job_types: Only claim jobs of these types (a worker lane)
+            exclude_types: Never claim jobs of these types
+
+        Returns:
+            dict or None: Job row with decoded payload
+        """
+        now = time.time()
+        conn = self._conn()
+        where, params = '', []
+        if job_types:
+            where += f" AND job_type IN ({', '.join('?' * len(job_types))})"
+            params += list(job_types)
+        if exclude_types:
+            where += f" AND job_type NOT IN ({', '.join('?' * len(exclude_types))})"
+            params += list(exclude_types)
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE "
+                f"((status = ? AND run_at <= ?) OR (status = ? AND locked_at <= ?)){where} "
+                "ORDER BY run_at LIMIT 1",
+                [STATUS_PENDING, now, STATUS_RUNNING, now - self.visibility_timeout] + params
+            ).fetchone()
+
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = ?, locked_by = ?, locked_at = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ?",
+                (STATUS_RUNNING, worker_id, now, now, row['id'])
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        job = dict(row)
+        job['attempts'] += 1
+        job['payload'] = json.loads(job['payload'])
+        return job
+
+    def claim_batch(self, worker_id, job_type, limit):
+        """
+        Lock up to limit due pending jobs of one type for this worker
+
+        Returns:
+            list: Job rows with decoded payloads, oldest first
+        """
+        if limit <= 0:
+            return []
+
+        now = time.time()
+        conn = self._conn()
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE job_type = ? AND status = ? AND run_at <= ? ORDER BY run_at LIMIT ?",
+                (job_type, STATUS_PENDING, now, limit)
+            ).fetchall()
+
+            conn.executemany(
+                "UPDATE jobs SET status = ?, locked_by = ?, locked_at = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ?",
+                [(STATUS_RUNNING, worker_id, now, now, row['id']) for row in rows]
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            job['attempts'] += 1
+            job['payload'] = json.loads(job['payload'])
+            jobs.append(job)
+        return jobs
+
+    def extend(self, worker_id, job_ids):
+        """Restart the visibility timeout of jobs this worker is still running (its heartbeat)"""
+        now = time.time()
+        self._conn().executemany(
+            "UPDATE jobs SET locked_at = ?, updated_at = ? WHERE id = ? AND status = ? AND locked_by = ?",
+            [(now, now, job_id, STATUS_RUNNING, worker_id) for job_id in job_ids]
+        )
+
+    def complete(self, job_id):
+        """Remove a successfully processed job"""
+        self._conn().execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def complete_many(self, job_ids):
+        """Remove several successfully processed jobs"""
+        self._conn().executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
+
+    def fail(self, job, error):
+        """
+        Record a failed attempt: reschedule with backoff or dead-letter
+
+        Returns:
+            str: 'retry' or 'dead'
+        """
+        now = time.time()
+
+        if job['attempts'] >= job['max_attempts']:
+            self._conn().execute(
+                "UPDATE jobs SET status = ?, locked_by = NULL, locked_at = NULL, last_error = ?, updated_at = ? "
+                "WHERE id = ?",
+                (STATUS_DEAD, str(error)[:2000], now, job['id'])
+            )
+            return STATUS_DEAD
+
+        self._conn().execute(
+            "UPDATE jobs SET status = ?, locked_by = NULL, locked_at = NULL, last_error = ?, run_at = ?, updated_at = ? "
+            "WHERE id = ?",
+            (STATUS_PENDING, str(error)[:2000], now + self.backoff_delay(job['attempts']), now, job['id'])
+        )
+        return 'retry'
+
+    def backoff_delay(self, attempts):
+        """Exponential backoff with jitter: base^attempts seconds, capped at backoff_max"""
+        delay = min(self.backoff_max, self.backoff_base ** attempts)
+        return delay * random.uniform(0.5, 1.0)
+
+    def dead_letters(self, limit=50):
+        """List dead-lettered jobs, newest first"""
+        rows = self._conn().execute(
+            "SELECT * FROM jobs WHERE status = ? ORDER BY updated_at DESC LIMIT ?",
+            (STATUS_DEAD, limit)
+        ).fetchall()
+        return [dict(row, payload=json.loads(row['payload'])) for row in rows]
+
+    def requeue_dead(self, job_id=None):
+        """Give dead-lettered jobs (or one of them) a fresh set of attempts; returns count"""
+        now = time.time()
+        query = "UPDATE jobs SET status = ?, attempts = 0, run_at = ?, updated_at = ? WHERE status = ?"
+        params = [STATUS_PENDING, now, now, STATUS_DEAD]
+
+        if job_id is not None:
+            query += " AND id = ?"
+            params.append(job_id)
+
+        cursor = self._conn().execute(query, params)
+        self._notify()
+        return cursor.rowcount
+
+    def stats(self):
+        """Job counts by status"""
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {STATUS_PENDING: 0, STATUS_RUNNING: 0, STATUS_DEAD: 0}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def _notify(self):
+        with self._wakeup:
+            self._generation += 1
+            self._wakeup.notify_all()
+
+    def wait_for_work(self, timeout):
+        """
+        Block until a job is enqueued in this process or timeout elapses
+
+        Returns at once if a job was enqueued since this thread last waited;
+        every waiting worker thread (one per lane) is woken.
+        """
+        with self._wakeup:
+            seen = getattr(self._local, 'seen_generation', self._generation)
+            self._wakeup.wait_for(lambda: self._generation != seen, timeout)
+            self._local.seen_generation = self._generation
+
+
+def default_worker_id():
+    """Identify a worker by host, pid and thread in the locked_by column"""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+# Global queue (set by init_job_queue)
+job_queue = None
+
+
+def set_job_queue(queue):
+    global job_queue
+    job_queue = queue
+
+
+def get_job_queue():
+    """Get the app's job queue (None until init_job_queue has run)"""
+    return job_queue
+
+
+def enqueue_jobs(jobs):
+    """
+    Enqueue (job_type, payload) tuples on the app queue
+
+    Without a configured queue (e.g. one-off scripts) the handlers run
+    inline instead, so side effects are never silently dropped.
+    """
+    jobs = list(jobs)
+
+    if job_queue is not None:
+        return job_queue.enqueue_many(jobs)
+
+    from backend.services.jobs.handlers import run_inline
+    for job_type, payload in jobs:
+        run_inline(job_type, payload)
+    return []
@@ -0,0 +1,250 @@
+"""
+Job worker for MyBella
+Processes the durable job queue, either in background threads of the web
+process (JOB_WORKER_IN_PROCESS=1, the default) or as a separate process:
+
+    python -m backend.services.jobs.worker            # run forever
+    python -m backend.services.jobs.worker --lane slow
+    python -m backend.services.jobs.worker --stats    # queue counts
+    python -m backend.services.jobs.worker --dead     # list dead-lettered jobs
+    python -m backend.services.jobs.worker --requeue-dead
+
+Jobs run in two lanes, each its own worker loop: JOB_SLOW_TYPES (memory
+deletions, exports) in the slow lane and everything else in the default
+lane, so a long deletion never delays Firestore copies or vector upserts.
+While a job runs, its worker heartbeats the claim so other workers don't
+reclaim it after the visibility timeout.
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from backend.services.jobs.job_queue import JobQueue, default_worker_id, set_job_queue, STATUS_DEAD
+from backend.services.jobs.handlers import get_handler, is_batch_handler
+
+
+def init_job_queue(app):
+    """Create the app's job queue and start the in-process worker if enabled"""
+    queue = JobQueue(
+        app.config['JOB_QUEUE_DB'],
+        max_attempts=app.config.get('JOB_MAX_ATTEMPTS', 5),
+        visibility_timeout=app.config.get('JOB_VISIBILITY_TIMEOUT', 120.0)
+    )
+    set_job_queue(queue)
+
+    if app.config.get('JOB_WORKER_IN_PROCESS'):
+        start_worker_threads(app, queue)
+        app.logger.info("Job queue initialized with in-process workers")
+    else:
+        app.logger.info("Job queue initialized (external worker expected)")
+
+    return queue
+
+
+def lanes(app):
+    """{lane name: claim filter} for the default and slow worker lanes"""
+    slow = tuple(app.config.get('JOB_SLOW_TYPES') or ())
+    if not slow:
+        return {'default': {}}
+    return {
+        'default': {'exclude_types': slow},
+        'slow': {'job_types': slow},
+    }
+
+
+@contextmanager
+def heartbeat(queue, worker_id, jobs):
+    """Extend the claim on jobs every third of the visibility timeout until the block exits"""
+    stop = threading.Event()
+    job_ids = [job['id'] for job in jobs]
+
+    def beat():
+        while not stop.wait(queue.visibility_timeout / 3):
+            try:
+                queue.extend(worker_id, job_ids)
+            except Exception:
+                pass  # Database busy; the next beat tries again
+
+    thread = threading.Thread(target=beat, name='job-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def process_next(app, queue, worker_id, job_types=None, exclude_types=None):
+    """
+    Claim and run one job (or one batch, for batch handlers)
+
+    Args:
+        job_types, exclude_types: Which job types this worker's lane claims
+
+    Returns:
+        bool: True if a job was processed (successfully or not)
+    """
+    job = queue.claim(worker_id, job_types=job_types, exclude_types=exclude_types)
+    if job is None:
+        return False
+
+    if is_batch_handler(job['job_type']):
+        process_batch(app, queue, worker_id, job)
+        return True
+
+    try:
+        handler = get_handler(job['job_type'])
+        if handler is None:
+            raise LookupError(f"No handler for job type {job['job_type']}")
+
+        with heartbeat(queue, worker_id, [job]), app.app_context():
+            handler(**job['payload'])
+
+        queue.complete(job['id'])
+
+    except Exception as e:
+        outcome = queue.fail(job, e)
+        log = app.logger.error if outcome == STATUS_DEAD else app.logger.warning
+        log(f"Job {job['id']} ({job['job_type']}) attempt {job['attempts']}/{job['max_attempts']} failed, {outcome}: {e}")
+
+    return True
+
+
+def process_batch(app, queue, worker_id, job):
+    """
+    Run job together with other due jobs of the same type
+
+    Fresh jobs wait until JOB_BATCH_WINDOW seconds after they were enqueued,
+    so jobs from the next few chat turns join the same batch. A failed batch
+    is bisected (see run_bisected) so only the jobs that fail on their own
+    use up an attempt.
+    """
+    window = app.config.get('JOB_BATCH_WINDOW', 0.25)
+    delay = job['created_at'] + window - time.time()
+    if delay > 0:
+        time.sleep(delay)
+
+    jobs = [job] + queue.claim_batch(worker_id, job['job_type'], app.config.get('JOB_BATCH_SIZE', 100) - 1)
+
+    with heartbeat(queue, worker_id, jobs):
+        failures = run_bisected(app, get_handler(job['job_type']), jobs)
+    failed_ids = {failed['id'] for failed, _ in failures}
+    queue.complete_many([j['id'] for j in jobs if j['id'] not in failed_ids])
+
+    for failed, error in failures:
+        outcome = queue.fail(failed, error)
+        log = app.logger.error if outcome == STATUS_DEAD else app.logger.warning
+        log(f"Job {failed['id']} ({failed['job_type']}) attempt {failed['attempts']}/{failed['max_attempts']} "
+            f"failed in batch of {len(jobs)}, {outcome}: {error}")
+
+
+def run_bisected(app, handler, jobs):
+    """
+    Run a batch handler, splitting a failed batch in halves and running each
+    again until the failing jobs are found on their own
+
+    One bad payload costs about 2*log2(n) extra calls instead of failing the
+    whole batch. When nothing has succeeded after that many failed calls the
+    cause is shared (the upstream API is down, say), so the rest of the
+    batch fails without further calls.
+
+    Returns:
+        list: (job, exception) for each job that failed
+    """
+    failures = []
+    budget = 2 * len(jobs).bit_length() + 2
+    failed_calls, succeeded, last_error = 0, False, None
+    pending = [jobs]
+
+    while pending:
+        batch = pending.pop()
+        if not succeeded and failed_calls >= budget:
+            failures.extend((job, last_error) for job in batch)
+            continue
+
+        try:
+            with app.app_context():
+                handler([j['payload'] for j in batch])
+            succeeded = True
+        except Exception as e:
+            failed_calls, last_error = failed_calls + 1, e
+            if len(batch) == 1:
+                failures.append((batch[0], e))
+            else:
+                middle = len(batch) // 2
+                pending += [batch[middle:], batch[:middle]]  # Left half first
+
+    return failures
+
+
+def run_worker(app, queue, stop_event=None, poll_interval=1.0, job_types=None, exclude_types=None):
+    """Process jobs (of one lane, if job_types/exclude_types are given) until stop_event is set"""
+    stop_event = stop_event or threading.Event()
+    worker_id = default_worker_id()
+
+    while not stop_event.is_set():
+        try:
+            if not process_next(app, queue, worker_id, job_types=job_types, exclude_types=exclude_types):
+                queue.wait_for_work(poll_interval)
+        except Exception as e:
+            # Database locked/unavailable - back off and keep the worker alive
+            app.logger.error(f"Job worker error: {e}")
+            stop_event.wait(poll_interval)
+
+
+def start_worker_threads(app, queue, stop_event=None, lane_names=None):
+    """Run a worker per lane in daemon threads of the current process"""
+    threads = []
+    for name, claims in lanes(app).items():
+        if lane_names and name not in lane_names:
+            continue
+        thread = threading.Thread(target=run_worker, args=(app, queue, stop_event), kwargs=claims,
+                                  name=f'job-worker-{name}', daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MyBella job queue worker')
+    parser.add_argument('--stats', action='store_true', help='print job counts by status and exit')
+    parser.add_argument('--dead', action='store_true', help='list dead-lettered jobs and exit')
+    parser.add_argument('--requeue-dead', action='store_true', help='retry all dead-lettered jobs and exit')
+    parser.add_argument('--lane', choices=['all', 'default', 'slow'], default='all',
+                        help='only run one lane (e.g. a separate process for deletions and exports)')
+    args = parser.parse_args()
+
+    # This process is the worker - don't start a second one inside create_app()
+    os.environ['JOB_WORKER_IN_PROCESS'] = '0'
+
+    from backend import create_app
+    from backend.services.jobs.job_queue import get_job_queue
+
+    app, _ = create_app()
+    queue = get_job_queue()
+
+    if args.stats:
+        print(json.dumps(queue.stats(), indent=2))
+    elif args.dead:
+        for job in queue.dead_letters():
+            print(f"#{job['id']} {job['job_type']} attempts={job['attempts']} error={job['last_error']}")
+    elif args.requeue_dead:
+        print(f"Requeued {queue.requeue_dead()} dead job(s)")
+    else:
+        print(f"Job worker ({args.lane} lanes) started on {app.config['JOB_QUEUE_DB']} (Ctrl+C to stop)")
+        stop_event = threading.Event()
+        threads = start_worker_threads(app, queue, stop_event, None if args.lane == 'all' else [args.lane])
+        try:
+            while any(thread.is_alive() for thread in threads):
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            stop_event.set()
+            print("Job worker stopped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+"""
+LLM Package
+Chat completion providers, routing, hedging and failover for MyBella
+"""
+
+from .providers import LLMProvider, OpenAICompatibleProvider, StubProvider, LLMProviderError
+from .circuit_breaker import CircuitBreaker
+from .router import LLMRouter, LLMUnavailableError, init_llm, get_llm_router, set_llm_router, get_llm_stats
+
+__all__ = [
+    'LLMProvider',
+    'OpenAICompatibleProvider',
+    'StubProvider',
+    'LLMProviderError',
+    'CircuitBreaker',
+    'LLMRouter',
+    'LLMUnavailableError',
+    'init_llm',
+    'get_llm_router',
+    'set_llm_router',
+    'get_llm_stats'
+]
@@ -0,0 +1,155 @@
+"""
+LLM providers for MyBella
+Each provider sends an OpenAI-style chat completions payload to one backend
+and returns the OpenAI-style response, so callers don't care which backend
+answered.
+"""
+
+import json
+import time
+
+from backend.services import http_client
+
+
+class LLMProviderError(Exception):
+    """Raised when a provider request fails (network error, bad status, bad body)"""
+    pass
+
+
+class LLMProvider:
+    """
+    Base class for chat completion backends
+
+    Subclasses implement complete() and stream_chunks(). Both take an
+    OpenAI chat completions payload; a provider configured with its own
+    model substitutes it, and one without json_mode drops response_format.
+    """
+
+    name = 'base'
+    json_mode = False  # Accepts response_format {"type": "json_object"}
+
+    def complete(self, payload, timeout=None):
+        """
+        Run a chat completion
+
+        Returns:
+            dict: OpenAI-style response ({'choices': [...], 'usage': {...}})
+        """
+        raise NotImplementedError
+
+    def stream_chunks(self, payload, timeout=None):
+        """
+        Run a streaming chat completion
+
+        Yields:
+            dict: OpenAI-style chat.completion.chunk objects
+        """
+        raise NotImplementedError
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Any /v1/chat/completions endpoint: OpenAI, Azure/OpenRouter proxies, vLLM, Ollama, ..."""
+
+    # Request fields only api.openai.com understands
+    OPENAI_ONLY_PARAMS = ('prompt_cache_key', 'stream_options')
+
+    def __init__(self, name, base_url, api_key, model=None, service=None, json_mode=None):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.url = f"{self.base_url}/chat/completions"
+        self.api_key = api_key
+        self.model = model
+        self.service = service or name
+        self.is_openai = 'api.openai.com' in self.base_url
+        self.json_mode = self.is_openai if json_mode is None else json_mode
+
+    def _headers(self):
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def _payload(self, payload):
+        payload = dict(payload)
+        if self.model:
+            payload['model'] = self.model
+        if not self.is_openai:
+            for param in self.OPENAI_ONLY_PARAMS:
+                payload.pop(param, None)
+        if not self.json_mode:
+            payload.pop('response_format', None)
+        return payload
+
+    def complete(self, payload, timeout=None):
+        try:
+            response = http_client.post(self.service, self.url, headers=self._headers(),
+                                        json=self._payload(payload), timeout=timeout)
+            response.raise_for_status()
+            result = response.json()
+        except Exception as e:
+            raise LLMProviderError(f"{self.name}: {e}") from e
+
+        if not result.get("choices"):
+            raise LLMProviderError(f"{self.name}: response has no choices")
+        return result
+
+    def stream_chunks(self, payload, timeout=None):
+        payload = self._payload(payload)
+        payload["stream"] = True
+
+        try:
+            with http_client.stream_lines(self.service, 'POST', self.url, headers=self._headers(),
+                                          json=payload, timeout=timeout) as lines:
+                for line in lines:
+                    # Server-Sent Events: "data: {...}" lines, ending with "data: [DONE]"
+                    if not line or not line.startswith("data:"):
+                        continue
+
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+
+                    yield json.loads(data)
+        except GeneratorExit:
+            raise
+        except Exception as e:
+            raise LLMProviderError(f"{self.name}: {e}") from e
+
+
+class StubProvider(LLMProvider):
+    """
+    Local provider that answers without any network call
+
+    Used in tests and local development (LLM_PROVIDERS=stub). latency and
+    fail can be set to exercise hedging, circuit breaking and failover.
+    """
+
+    def __init__(self, name='stub', reply="(stub) I hear you: {text}", latency=0.0, fail=False):
+        self.name = name
+        self.reply = reply
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+
+    def _reply(self, payload):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail:
+            raise LLMProviderError(f"{self.name}: simulated failure")
+
+        user_messages = [m for m in payload.get('messages', []) if m.get('role') == 'user']
+        text = user_messages[-1]['content'] if user_messages else ''
+        return self.reply.format(text=text)
+
+    def complete(self, payload, timeout=None):
+        reply = self._reply(payload)
+        return {
+            "choices": [{"message": {"role": "assistant", "content": reply}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "prompt_tokens_details": {"cached_tokens": 0}},
+        }
+
+    def stream_chunks(self, payload, timeout=None):
+        reply = self._reply(payload)
+        for i, word in enumerate(reply.split(' ')):
+            yield {"choices": [{"delta": {"content": (' ' if i else '') + word}}]}
@@ -0,0 +1,306 @@
+"""
+LLM router for MyBella
+Sends chat completions to the first healthy provider in priority order.
+
+- Hedging: if a request hasn't answered by the provider's observed p95
+  latency, a second identical request is fired and the first reply wins.
+- Circuit breaking: a provider that keeps failing is skipped until its
+  cool-down passes.
+- Failover: errors and timeouts move on to the next provider within one
+  overall deadline, instead of tying up the worker for the full timeout.
+
+Usage:
+    from backend.services.llm import get_llm_router
+
+    result = get_llm_router().complete(payload)
+    for chunk in get_llm_router().stream(payload):
+        ...
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from flask import current_app
+
+from backend.services import http_client
+from backend.services.llm.circuit_breaker import CircuitBreaker
+from backend.services.llm.providers import OpenAICompatibleProvider, StubProvider, LLMProviderError
+
+# Pool threads one completion can hold at once: the primary request and its hedge
+HEDGE_FAN_OUT = 2
+
+
+class LLMUnavailableError(Exception):
+    """Raised when no provider could answer within the deadline"""
+    pass
+
+
+class LatencyTracker:
+    """Rolling window of successful request latencies for one provider"""
+
+    def __init__(self, window=200, min_samples=20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q):
+        """Latency at quantile q, or None until enough samples are collected"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LLMRouter:
+    """Priority-ordered providers with hedging, circuit breakers and failover"""
+
+    def __init__(self, providers, timeout=30.0, hedge=True, hedge_quantile=0.95, hedge_min_delay=0.5,
+                 hedge_budget=0.1, failure_threshold=5, reset_timeout=30.0, max_workers=16 * HEDGE_FAN_OUT):
+        self.providers = list(providers)
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_budget = hedge_budget  # Max fraction of requests that may be hedged
+        self._breakers = {p.name: CircuitBreaker(failure_threshold, reset_timeout) for p in self.providers}
+        self._latency = {p.name: LatencyTracker() for p in self.providers}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm')
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.failovers = 0
+        self.failures = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _hedge_delay(self, provider):
+        """Seconds to wait before hedging, or None when hedging is off or latency is unknown"""
+        if not self.hedge:
+            return None
+        p95 = self._latency[provider.name].quantile(self.hedge_quantile)
+        return max(p95, self.hedge_min_delay) if p95 is not None else None
+
+    def _hedge_allowed(self):
+        with self._lock:
+            return self.hedges_sent < self.hedge_budget * self.requests
+
+    def _attempt(self, provider, payload, deadline):
+        # The timeout is taken when the attempt starts, not when it was queued for a pool thread
+        start = time.monotonic()
+        if start >= deadline:
+            raise LLMProviderError(f"{provider.name}: deadline passed before the request started")
+        try:
+            result = provider.complete(payload, timeout=deadline - start)
+        except Exception:
+            self._breakers[provider.name].record_failure()
+            raise
+        self._latency[provider.name].record(time.monotonic() - start)
+        self._breakers[provider.name].record_success()
+        return result
+
+    def _complete_hedged(self, provider, payload, deadline):
+        remaining = deadline - time.monotonic()
+        primary = self._pool.submit(self._attempt, provider, payload, deadline)
+        pending = {primary}
+
+        delay = self._hedge_delay(provider)
+        if delay is not None and delay < remaining:
+            done, _ = wait(pending, timeout=delay)
+            if not done and self._hedge_allowed():
+                self._count('hedges_sent')
+                pending.add(self._pool.submit(self._attempt, provider, payload, deadline))
+
+        last_error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                raise LLMProviderError(f"{provider.name}: no reply within deadline")
+
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                if future is not primary:
+                    self._count('hedges_won')
+                return result
+
+        raise last_error
+
+    def complete(self, payload):
+        """
+        Run a chat completion on the first provider that answers
+
+        Returns:
+            dict: OpenAI-style response
+
+        Raises:
+            LLMUnavailableError: every provider failed, was open or ran out of time
+        """
+        self._count('requests')
+        deadline = time.monotonic() + self.timeout
+        errors = []
+
+        for provider in self.providers:
+            if time.monotonic() >= deadline:
+                break
+            if not self._breakers[provider.name].allow_request():
+                errors.append(f"{provider.name}: circuit open")
+                continue
+
+            try:
+                return self._complete_hedged(provider, payload, deadline)
+            except Exception as e:
+                errors.append(str(e))
+                self._count('failovers')
+
+        self._count('failures')
+        raise LLMUnavailableError("; ".join(errors) or "no LLM provider configured")
+
+    def stream(self, payload):
+        """
+        Stream a chat completion, failing over only before the first chunk
+
+        Streams aren't hedged: once tokens reach the client the reply can't
+        switch to another request.
+
+        Yields:
+            dict: OpenAI-style chat.completion.chunk objects
+        """
+        self._count('requests')
+        deadline = time.monotonic() + self.timeout
+        errors = []
+
+        for provider in self.providers:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            breaker = self._breakers[provider.name]
+            if not breaker.allow_request():
+                errors.append(f"{provider.name}: circuit open")
+                continue
+
+            started = False
+            try:
+                for chunk in provider.stream_chunks(payload, timeout=remaining):
+                    started = True
+                    yield chunk
+                breaker.record_success()
+                return
+            except GeneratorExit:
+                # Caller stopped reading - not the provider's fault
+                breaker.record_success()
+                raise
+            except Exception as e:
+                breaker.record_failure()
+                if started:
+                    self._count('failures')
+                    raise LLMUnavailableError(str(e)) from e
+                errors.append(str(e))
+                self._count('failovers')
+
+        self._count('failures')
+        raise LLMUnavailableError("; ".join(errors) or "no LLM provider configured")
+
+    def stats(self):
+        return {
+            'providers': {
+                p.name: dict(self._breakers[p.name].stats(),
+                             p95_seconds=self._latency[p.name].quantile(self.hedge_quantile))
+                for p in self.providers
+            },
+            'requests': self.requests,
+            'hedges_sent': self.hedges_sent,
+            'hedges_won': self.hedges_won,
+            'failovers': self.failovers,
+            'failures': self.failures,
+        }
+
+
+def build_providers(config):
+    """Create providers listed in LLM_PROVIDERS (unconfigured ones are skipped)"""
+    providers = []
+
+    for name in (n.strip() for n in config.get('LLM_PROVIDERS', 'openai,fallback').split(',')):
+        if name == 'openai' and config.get('OPENAI_API_KEY'):
+            providers.append(OpenAICompatibleProvider(
+                'openai', 'https://api.openai.com/v1', config['OPENAI_API_KEY'],
+                model=config.get('LLM_OPENAI_MODEL'), service='openai'
+            ))
+        elif name == 'fallback' and config.get('LLM_FALLBACK_BASE_URL'):
+            http_client.register_service('llm_fallback', config['LLM_FALLBACK_BASE_URL'])
+            providers.append(OpenAICompatibleProvider(
+                'fallback', config['LLM_FALLBACK_BASE_URL'], config.get('LLM_FALLBACK_API_KEY'),
+                model=config.get('LLM_FALLBACK_MODEL'), service='llm_fallback',
+                json_mode=config.get('LLM_FALLBACK_JSON_MODE', False)
+            ))
+        elif name == 'stub':
+            providers.append(StubProvider())
+
+    return providers
+
+
+def build_router(config):
+    # Enough threads for every admitted chat request to hedge, plus a few for background jobs
+    max_workers = config.get('LLM_MAX_WORKERS') or config.get('ADMISSION_CHAT_CONCURRENCY', 16) * HEDGE_FAN_OUT + 4
+    return LLMRouter(
+        build_providers(config),
+        timeout=config.get('LLM_TIMEOUT', 30.0),
+        hedge=config.get('LLM_HEDGE_ENABLED', True),
+        hedge_quantile=config.get('LLM_HEDGE_QUANTILE', 0.95),
+        hedge_min_delay=config.get('LLM_HEDGE_MIN_DELAY', 0.5),
+        hedge_budget=config.get('LLM_HEDGE_BUDGET', 0.1),
+        failure_threshold=config.get('LLM_BREAKER_FAILURES', 5),
+        reset_timeout=config.get('LLM_BREAKER_RESET', 30.0),
+        max_workers=max_workers,
+    )
+
+
+# Global router (created by init_llm, or lazily from the current app's config)
+llm_router = None
+_router_lock = threading.Lock()
+
+
+def init_llm(app):
+    """Build the provider chain from config"""
+    global llm_router
+
+    with _router_lock:
+        llm_router = build_router(app.config)
+
+    names = [p.name for p in llm_router.providers]
+    app.logger.info(f"LLM providers: {', '.join(names) if names else 'none (demo replies)'}")
+
+
+def set_llm_router(router):
+    """Replace the global router (tests)"""
+    global llm_router
+    llm_router = router
+
+
+def get_llm_router():
+    """Get the LLM router"""
+    global llm_router
+
+    if llm_router is None:
+        with _router_lock:
+            if llm_router is None:
+                llm_router = build_router(current_app.config)
+    return llm_router
+
+
+def get_llm_stats():
+    """Router and per-provider breaker stats, for health/debug endpoints"""
+    return llm_router.stats() if llm_router else {}
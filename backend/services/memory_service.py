@@ -6,8 +6,11 @@ AI-AGNOSTIC: Works with any AI provider (OpenAI, Claude, Gemini, etc.)
 
 from backend.database.models.models import db
 from backend.database.models.memory_models import ConversationMemory, ChatMessage, UserPreference
+from backend.services.chat.lexical_index import search_messages, load_ranked
+from backend.services.chat.context_builder import load_facts
+from backend.services.activity_rollups import lifetime_totals, daily_rows, daily_counts, breakdown, count_of
 from datetime import datetime, timedelta
-from sqlalchemy import desc, func
+from sqlalchemy import desc
 import json
 
 
@@ -118,7 +121,8 @@ class MemoryService:
             days: Number of days to look back
         
         Returns:
-            Dict with conversation summary
+            Dict with conversation summary (summaries, topics, moods and facts
+            are kept up to date by the background summarizer)
         """
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
@@ -136,6 +140,8 @@ class MemoryService:
         all_topics = []
         total_messages = 0
         recent_moods = []
+        summaries = []
+        facts = []
         
         for memory in memories:
             if memory.key_topics:
@@ -143,15 +149,20 @@ class MemoryService:
             total_messages += memory.message_count or 0
             if memory.user_mood:
                 recent_moods.append(memory.user_mood)
+            if memory.summary:
+                summaries.append({'persona': memory.persona, 'summary': memory.summary})
+            facts.extend(f for f in load_facts(memory) if f not in facts)
         
-        # Get unique topics
-        unique_topics = list(set([t.strip() for t in all_topics if t.strip()]))
+        # Unique topics, most recent conversations first
+        unique_topics = list(dict.fromkeys(t.strip() for t in all_topics if t.strip()))
         
         return {
             'conversation_count': len(memories),
             'total_messages': total_messages,
             'key_topics': unique_topics[:10],  # Top 10 topics
             'recent_moods': recent_moods[:5],  # Last 5 moods
+            'summaries': summaries[:3],
+            'important_facts': facts[:20],
             'time_period_days': days
         }
     
@@ -278,9 +289,19 @@ class MemoryService:
         # Add conversation summary
         if context.get('conversation_summary'):
             summary = context['conversation_summary']
+            if summary.get('summaries'):
+                prompt_parts.append("Earlier conversations:\n" + "\n".join(
+                    f"- with {s['persona']}: {s['summary']}" for s in summary['summaries']
+                ))
             if summary.get('key_topics'):
                 topics_str = ', '.join(summary['key_topics'])
                 prompt_parts.append(f"Recent conversation topics: {topics_str}")
+            if summary.get('recent_moods'):
+                prompt_parts.append(f"User's recent mood: {summary['recent_moods'][0]}")
+            if summary.get('important_facts'):
+                prompt_parts.append("Things to remember about the user:\n" + "\n".join(
+                    f"- {fact}" for fact in summary['important_facts']
+                ))
         
         # Add preferences
         if context.get('preferences'):
@@ -295,24 +316,41 @@ class MemoryService:
         return "\n\n".join(prompt_parts)
     
     @staticmethod
-    def search_conversations(user_id, search_query, limit=20):
+    def search_conversations(user_id, search_query, limit=20, cursor=None, persona=None):
         """
-        Search through conversation history
+        Search through conversation history (full-text, best match first)
         
         Args:
             user_id: User ID
             search_query: Search string
-            limit: Max results
+            limit: Results per page
+            cursor: next_cursor of the previous page
+            persona: Only this persona's messages
         
         Returns:
-            List of matching messages
+            List of matching messages, each with an HTML-safe 'snippet'
+            highlighting the matched terms
         """
-        messages = ChatMessage.query.filter(
-            ChatMessage.user_id == user_id,
-            ChatMessage.content.ilike(f'%{search_query}%')
-        ).order_by(desc(ChatMessage.timestamp)).limit(limit).all()
+        return MemoryService.search_conversations_page(user_id, search_query, cursor, limit, persona)['results']
+    
+    @staticmethod
+    def search_conversations_page(user_id, search_query, cursor=None, per_page=20, persona=None):
+        """
+        One page of conversation search results with pagination info
+        
+        Returns:
+            Dict with 'results' (as in search_conversations), 'total',
+            'total_capped', 'per_page', 'has_next' and 'next_cursor'
         
-        return [msg.to_dict() for msg in messages]
+        Raises:
+            ValueError: The cursor is malformed
+        """
+        results = search_messages('chat_messages', search_query, user_id=user_id, persona=persona,
+                                  cursor=cursor, per_page=per_page)
+        
+        return dict(results, results=[
+            dict(msg.to_dict(), snippet=str(msg.snippet)) for msg in load_ranked(ChatMessage, results)
+        ])
     
     @staticmethod
     def get_conversation_stats(user_id):
@@ -323,33 +361,19 @@ class MemoryService:
             user_id: User ID
         
         Returns:
-            Dict with statistics
+            Dict with statistics (message counts come from the activity rollups)
         """
-        total_messages = ChatMessage.query.filter_by(user_id=user_id).count()
+        totals = lifetime_totals(user_id, 'chat_messages')
         total_conversations = ConversationMemory.query.filter_by(user_id=user_id).count()
         
-        # Get messages by persona
-        persona_stats = db.session.query(
-            ChatMessage.persona,
-            func.count(ChatMessage.id).label('count')
-        ).filter(
-            ChatMessage.user_id == user_id
-        ).group_by(ChatMessage.persona).all()
-        
         # Get most active days
-        recent_days = datetime.utcnow() - timedelta(days=30)
-        daily_activity = db.session.query(
-            func.date(ChatMessage.timestamp).label('date'),
-            func.count(ChatMessage.id).label('count')
-        ).filter(
-            ChatMessage.user_id == user_id,
-            ChatMessage.timestamp >= recent_days
-        ).group_by(func.date(ChatMessage.timestamp)).all()
+        recent_days = (datetime.utcnow() - timedelta(days=30)).date()
+        daily_activity = daily_counts(daily_rows(user_id, 'chat_messages', recent_days), 'chat_messages')
         
         return {
-            'total_messages': total_messages,
+            'total_messages': count_of(totals, 'chat_messages'),
             'total_conversations': total_conversations,
-            'persona_breakdown': {p: c for p, c in persona_stats},
-            'daily_activity': [{'date': str(d), 'count': c} for d, c in daily_activity],
+            'persona_breakdown': breakdown(totals, 'chat_messages.persona'),
+            'daily_activity': [{'date': d, 'count': c} for d, c in daily_activity.items()],
             'preferences_count': UserPreference.query.filter_by(user_id=user_id).count()
         }
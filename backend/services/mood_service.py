@@ -158,45 +158,58 @@ class MoodService:
             )
     
     @staticmethod
-    def get_mood_adjusted_prompt(base_prompt: str, user_id: int) -> str:
+    def get_mood_adjusted_prompt(base_prompt: str, user_id: int, mood_context: Optional[Dict] = None) -> str:
         """
         Adjust AI system prompt based on user's recent mood
         
         Args:
             base_prompt: Original persona system prompt
             user_id: User ID
+            mood_context: Pre-fetched get_mood_context() result (optional)
         
         Returns:
             str: Mood-adjusted system prompt
         """
-        mood_context = MoodService.get_mood_context(user_id)
+        if mood_context is None:
+            mood_context = MoodService.get_mood_context(user_id)
         
         if not mood_context['has_recent_mood']:
             # No recent mood data - use base prompt
             return base_prompt
         
         # Add tone adjustment to base prompt
-        tone_adjustment = mood_context['tone_adjustment']
+        return f"{base_prompt}\n\n{MoodService.format_mood_section(mood_context)}\n"
+    
+    @staticmethod
+    def format_mood_section(mood_context: Dict) -> str:
+        """
+        Format the mood-aware tone instructions for a system prompt
         
-        adjusted_prompt = f"""{base_prompt}
-
---- MOOD-AWARE INTERACTION ---
-{tone_adjustment}
-
-Remember: Be authentic to your persona while adapting your tone to support the user's current emotional state.
-"""
+        Args:
+            mood_context: get_mood_context() result with a recent mood
         
-        return adjusted_prompt
+        Returns:
+            str: Mood section text
+        """
+        return f"""--- MOOD-AWARE INTERACTION ---
+{mood_context['tone_adjustment']}
+
+Remember: Be authentic to your persona while adapting your tone to support the user's current emotional state."""
     
     @staticmethod
-    def should_suggest_mood_checkin(user_id: int) -> bool:
+    def should_suggest_mood_checkin(user_id: int, mood_context: Optional[Dict] = None) -> bool:
         """
         Determine if AI should suggest a mood check-in
         
+        Args:
+            user_id: User ID
+            mood_context: Pre-fetched get_mood_context() result (optional)
+        
         Returns:
             bool: True if user hasn't checked in recently (2+ days)
         """
-        mood_context = MoodService.get_mood_context(user_id)
+        if mood_context is None:
+            mood_context = MoodService.get_mood_context(user_id)
         
         if not mood_context['has_recent_mood']:
             # No mood data at all - suggest check-in
@@ -9,6 +9,7 @@ from .socketio_service import (
     emit_to_user,
     emit_to_chat,
     emit_ai_response,
+    emit_ai_token,
     emit_subscription_update,
     get_active_users,
     get_active_calls
@@ -20,6 +21,7 @@ __all__ = [
     'emit_to_user',
     'emit_to_chat',
     'emit_ai_response',
+    'emit_ai_token',
     'emit_subscription_update',
     'get_active_users',
     'get_active_calls'
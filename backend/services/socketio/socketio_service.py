@@ -351,6 +351,16 @@ def emit_ai_response(chat_id: int, persona: str, message: str):
         'timestamp': datetime.utcnow().isoformat()
     })
 
+def emit_ai_token(chat_id: int, persona: str, token: str, index: int):
+    """Emit a streamed AI response token to chat (final text follows as new_message)"""
+    emit_to_chat(chat_id, 'ai_token', {
+        'chat_id': chat_id,
+        'token': token,
+        'index': index,
+        'persona': persona,
+        'role': 'assistant'
+    })
+
 def emit_subscription_update(user_id: int, minutes_remaining: float):
     """Emit subscription update to user"""
     emit_to_user(user_id, 'subscription_updated', {
@@ -0,0 +1,22 @@
+"""
+Vector Store Package
+Pluggable vector memory backends (Pinecone, local NumPy) for MyBella
+"""
+
+from .base import VectorStore
+from .pinecone_store import PineconeVectorStore
+from .local_store import LocalVectorStore
+from .ids import vector_id, dedupe_text
+from .registry import init_vector_store, get_vector_store, set_vector_store, get_vector_store_stats
+
+__all__ = [
+    'VectorStore',
+    'PineconeVectorStore',
+    'LocalVectorStore',
+    'vector_id',
+    'dedupe_text',
+    'init_vector_store',
+    'get_vector_store',
+    'set_vector_store',
+    'get_vector_store_stats'
+]
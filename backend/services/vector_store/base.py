@@ -0,0 +1,46 @@
+"""
+Vector store interface for MyBella
+Chat memory is stored as records of
+{"id": str, "values": [float, ...], "metadata": {"user_id", "persona", "text"}}
+and always read back for one user and persona.
+"""
+
+
+class VectorStore:
+    """
+    Base class for vector memory backends
+
+    Subclasses implement upsert(), query(), delete(), delete_ids() and
+    delete_user(). Deletes return the number of records removed, or None
+    when the backend can't tell.
+    """
+
+    name = 'base'
+
+    def upsert(self, records):
+        """Insert or replace records (matched by id)"""
+        raise NotImplementedError
+
+    def query(self, vector, user_id, persona, top_k=5):
+        """
+        Nearest records for one user and persona
+
+        Returns:
+            list: {'id', 'score', 'metadata'} dicts, best match first
+        """
+        raise NotImplementedError
+
+    def delete(self, user_id, persona):
+        """Delete every record for one user and persona"""
+        raise NotImplementedError
+
+    def delete_ids(self, user_id, persona, ids):
+        """Delete specific records of one user and persona"""
+        raise NotImplementedError
+
+    def delete_user(self, user_id):
+        """Delete every record of one user"""
+        raise NotImplementedError
+
+    def stats(self):
+        return {'backend': self.name}
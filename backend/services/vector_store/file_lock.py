@@ -0,0 +1,58 @@
+"""
+Cross-process file lock for the local vector store
+The web process (with its in-process job worker), a standalone job worker
+and the reindex CLI can all write the same shard; each write holds this lock
+for the shard so their read-modify-replace cycles don't drop each other's rows.
+
+Uses flock on POSIX and msvcrt.locking on Windows. The lock file itself is
+left in place (it's empty) so every process locks the same inode.
+"""
+
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """Exclusive lock on path, held for the duration of a with block"""
+
+    def __init__(self, path, poll=0.05):
+        self.path = path
+        self.poll = poll
+        self._fd = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        time.sleep(self.poll)
+        except Exception:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return self
+
+    def __exit__(self, *exc_info):
+        fd, self._fd = self._fd, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+        return False
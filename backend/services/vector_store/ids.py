@@ -0,0 +1,33 @@
+"""
+Vector IDs for MyBella chat memory
+IDs are content-addressed (sha256) and scoped by user and persona, so the
+same message always maps to the same vector across workers and restarts.
+
+Short messages are hashed after normalization, which collapses near-
+identical ones ("ok", "Ok!", "ok.") into a single vector instead of piling
+up duplicates that crowd out useful matches in top-k.
+"""
+
+import hashlib
+import re
+
+DEDUPE_MAX_CHARS = 40  # Messages up to this long (normalized) are deduplicated
+
+_NON_WORD = re.compile(r"[^\w\s']+")
+_SPACES = re.compile(r"\s+")
+
+
+def dedupe_text(text):
+    """Text as it is hashed: normalized when short, otherwise only whitespace-trimmed"""
+    text = (text or '').strip()
+    normalized = _SPACES.sub(' ', _NON_WORD.sub(' ', text.lower())).strip()
+    if normalized and len(normalized) <= DEDUPE_MAX_CHARS:
+        return normalized
+    return text
+
+
+def vector_id(user_id, persona, text):
+    """Stable ID for a memory vector: <user_id>:<persona>:<sha256 prefix>"""
+    persona = (persona or '').strip().lower()
+    digest = hashlib.sha256(dedupe_text(text).encode('utf-8')).hexdigest()[:32]
+    return f"{user_id}:{persona}:{digest}"
@@ -0,0 +1,123 @@
+"""
+IVF (inverted file) index for the local vector store
+Approximate nearest-neighbour search for large user/persona shards.
+
+Vectors are clustered with spherical k-means into ~sqrt(n) lists; a query
+scores the centroids, then only the vectors in the nprobe closest lists.
+Vectors are stored as int8 codes with a per-vector scale in memory-mapped
+.npy files, so a 1536-d vector costs 1.5KB of page cache instead of 6KB of
+heap, and a query only touches the pages of the lists it probes.
+
+Codes are written once, with the shard segment their rows arrive in
+(local_store.py): new rows are quantized and assigned to their nearest
+existing centroid, and rows already on disk are never re-encoded. The
+centroids are retrained (re-encoding every row) once the shard has doubled
+since they were last trained.
+"""
+
+import numpy as np
+
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 64
+ASSIGN_BATCH = 4096
+
+
+def list_count(n):
+    return max(1, int(np.sqrt(n)))
+
+
+def quantize(matrix):
+    """int8 codes and per-row scales for unit vectors (row ~= codes * scale)"""
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.rint(matrix / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def nearest_centroids(centroids, matrix):
+    """Index of the most similar centroid for each row (batched to bound memory)"""
+    assign = np.empty(len(matrix), dtype=np.int32)
+    for start in range(0, len(matrix), ASSIGN_BATCH):
+        block = matrix[start:start + ASSIGN_BATCH]
+        assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assign
+
+
+def train_centroids(matrix, nlist, seed=0):
+    """Spherical k-means on a sample of the (unit-normalized) rows"""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(matrix), nlist * KMEANS_SAMPLE_PER_LIST)
+    sample = matrix[rng.choice(len(matrix), sample_size, replace=False)]
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+    for _ in range(KMEANS_ITERATIONS):
+        assign = nearest_centroids(centroids, sample)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        norms = np.linalg.norm(sums, axis=1)
+        empty = norms == 0
+        # Re-seed empty lists with random sample points
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        norms[empty] = np.linalg.norm(sums[empty], axis=1)
+        centroids = (sums / norms[:, None]).astype(np.float32)
+
+    return centroids
+
+
+def encode(centroids, matrix):
+    """(list assignments, int8 codes, scales) for new unit-normalized rows"""
+    codes, scales = quantize(matrix)
+    return nearest_centroids(centroids, matrix), codes, scales
+
+
+class IVFIndex:
+    """Centroids plus the list assignments and int8 codes of every segment of a shard"""
+
+    def __init__(self, centroids, assign, scales, blocks, live=None):
+        """
+        Args:
+            centroids: (nlist, d) unit centroids
+            assign, scales: One entry per row, across the segments in order
+            blocks: Each segment's (memory-mapped) codes, in order
+            live: Optional boolean mask per row; rows where it is False
+                (overwritten by a later segment) are never returned
+        """
+        self.centroids = centroids
+        self.assign = assign
+        self.scales = scales
+        self.blocks = blocks
+        self._starts = np.cumsum([0] + [len(block) for block in blocks])
+        rows = np.arange(len(assign)) if live is None else np.flatnonzero(live)
+        self._order = rows[np.argsort(assign[rows], kind='stable')]
+        self._offsets = np.searchsorted(assign[self._order], np.arange(len(centroids) + 1))
+
+    @property
+    def count(self):
+        return len(self._order)
+
+    def _codes(self, rows):
+        """Codes for sorted row positions, read sequentially from each segment's block"""
+        bounds = np.searchsorted(rows, self._starts)
+        return np.concatenate([
+            np.asarray(block[rows[bounds[i]:bounds[i + 1]] - self._starts[i]])
+            for i, block in enumerate(self.blocks) if bounds[i + 1] > bounds[i]
+        ])
+
+    def search(self, query, top_k, nprobe):
+        """
+        Approximate top-k by inner product for a unit query
+
+        Returns:
+            tuple: (row positions, scores), best first
+        """
+        probe = np.argpartition(-(self.centroids @ query), min(nprobe, len(self.centroids)) - 1)[:nprobe]
+        rows = np.concatenate([self._order[self._offsets[l]:self._offsets[l + 1]] for l in probe])
+        if not len(rows):
+            return rows, np.empty(0, dtype=np.float32)
+
+        rows.sort()  # Sequential reads through the memory-mapped codes
+        scores = (self._codes(rows).astype(np.float32) @ query) * self.scales[rows]
+        k = min(top_k, len(rows))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return rows[best], scores[best]
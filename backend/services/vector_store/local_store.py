@@ -0,0 +1,486 @@
+"""
+Local vector store for MyBella
+Zero-network memory backend for development, CI and small deployments.
+
+Each user/persona pair is a shard: a small JSON manifest naming immutable
+segment files. A segment (.seg.npz) holds a float32 matrix of unit-normalized
+vectors plus their ids and texts (as a UTF-8 blob with offsets, so one long
+memory doesn't widen every row); a row in a later segment overrides an
+earlier row with the same id. An upsert writes its rows as a new segment and
+swaps in a manifest that lists it, merging the newest segments while one is
+no bigger than the ones after it (like a binary counter), so a shard has
+O(log n) segments and a row is rewritten O(log n) times. Only deletes, index
+(re)training and shards made mostly of overridden rows rewrite every row.
+
+Manifests are replaced atomically and reloaded when they change on disk, so
+the web process sees upserts made by the job worker process; segments it
+already has cached aren't read again. Writes hold a per-shard file lock
+(file_lock.py) because the web process, a standalone worker and the reindex
+CLI can all write the same shard. Files a manifest no longer names are
+removed after each write of the shard; one that can't be removed yet
+(Windows keeps memory-mapped files locked) is retried on the next write.
+
+Shards past ann_min_vectors also get an IVF index (ivf_index.py): each
+segment carries int8 codes for its own rows in a memory-mapped file, and
+queries on them search the index and never load the float32 matrices.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from backend.services.vector_store.base import VectorStore
+from backend.services.vector_store.file_lock import FileLock
+from backend.services.vector_store.ivf_index import IVFIndex, encode, list_count, train_centroids
+
+_SAFE_NAME = re.compile(r'^[\w-]{1,64}$')
+
+
+def _safe_name(value):
+    """Filesystem-safe name; anything unusual is hashed"""
+    value = str(value)
+    if _SAFE_NAME.match(value):
+        return value
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()[:16]
+
+
+def _pack_strings(values):
+    """UTF-8 blob plus start offsets (n + 1 of them) for a list of strings"""
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(blob, offsets):
+    data = blob.tobytes()
+    return [data[start:end].decode('utf-8') for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+
+def _read_strings(data, name):
+    if f'{name}_blob' in data.files:
+        return _unpack_strings(data[f'{name}_blob'], data[f'{name}_offsets'])
+    return data[name].tolist()  # Shards saved before the blob layout
+
+
+def _version(stat):
+    return stat.st_mtime_ns, stat.st_ino  # os.replace gives every manifest a new inode
+
+
+def _retrying(operation, *args, attempts=5, delay=0.05):
+    """Run a rename or removal, retrying while another process has the file open (Windows)"""
+    for attempt in range(attempts):
+        try:
+            return operation(*args)
+        except PermissionError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(delay)
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class LocalVectorStore(VectorStore):
+    """Per-user, per-persona segmented float32 matrices on disk with exact or IVF top-k search"""
+
+    name = 'local'
+
+    def __init__(self, root, ann_min_vectors=5000, nprobe=12):
+        self.root = root
+        self.ann_min_vectors = ann_min_vectors  # 0 disables the IVF index
+        self.nprobe = nprobe
+        self._shards = {}  # manifest path -> shard dict (cached file contents)
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.ann_queries = 0
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, user_id, persona):
+        return os.path.join(self.root, _safe_name(user_id), f"{_safe_name(persona.lower())}.json")
+
+    @staticmethod
+    def _prefix(path):
+        return path[:-len('.json')]
+
+    def _shard_lock(self, path):
+        """Cross-process lock for a shard (kept outside the user directory, which delete_user removes)"""
+        relative = os.path.relpath(self._prefix(path), self.root)
+        return FileLock(os.path.join(self.root, '.locks', f"{relative}.lock"))
+
+    def _use_index(self, count):
+        return bool(self.ann_min_vectors) and count >= self.ann_min_vectors
+
+    # ----- Reading -----
+
+    def _stat_version(self, path):
+        # <prefix>.npz is a single-file shard saved before segments; it loads as one segment
+        for candidate in (path, f"{self._prefix(path)}.npz"):
+            try:
+                return _version(os.stat(candidate))
+            except FileNotFoundError:
+                continue
+        return None
+
+    def _read_manifest(self, path):
+        """(manifest, version) of a shard, or (None, None) if it doesn't exist"""
+        try:
+            with open(path, 'rb') as f:
+                return json.load(f), _version(os.fstat(f.fileno()))
+        except FileNotFoundError:
+            pass
+        legacy = f"{self._prefix(path)}.npz"
+        try:
+            stat = os.stat(legacy)
+        except FileNotFoundError:
+            return None, None
+        return {'segments': [{'file': os.path.basename(legacy), 'codes': None}]}, _version(stat)
+
+    @staticmethod
+    def _read_segment(directory, entry, with_matrix):
+        codes = entry.get('codes')
+        with np.load(os.path.join(directory, entry['file'])) as data:
+            segment = {
+                'ids': _read_strings(data, 'ids'),
+                'texts': _read_strings(data, 'texts'),
+                # Indexed shards are searched through the memory-mapped codes only
+                'matrix': data['matrix'] if with_matrix else None,
+                'assign': data['assign'] if codes else None,
+                'scales': data['scales'] if codes else None,
+            }
+        segment['codes'] = np.load(os.path.join(directory, codes), mmap_mode='r') if codes else None
+        return segment
+
+    def _load(self, path):
+        """Shard for path (cached until its manifest changes); None if it doesn't exist"""
+        attempts = 3
+        for attempt in range(attempts):
+            try:
+                return self._read_shard(path)
+            except FileNotFoundError:
+                # A writer merged away segments named by the manifest just read; read the new one
+                if attempt == attempts - 1:
+                    raise
+
+    def _read_shard(self, path):
+        version = self._stat_version(path)
+        cached = self._shards.get(path)
+        if version is not None and cached is not None and cached['version'] == version:
+            return cached
+
+        manifest, version = self._read_manifest(path) if version is not None else (None, None)
+        if manifest is None:
+            self._shards.pop(path, None)
+            return None
+
+        directory = os.path.dirname(path)
+        indexed = manifest.get('centroids') is not None
+        previous = cached['segments'] if cached else {}
+        segments = {}
+        for entry in manifest['segments']:
+            segment = previous.get(entry['file'])  # Segment files never change once written
+            if segment is None or (not indexed and segment['matrix'] is None):
+                segment = self._read_segment(directory, entry, with_matrix=not indexed)
+            segments[entry['file']] = segment
+        ordered = list(segments.values())
+
+        ids = [vector_id for segment in ordered for vector_id in segment['ids']]
+        positions = {vector_id: row for row, vector_id in enumerate(ids)}  # A later segment's row wins
+        live = np.zeros(len(ids), dtype=bool)
+        live[list(positions.values())] = True
+
+        index = matrix = None
+        if indexed:
+            index = IVFIndex(np.load(os.path.join(directory, manifest['centroids'])),
+                             np.concatenate([segment['assign'] for segment in ordered]),
+                             np.concatenate([segment['scales'] for segment in ordered]),
+                             [segment['codes'] for segment in ordered], live)
+        else:
+            matrix = np.concatenate([segment['matrix'] for segment in ordered])
+
+        shard = {
+            'manifest': manifest,
+            'segments': segments,
+            'ids': ids,
+            'texts': [text for segment in ordered for text in segment['texts']],
+            'positions': positions,
+            'live': live,
+            'count': len(positions),
+            'matrix': matrix,
+            'index': index,
+            'version': version,
+        }
+        self._shards[path] = shard
+        return shard
+
+    # ----- Writing -----
+
+    def _write_segment(self, path, matrix, ids, texts, encoded=None):
+        """
+        Write a new immutable segment, with its codes when encoded is given
+
+        Returns:
+            dict: Its manifest entry
+        """
+        directory, prefix = os.path.split(self._prefix(path))
+        generation = uuid.uuid4().hex[:12]
+        entry = {'file': f"{prefix}.{generation}.seg.npz", 'codes': None}
+        ids_blob, ids_offsets = _pack_strings(ids)
+        texts_blob, texts_offsets = _pack_strings(texts)
+        arrays = dict(matrix=matrix, ids_blob=ids_blob, ids_offsets=ids_offsets,
+                      texts_blob=texts_blob, texts_offsets=texts_offsets)
+
+        os.makedirs(directory, exist_ok=True)
+        if encoded is not None:
+            assign, codes, scales = encoded
+            entry['codes'] = f"{prefix}.{generation}.codes.npy"
+            np.save(os.path.join(directory, entry['codes']), codes)
+            arrays.update(assign=assign, scales=scales)
+        np.savez(os.path.join(directory, entry['file']), **arrays)
+        return entry
+
+    def _write_centroids(self, path, centroids):
+        directory, prefix = os.path.split(self._prefix(path))
+        name = f"{prefix}.{uuid.uuid4().hex[:12]}.centroids.npy"
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, name), centroids)
+        return name
+
+    def _write_manifest(self, path, segments, centroids=None, trained_count=0):
+        """Swap in a manifest naming the given (already written) files, then drop the files it no longer names"""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'segments': segments, 'centroids': centroids, 'trained_count': trained_count}, f)
+            _retrying(os.replace, tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        self._collect(path, segments, centroids)
+
+    def _collect(self, path, segments=(), centroids=None):
+        """Remove the shard's files its manifest doesn't name"""
+        keep = {os.path.basename(path), centroids}
+        for entry in segments:
+            keep.update((entry['file'], entry['codes']))
+        for file_path in glob.glob(f"{glob.escape(self._prefix(path))}.*"):
+            if os.path.basename(file_path) not in keep:
+                try:
+                    os.remove(file_path)
+                except OSError:
+                    pass  # Still memory-mapped by a reader on Windows; removed after a later write
+
+    def _parts(self, shard):
+        """[(manifest entry, segment)] of a loaded shard, oldest first"""
+        if shard is None:
+            return []
+        return [(entry, shard['segments'][entry['file']]) for entry in shard['manifest']['segments']]
+
+    @staticmethod
+    def _segment_matrix(path, entry, segment):
+        if segment['matrix'] is not None:
+            return segment['matrix']
+        with np.load(os.path.join(os.path.dirname(path), entry['file'])) as data:
+            return data['matrix']
+
+    def _combine(self, path, parts, drop=()):
+        """
+        Rows of several segments as one, without rows overridden by a later
+        segment or whose id is in drop
+
+        Returns:
+            tuple: (matrix, ids, texts, (assign, codes, scales) or None when
+            a segment has no codes)
+        """
+        seen = set(drop)
+        kept = []
+        for entry, segment in reversed(parts):
+            keep = np.array([vector_id not in seen for vector_id in segment['ids']], dtype=bool)
+            seen.update(segment['ids'])
+            kept.append((entry, segment, keep))
+        kept.reverse()
+
+        matrix = np.concatenate([self._segment_matrix(path, entry, segment)[keep] for entry, segment, keep in kept])
+        ids = [v for _, segment, keep in kept for v, k in zip(segment['ids'], keep) if k]
+        texts = [t for _, segment, keep in kept for t, k in zip(segment['texts'], keep) if k]
+        encoded = None
+        if all(segment['codes'] is not None for _, segment, _ in kept):
+            encoded = (np.concatenate([segment['assign'][keep] for _, segment, keep in kept]),
+                       np.concatenate([np.asarray(segment['codes'][keep]) for _, segment, keep in kept]),
+                       np.concatenate([segment['scales'][keep] for _, segment, keep in kept]))
+        return matrix, ids, texts, encoded
+
+    def _rewrite(self, path, shard, extra=None, drop=()):
+        """
+        Replace a shard with a single segment of its live rows (minus ids in
+        drop, plus an extra in-memory segment), building, retraining or dropping
+        the IVF index as its new size calls for; codes are reused otherwise
+
+        Returns:
+            int: Rows kept
+        """
+        parts = self._parts(shard) + ([(None, extra)] if extra else [])
+        matrix, ids, texts, encoded = self._combine(path, parts, drop)
+        if not ids:
+            self._remove_shard(path)
+            return 0
+
+        manifest = shard['manifest'] if shard else {}
+        centroids, trained_count = manifest.get('centroids'), manifest.get('trained_count', 0)
+        if not self._use_index(len(ids)):
+            centroids, encoded = None, None
+        elif centroids is None or encoded is None or len(ids) >= 2 * trained_count:
+            trained = train_centroids(matrix, list_count(len(ids)))
+            encoded = encode(trained, matrix)
+            centroids, trained_count = self._write_centroids(path, trained), len(ids)
+
+        self._write_manifest(path, [self._write_segment(path, matrix, ids, texts, encoded)],
+                             centroids, trained_count)
+        return len(ids)
+
+    def upsert(self, records):
+        groups = {}
+        for record in records:
+            metadata = record['metadata']
+            path = self._path(metadata['user_id'], metadata['persona'])
+            groups.setdefault(path, []).append(record)
+
+        with self._lock:
+            for path, group in groups.items():
+                with self._shard_lock(path):
+                    self._upsert_shard(path, group)
+
+    def _upsert_shard(self, path, group):
+        records = list({record['id']: record for record in group}.values())  # Repeated in a batch: last wins
+        values = _normalize(np.asarray([r['values'] for r in records], dtype=np.float32))
+        new = {
+            'ids': [r['id'] for r in records],
+            'texts': [r['metadata'].get('text', '') for r in records],
+            'matrix': values,
+            'assign': None, 'scales': None, 'codes': None,
+        }
+
+        shard = self._load(path)
+        manifest = shard['manifest'] if shard else {'segments': []}
+        rows = len(shard['ids']) if shard else 0
+        count = (shard['count'] if shard else 0) + sum(
+            1 for vector_id in new['ids'] if not shard or vector_id not in shard['positions'])
+        centroids, trained_count = manifest.get('centroids'), manifest.get('trained_count', 0)
+        if centroids is not None:
+            new['assign'], new['codes'], new['scales'] = encode(shard['index'].centroids, values)
+
+        if self._use_index(count) != (centroids is not None) or (centroids and count >= 2 * trained_count) \
+                or rows + len(records) - count > count:
+            # Index to build, drop or retrain, or mostly overridden rows: one segment for the whole shard
+            self._rewrite(path, shard, extra=new)
+            return
+
+        # Fold the newest segments into this one while each is no bigger than what follows it
+        parts = self._parts(shard) + [(None, new)]
+        merge, merged_rows = 1, len(new['ids'])
+        while merge < len(parts) and len(parts[-merge - 1][1]['ids']) <= merged_rows:
+            merge += 1
+            merged_rows += len(parts[-merge][1]['ids'])
+
+        matrix, ids, texts, encoded = self._combine(path, parts[-merge:])
+        segments = [entry for entry, _ in parts[:-merge]] + [self._write_segment(path, matrix, ids, texts, encoded)]
+        self._write_manifest(path, segments, centroids, trained_count)
+
+    def query(self, vector, user_id, persona, top_k=5):
+        path = self._path(user_id, persona)
+        with self._lock:
+            shard = self._load(path)
+            self.queries += 1
+        if shard is None or not shard['count']:
+            return []
+
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if not norm:
+            return []
+
+        query = query / norm
+        if shard['index'] is not None:
+            best, scores = shard['index'].search(query, top_k, self.nprobe)
+            with self._lock:
+                self.ann_queries += 1
+        else:
+            scores = shard['matrix'] @ query
+            if shard['count'] < len(scores):
+                scores[~shard['live']] = -np.inf
+            k = min(top_k, shard['count'])
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+            scores = scores[best]
+
+        return [{
+            'id': shard['ids'][i],
+            'score': float(score),
+            'metadata': {'user_id': user_id, 'persona': persona, 'text': shard['texts'][i]},
+        } for i, score in zip(best, scores)]
+
+    def _remove_shard(self, path):
+        self._shards.pop(path, None)
+        try:
+            _retrying(os.remove, path)
+        except FileNotFoundError:
+            pass
+        self._collect(path)
+
+    def delete(self, user_id, persona):
+        path = self._path(user_id, persona)
+        with self._lock, self._shard_lock(path):
+            shard = self._load(path)
+            self._remove_shard(path)
+        return shard['count'] if shard else 0
+
+    def delete_ids(self, user_id, persona, ids):
+        path = self._path(user_id, persona)
+        ids = set(ids)
+        with self._lock, self._shard_lock(path):
+            shard = self._load(path)
+            if shard is None:
+                return 0
+            removed = sum(1 for vector_id in ids if vector_id in shard['positions'])
+            if removed:
+                self._rewrite(path, shard, drop=ids)
+        return removed
+
+    def delete_user(self, user_id):
+        directory = os.path.join(self.root, _safe_name(user_id))
+        with self._lock:
+            removed = 0
+            names = {os.path.basename(p).split('.', 1)[0]
+                     for p in glob.glob(os.path.join(glob.escape(directory), '*')) if not p.endswith('.tmp')}
+            for name in names:
+                path = os.path.join(directory, f"{name}.json")
+                with self._shard_lock(path):
+                    shard = self._load(path)
+                    removed += shard['count'] if shard else 0
+                    self._remove_shard(path)
+            shutil.rmtree(directory, ignore_errors=True)
+        return removed
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': self.name,
+                'root': self.root,
+                'cached_shards': len(self._shards),
+                'indexed_shards': sum(1 for shard in self._shards.values() if shard['index'] is not None),
+                'segments': sum(len(shard['segments']) for shard in self._shards.values()),
+                'queries': self.queries,
+                'ann_queries': self.ann_queries,
+            }
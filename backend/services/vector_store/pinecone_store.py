@@ -0,0 +1,136 @@
+"""
+Pinecone vector store for MyBella
+Each user's vectors live in their own namespace ("user-<id>") and carry a
+normalized persona_key, so a query is filtered server-side and every match
+it returns is usable - cost and recall no longer depend on index size.
+
+Vectors written before namespacing sit in the default namespace. When a
+namespaced query comes back short, those are searched too (filtered on
+user_id server-side, persona client-side) with an over-fetch factor that
+adapts to how many matches survive the client-side filter.
+"""
+
+import threading
+
+from backend.services.vector_store.base import VectorStore
+
+UPSERT_BATCH_SIZE = 100  # Vectors per index.upsert call (Pinecone recommends <= 100)
+DELETE_BATCH_SIZE = 1000  # Ids per index.delete call (API limit)
+MAX_OVERFETCH = 16
+
+
+def user_namespace(user_id):
+    return f"user-{user_id}"
+
+
+def persona_key(persona):
+    return (persona or '').strip().lower()
+
+
+def _matches(result):
+    # Handle both dict and object response formats
+    return (result.get('matches') if isinstance(result, dict) else getattr(result, 'matches', [])) or []
+
+
+class PineconeVectorStore(VectorStore):
+    """Records in a Pinecone index, one namespace per user"""
+
+    name = 'pinecone'
+
+    def __init__(self, index, legacy_fallback=True):
+        self.index = index
+        self.legacy_fallback = legacy_fallback
+        self.overfetch = 4  # Legacy query fetches top_k * overfetch before the persona filter
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.short_results = 0
+        self.legacy_queries = 0
+
+    def upsert(self, records):
+        by_namespace = {}
+        for record in records:
+            metadata = dict(record['metadata'], persona_key=persona_key(record['metadata'].get('persona')))
+            namespace = user_namespace(metadata['user_id'])
+            by_namespace.setdefault(namespace, []).append(dict(record, metadata=metadata))
+
+        for namespace, group in by_namespace.items():
+            for start in range(0, len(group), UPSERT_BATCH_SIZE):
+                self.index.upsert(vectors=group[start:start + UPSERT_BATCH_SIZE], namespace=namespace)
+
+    def query(self, vector, user_id, persona, top_k=5):
+        result = self.index.query(
+            vector=vector,
+            top_k=top_k,
+            namespace=user_namespace(user_id),
+            filter={"persona_key": {"$eq": persona_key(persona)}},
+            include_metadata=True
+        )
+        found = [self._found(match) for match in _matches(result)]
+
+        # Recall check: a short page means this user/persona has fewer namespaced
+        # vectors than requested, so older un-namespaced ones may still be relevant
+        with self._lock:
+            self.queries += 1
+            if len(found) < top_k:
+                self.short_results += 1
+
+        if len(found) < top_k and self.legacy_fallback:
+            seen = {match['id'] for match in found}
+            legacy = [m for m in self._query_legacy(vector, user_id, persona, top_k) if m['id'] not in seen]
+            found = sorted(found + legacy, key=lambda m: m['score'] or 0.0, reverse=True)
+
+        return found[:top_k]
+
+    def _query_legacy(self, vector, user_id, persona, top_k):
+        """Search the default namespace, over-fetching to make up for the client-side persona filter"""
+        with self._lock:
+            self.legacy_queries += 1
+            fetch_k = top_k * self.overfetch
+
+        matches = _matches(self.index.query(
+            vector=vector,
+            top_k=fetch_k,
+            filter={"user_id": {"$eq": user_id}},
+            include_metadata=True
+        ))
+        key = persona_key(persona)
+        found = [self._found(m) for m in matches if persona_key(m.get("metadata", {}).get("persona")) == key]
+
+        with self._lock:
+            if len(found) < top_k and len(matches) == fetch_k:
+                # Page was full but too few survived the filter - fetch deeper next time
+                self.overfetch = min(MAX_OVERFETCH, self.overfetch * 2)
+            elif len(found) >= top_k and self.overfetch > 1:
+                self.overfetch -= 1
+
+        return found
+
+    @staticmethod
+    def _found(match):
+        return {'id': match.get('id'), 'score': match.get('score'), 'metadata': match.get('metadata', {})}
+
+    def delete(self, user_id, persona):
+        self.index.delete(filter={"persona_key": {"$eq": persona_key(persona)}}, namespace=user_namespace(user_id))
+        if self.legacy_fallback:
+            self.index.delete(filter={"user_id": user_id, "persona": persona})
+
+    def delete_ids(self, user_id, persona, ids):
+        # Legacy vectors have random ids; they go with persona/user deletes or a reindex
+        ids = list(ids)
+        for start in range(0, len(ids), DELETE_BATCH_SIZE):
+            self.index.delete(ids=ids[start:start + DELETE_BATCH_SIZE], namespace=user_namespace(user_id))
+
+    def delete_user(self, user_id):
+        self.index.delete(delete_all=True, namespace=user_namespace(user_id))
+        if self.legacy_fallback:
+            self.index.delete(filter={"user_id": user_id})
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': self.name,
+                'queries': self.queries,
+                'short_results': self.short_results,
+                'legacy_queries': self.legacy_queries,
+                'legacy_overfetch': self.overfetch,
+            }
@@ -0,0 +1,56 @@
+"""
+Vector store selection for MyBella
+VECTOR_STORE picks the backend: 'pinecone', 'local', 'none', or 'auto'
+(Pinecone when it initialized, otherwise the local store).
+"""
+
+import threading
+
+# Global store (set by init_vector_store)
+vector_store = None
+_store_lock = threading.Lock()
+
+
+def init_vector_store(app):
+    """Choose the vector memory backend; run after initialize_pinecone()"""
+    from backend.services.chat import pinecone_service
+    from backend.services.vector_store.pinecone_store import PineconeVectorStore
+    from backend.services.vector_store.local_store import LocalVectorStore
+
+    global vector_store
+
+    choice = (app.config.get('VECTOR_STORE') or 'auto').lower()
+    pinecone_ready = pinecone_service.pinecone_ok and pinecone_service.index is not None
+
+    with _store_lock:
+        if choice == 'pinecone' or (choice == 'auto' and pinecone_ready):
+            vector_store = PineconeVectorStore(
+                pinecone_service.index, legacy_fallback=app.config.get('PINECONE_LEGACY_FALLBACK', True)
+            ) if pinecone_ready else None
+        elif choice in ('local', 'auto'):
+            vector_store = LocalVectorStore(
+                app.config['VECTOR_STORE_DIR'],
+                ann_min_vectors=app.config.get('LOCAL_ANN_MIN_VECTORS', 5000),
+                nprobe=app.config.get('LOCAL_ANN_NPROBE', 12),
+            )
+        else:
+            vector_store = None
+
+    app.logger.info(f"Vector store: {vector_store.name if vector_store else 'disabled'}")
+    return vector_store
+
+
+def set_vector_store(store):
+    """Replace the global store (tests)"""
+    global vector_store
+    vector_store = store
+
+
+def get_vector_store():
+    """Get the active vector store, or None when vector memory is disabled"""
+    return vector_store
+
+
+def get_vector_store_stats():
+    """Backend stats, for health/debug endpoints"""
+    return vector_store.stats() if vector_store else {}
@@ -4,9 +4,9 @@ Handles real-time voice input/output in chat (replacing old call system)
 """
 
 import base64
-import requests
 from typing import Optional, Dict, Any
 from flask import current_app
+from backend.services import http_client
 
 # Persona voice IDs for ElevenLabs
 # TODO: Replace with actual voice IDs from ElevenLabs dashboard
@@ -64,7 +64,7 @@ class VoiceConversationService:
                 }
             }
             
-            response = requests.post(url, json=data, headers=headers, timeout=30)
+            response = http_client.post('elevenlabs', url, json=data, headers=headers, timeout=30)
             
             if response.status_code == 200:
                 current_app.logger.info(f'TTS generated successfully for {persona}')
@@ -136,14 +136,11 @@ class VoiceChatService:
             }
         
         try:
-            # Import ElevenLabs service
-            from backend.services.elevenlabs.elevenlabs_service import ElevenLabsService
+            # ElevenLabs TTS via the shared pooled HTTP client
+            from backend.services.voice.voice_conversation_service import VoiceConversationService
             
-            # Get persona voice ID
-            voice_id = ElevenLabsService.get_persona_voice_id(persona)
-            
-            # Generate voice audio
-            audio_data = ElevenLabsService.text_to_speech(text, voice_id)
+            # Generate voice audio (persona -> voice ID mapping lives in VoiceConversationService)
+            audio_data = VoiceConversationService.generate_voice_response(text, persona)
             
             if audio_data:
                 # Save audio file
@@ -223,4 +220,4 @@ class VoiceChatService:
             sub.updated_at = datetime.utcnow()
         
         db.session.commit()
-    print(f"Reset voice minutes for {len(subscriptions)} users")
+        print(f"Reset voice minutes for {len(subscriptions)} users")
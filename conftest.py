@@ -0,0 +1,40 @@
+"""
+Shared pytest fixtures
+A Flask app on a fresh SQLite database for tests that exercise services
+without the full create_app() stack
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath('.'))
+
+import pytest
+from flask import Flask
+
+from backend.database.models.models import db
+from backend.services import data_export
+from backend.services.chat import memory_deletion
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """
+    App with every table created in tmp_path/app.db, used inside its app context
+
+    Jobs the services enqueue are collected in app.queued instead of going to
+    the job queue. Test modules extend it by overriding `app` with a fixture
+    that takes `app` (e.g. to set config or build an index).
+    """
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'app.db'}")
+    db.init_app(app)
+
+    queued = []
+    for module in (data_export, memory_deletion):
+        monkeypatch.setattr(module, 'enqueue_jobs', queued.extend)
+    app.queued = queued
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
@@ -66,6 +66,10 @@ class MyBellaSocket {
             this.onNewMessage(data);
         });
 
+        this.socket.on('ai_token', (data) => {
+            this.onAiToken(data);
+        });
+
         this.socket.on('user_typing', (data) => {
             this.onUserTyping(data);
         });
@@ -191,6 +195,11 @@ class MyBellaSocket {
         this.addMessageToChat(data);
     }
 
+    onAiToken(data) {
+        // Streamed reply tokens - the complete reply still arrives as new_message
+        this.streamingReply = (data.index === 0 ? '' : (this.streamingReply || '')) + data.token;
+    }
+
     onUserTyping(data) {
         // Show/hide typing indicator
         this.updateTypingIndicator(data);
@@ -0,0 +1,66 @@
+"""
+Add History Indexes
+- Adds chat_messages.vector_id (the memory vector a message was stored
+  under), used by memory deletion and its (user_id, vector_id) index
+- Adds the composite (user_id, timestamp, id) indexes that keyset pagination
+  of messages and chat_messages relies on
+- New databases get all of this from db.create_all(); this covers tables
+  created before the column and indexes were declared on the models
+- On Postgres the indexes are built CONCURRENTLY so writes keep flowing; if a
+  build is interrupted, drop the INVALID index and run this again
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from backend import create_app
+from backend.database.models.models import db, Message
+from backend.database.models.memory_models import ChatMessage
+from sqlalchemy import text
+
+INDEXED_MODELS = (Message, ChatMessage)
+
+def migrate_history_indexes():
+    """Add chat_messages.vector_id and the composite history indexes"""
+    app, socketio = create_app()
+    
+    with app.app_context():
+        print("\n=== Adding History Indexes ===\n")
+        
+        try:
+            inspector = db.inspect(db.engine)
+            chat_cols = [col['name'] for col in inspector.get_columns('chat_messages')]
+            
+            if 'vector_id' not in chat_cols:
+                print("📝 Adding vector_id to chat_messages...")
+                with db.engine.connect() as conn:
+                    conn.execute(text('ALTER TABLE chat_messages ADD COLUMN vector_id VARCHAR(120)'))
+                    conn.commit()
+                print("✅ Added vector_id to chat_messages")
+            else:
+                print("ℹ️  vector_id already exists in chat_messages")
+            
+            preparer = db.engine.dialect.identifier_preparer
+            concurrently = 'CONCURRENTLY ' if db.engine.dialect.name == 'postgresql' else ''
+            # CREATE INDEX CONCURRENTLY can't run inside a transaction
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                for model in INDEXED_MODELS:
+                    table = model.__table__
+                    for index in table.indexes:
+                        columns = ', '.join(preparer.quote(column.name) for column in index.columns)
+                        print(f"📝 Adding {index.name} to {table.name}...")
+                        conn.execute(text(
+                            f"CREATE INDEX {concurrently}IF NOT EXISTS {preparer.quote(index.name)} "
+                            f"ON {preparer.format_table(table)} ({columns})"
+                        ))
+                        print(f"✅ {index.name} is in place")
+            
+            print("\n=== Migration Complete ===\n")
+            
+        except Exception as e:
+            print(f"\n❌ Error during migration: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    migrate_history_indexes()
@@ -0,0 +1,43 @@
+"""
+Add Rolling Summary Checkpoint
+- Adds summarized_through_id to conversation_memories so conversation
+  summaries can be updated incrementally (only messages newer than the
+  checkpoint are summarized)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from backend import create_app
+from backend.database.models.models import db
+from sqlalchemy import text
+
+def migrate_summary_checkpoint():
+    """Add summarized_through_id column to conversation_memories"""
+    app, socketio = create_app()
+    
+    with app.app_context():
+        print("\n=== Adding Rolling Summary Checkpoint ===\n")
+        
+        try:
+            inspector = db.inspect(db.engine)
+            memory_cols = [col['name'] for col in inspector.get_columns('conversation_memories')]
+            
+            if 'summarized_through_id' not in memory_cols:
+                print("📝 Adding summarized_through_id to conversation_memories...")
+                with db.engine.connect() as conn:
+                    conn.execute(text('ALTER TABLE conversation_memories ADD COLUMN summarized_through_id INTEGER DEFAULT 0'))
+                    conn.commit()
+                print("✅ Added summarized_through_id to conversation_memories")
+            else:
+                print("ℹ️  summarized_through_id already exists in conversation_memories")
+            
+            print("\n=== Migration Complete ===\n")
+            
+        except Exception as e:
+            print(f"\n❌ Error during migration: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    migrate_summary_checkpoint()
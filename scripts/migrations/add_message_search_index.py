@@ -0,0 +1,47 @@
+"""
+Add Message Search Index (Postgres)
+- Adds a generated search_vector tsvector column and a GIN index to
+  chat_messages and messages, used for full-text memory and message search
+- Adding a stored generated column rewrites the table, so run this during a
+  quiet period; the GIN index is built CONCURRENTLY so writes keep flowing
+- SQLite needs nothing here: its FTS5 index is created on startup
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from backend import create_app
+from backend.database.models.models import db
+from backend.services.chat.lexical_index import INDEXED_TABLES, TSVECTOR_SCHEMA
+from sqlalchemy import text
+
+def migrate_message_search_index():
+    """Add search_vector columns and GIN indexes for full-text search"""
+    app, socketio = create_app()
+    
+    with app.app_context():
+        print("\n=== Adding Message Search Index ===\n")
+        
+        if db.engine.dialect.name != 'postgresql':
+            print(f"ℹ️  {db.engine.dialect.name} database: nothing to do (only Postgres uses search_vector)")
+            return
+        
+        try:
+            # CREATE INDEX CONCURRENTLY can't run inside a transaction
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                for table in INDEXED_TABLES:
+                    print(f"📝 Adding search_vector and its GIN index to {table}...")
+                    for statement in TSVECTOR_SCHEMA:
+                        conn.execute(text(statement.format(table=table)))
+                    print(f"✅ {table} is searchable")
+            
+            print("\nRestart the app to switch message search to the new index")
+            print("\n=== Migration Complete ===\n")
+            
+        except Exception as e:
+            print(f"\n❌ Error during migration: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    migrate_message_search_index()
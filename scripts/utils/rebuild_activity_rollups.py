@@ -0,0 +1,42 @@
+"""
+Rebuild Activity Rollups
+- Recomputes the daily_activity and activity_totals counters behind the
+  dashboards from chat_messages, messages, mood_entries and
+  exercise_completions (the app keeps them current on every write; run this
+  once after upgrading to rollups, and after importing data, editing rows
+  with raw SQL or changing metrics)
+- Works one user at a time with a GROUP BY per source table, each user in
+  its own transaction, so the live app keeps serving stats meanwhile
+- A write racing with a user's rebuild can be counted twice or missed;
+  rebuilding that user again fixes it
+
+Usage:
+    python scripts/utils/rebuild_activity_rollups.py                # every user
+    python scripts/utils/rebuild_activity_rollups.py --user-id 42
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import argparse
+import time
+
+from backend import create_app
+from backend.services.activity_rollups import rebuild_activity
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recompute dashboard activity rollups from the raw tables')
+    parser.add_argument('--user-id', type=int, default=None, help='only rebuild one user')
+    args = parser.parse_args()
+
+    app, _ = create_app()
+    with app.app_context():
+        started = time.monotonic()
+        users = rebuild_activity(args.user_id)
+        print(f"Rebuilt activity rollups for {users} users in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
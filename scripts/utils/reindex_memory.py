@@ -0,0 +1,212 @@
+"""
+Reindex Chat Memory
+- Backfills vector memory from the chat_messages table (vectors only exist
+  for messages sent while a vector backend was up)
+- Streams ChatMessage rows in keyset-paginated chunks (id > last id), embeds
+  each chunk in large batches and upserts chunks in parallel on a bounded
+  worker pool
+- Saves a checkpoint after every finished chunk, so an interrupted run
+  resumes where it stopped
+- Runs alongside the live app: vector IDs are content-addressed, so rows
+  that are already indexed are simply overwritten
+
+Usage:
+    python scripts/utils/reindex_memory.py                      # active backend, resume from checkpoint
+    python scripts/utils/reindex_memory.py --target local       # backfill the local NumPy store
+    python scripts/utils/reindex_memory.py --model text-embedding-3-large --target local \\
+        --vector-dir backend/database/instances/vectors-large    # migrate embedding model
+    python scripts/utils/reindex_memory.py --dimensions 512 --target local \\
+        --vector-dir backend/database/instances/vectors-512      # shorter vectors (set EMBEDDING_DIMENSIONS after)
+    python scripts/utils/reindex_memory.py --restart --user-id 42
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from backend import create_app
+from backend.database.models.models import db
+from backend.database.models.memory_models import ChatMessage
+from backend.services.chat import pinecone_service
+from backend.services.chat.context_builder import count_tokens
+from backend.services.vector_store import get_vector_store, LocalVectorStore, PineconeVectorStore
+
+DEFAULT_CHECKPOINT = os.path.abspath(os.path.join('backend', 'database', 'instances', 'reindex_checkpoint.json'))
+
+
+def load_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_checkpoint(path, data):
+    """Write the checkpoint atomically so a crash never leaves it half-written"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def iter_chunks(after_id, chunk_size, user_id=None):
+    """Yield lists of (id, user_id, persona, content) rows in id order, chunk_size at a time"""
+    while True:
+        query = db.session.query(ChatMessage.id, ChatMessage.user_id, ChatMessage.persona, ChatMessage.content) \
+            .filter(ChatMessage.id > after_id)
+        if user_id is not None:
+            query = query.filter(ChatMessage.user_id == user_id)
+
+        rows = query.order_by(ChatMessage.id).limit(chunk_size).all()
+        db.session.remove()  # Don't hold a connection/transaction between chunks
+        if not rows:
+            return
+
+        yield rows
+        after_id = rows[-1][0]
+
+
+def resolve_store(app, target, vector_dir):
+    if target == 'local':
+        return LocalVectorStore(
+            vector_dir or app.config['VECTOR_STORE_DIR'],
+            ann_min_vectors=app.config['LOCAL_ANN_MIN_VECTORS'],
+            nprobe=app.config['LOCAL_ANN_NPROBE'],
+        )
+    if target == 'pinecone':
+        if not pinecone_service.pinecone_ok:
+            raise SystemExit("Pinecone is not configured (PINECONE_API_KEY)")
+        return PineconeVectorStore(pinecone_service.index)
+
+    store = get_vector_store()
+    if store is None:
+        raise SystemExit("No vector store is active (VECTOR_STORE=none?)")
+    return store
+
+
+class Progress:
+    """Tracks finished chunks and advances the checkpoint only past contiguous ones"""
+
+    def __init__(self, checkpoint_path, state):
+        self.checkpoint_path = checkpoint_path
+        self.state = state
+        self.pending = []  # Last ids of submitted chunks, in order
+        self.finished = {}  # Last id -> row count of chunks done out of order
+        self.rows = 0
+        self.tokens = 0
+        self.vectors = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def submitted(self, last_id):
+        with self._lock:
+            self.pending.append(last_id)
+
+    def finished_chunk(self, last_id, rows, tokens, vectors):
+        with self._lock:
+            self.finished[last_id] = rows
+            self.rows += rows
+            self.tokens += tokens
+            self.vectors += vectors
+
+            advanced = False
+            while self.pending and self.pending[0] in self.finished:
+                self.state['last_id'] = self.pending.pop(0)
+                self.state['rows_done'] = self.state.get('rows_done', 0) + self.finished.pop(self.state['last_id'])
+                advanced = True
+
+            if advanced:
+                self.state['updated_at'] = time.time()
+                save_checkpoint(self.checkpoint_path, self.state)
+
+    def report(self, final=False):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        label = "Done" if final else "Progress"
+        print(f"{label}: {self.rows} rows, {self.vectors} vectors in {elapsed:.1f}s | "
+              f"{self.rows / elapsed:.1f} rows/s, {self.tokens / elapsed:.0f} tokens/s | "
+              f"checkpoint id {self.state.get('last_id', 0)}")
+
+
+def index_chunk(app, store, model, rows):
+    """Embed and upsert one chunk; returns (rows, tokens, vectors)"""
+    items = [(str(user_id), persona, content) for _, user_id, persona, content in rows if persona and content]
+    tokens = sum(count_tokens(content) for _, _, content in items)
+
+    with app.app_context():
+        vectors = pinecone_service.pinecone_upsert_many(items, raise_errors=True, store=store, model=model)
+    return len(rows), tokens, vectors
+
+
+def reindex(args):
+    app, _ = create_app()
+
+    state = {} if args.restart else load_checkpoint(args.checkpoint)
+    settings = {'target': args.target, 'model': args.model, 'dimensions': args.dimensions, 'user_id': args.user_id}
+    if state and state.get('settings') != settings:
+        raise SystemExit(f"Checkpoint {args.checkpoint} was written with {state.get('settings')}; "
+                         f"use --restart or a different --checkpoint")
+    state['settings'] = settings
+    if args.dimensions:
+        app.config['EMBEDDING_DIMENSIONS'] = args.dimensions
+
+    with app.app_context():
+        if not app.config.get('OPENAI_API_KEY'):
+            raise SystemExit("OPENAI_API_KEY is required to create embeddings")
+
+        store = resolve_store(app, args.target, args.vector_dir)
+        after_id = state.get('last_id', 0)
+        print(f"Reindexing chat memory into {store.name} from id > {after_id} "
+              f"(chunks of {args.chunk_size}, {args.workers} workers)")
+
+        progress = Progress(args.checkpoint, state)
+        in_flight = set()
+
+        with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix='reindex') as pool:
+            for rows in iter_chunks(after_id, args.chunk_size, args.user_id):
+                # Bounded: never read more than `workers` chunks ahead of the upserts
+                while len(in_flight) >= args.workers:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()  # Stop on the first failed chunk; the checkpoint stays behind it
+                    progress.report()
+
+                last_id = rows[-1][0]
+                progress.submitted(last_id)
+                future = pool.submit(index_chunk, app, store, args.model, rows)
+                future.add_done_callback(
+                    lambda f, last_id=last_id: not f.exception() and progress.finished_chunk(last_id, *f.result())
+                )
+                in_flight.add(future)
+
+            for future in in_flight:
+                future.result()
+
+    progress.report(final=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill vector memory from chat history')
+    parser.add_argument('--target', choices=['active', 'local', 'pinecone'], default='active',
+                        help='vector backend to write to (default: the one the app uses)')
+    parser.add_argument('--vector-dir', help='directory for --target local (default: VECTOR_STORE_DIR)')
+    parser.add_argument('--model', default=None, help='embedding model (default: the app embedding model)')
+    parser.add_argument('--dimensions', type=int, default=None,
+                        help='shortened embedding size for text-embedding-3 models (default: EMBEDDING_DIMENSIONS)')
+    parser.add_argument('--chunk-size', type=int, default=500, help='rows per chunk')
+    parser.add_argument('--workers', type=int, default=4, help='chunks embedded/upserted in parallel')
+    parser.add_argument('--user-id', type=int, default=None, help='only reindex one user')
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help='checkpoint file for resuming')
+    parser.add_argument('--restart', action='store_true', help='ignore the checkpoint and start from the first row')
+    reindex(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
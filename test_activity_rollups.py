@@ -0,0 +1,120 @@
+"""
+Test Activity Rollups
+Verify counters follow inserts, edits and deletes as they are flushed, that a
+rebuild from the raw tables gives the same counters, and that stats read them
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.abspath('.'))
+
+import pytest
+
+from backend.database.models.models import db, Message
+from backend.database.models.memory_models import ChatMessage
+from backend.database.models.wellness_models import MoodEntry, MoodScale
+from backend.database.models.exercise_models import ExerciseCompletion
+from backend.database.models.activity_models import DailyActivity, ActivityTotal
+from backend.services.activity_rollups import (
+    init_activity_rollups, lifetime_totals, subtract_rows, rebuild_activity, clear_user_activity
+)
+from backend.services.analytics_service import AnalyticsService
+from backend.services.achievements_service import AchievementsService
+from backend.services.memory_service import MemoryService
+from backend.funcs.users import get_user_statistics
+
+
+@pytest.fixture
+def app(app):
+    init_activity_rollups(app)
+    return app
+
+
+def _snapshot(user_id):
+    daily = {(row.day, row.metric): (row.count, row.total)
+             for row in DailyActivity.query.filter_by(user_id=user_id) if row.count or row.total}
+    totals = {row.metric: (row.count, row.total)
+              for row in ActivityTotal.query.filter_by(user_id=user_id) if row.count or row.total}
+    return daily, totals
+
+
+def _activity(user_id):
+    now = datetime.utcnow()
+    for i, (role, persona) in enumerate([('user', 'Maya'), ('assistant', 'Maya'), ('user', 'Alex')]):
+        db.session.add(ChatMessage(user_id=user_id, role=role, content=f"chat {i}", persona=persona,
+                                   timestamp=now - timedelta(days=i)))
+        db.session.add(Message(user_id=user_id, role=role, content=f"message {i}", persona=persona,
+                               timestamp=now - timedelta(days=40 * i)))
+    db.session.add(MoodEntry(user_id=user_id, overall_mood=MoodScale.GOOD, entry_date=now.date()))
+    db.session.add(MoodEntry(user_id=user_id, overall_mood=MoodScale.LOW, entry_date=now.date() - timedelta(days=1)))
+    db.session.add(ExerciseCompletion(user_id=user_id, exercise_type='breathing', exercise_name='Box Breathing',
+                                      duration_minutes=5))
+    db.session.add(ExerciseCompletion(user_id=user_id, exercise_type='meditation', exercise_name='Body Scan',
+                                      duration_minutes=15))
+    db.session.commit()
+
+
+def test_inserts_are_counted_on_flush(app):
+    _activity(1)
+
+    totals = lifetime_totals(1, 'chat_messages')
+    assert totals['chat_messages'].count == 3 and totals['chat_messages.user'].count == 2
+    assert totals['chat_messages.persona:Maya'].count == 2
+    assert lifetime_totals(1, 'mood_entries')['mood_entries'] == (2, 9)  # GOOD (7) + LOW (2)
+    assert lifetime_totals(2, 'chat_messages') == {}
+
+
+def test_edits_and_deletes_move_counters(app):
+    _activity(1)
+    mood = MoodEntry.query.filter_by(overall_mood=MoodScale.LOW).one()
+    mood.overall_mood = MoodScale.EXCELLENT
+    message = ChatMessage.query.filter_by(persona='Alex').one()
+    message.persona = 'Maya'
+    db.session.delete(ExerciseCompletion.query.filter_by(exercise_type='meditation').one())
+    db.session.commit()
+
+    assert lifetime_totals(1, 'mood_entries')['mood_entries'] == (2, 16)
+    assert lifetime_totals(1, 'chat_messages')['chat_messages.persona:Alex'].count == 0
+    exercises = lifetime_totals(1, 'exercise_completions')
+    assert exercises['exercise_completions'] == (1, 5)
+    assert exercises['exercise_completions.type:meditation'].count == 0
+
+
+def test_rebuild_matches_incremental_counters(app):
+    _activity(1)
+    _activity(2)
+    subtract_rows(ChatMessage, ChatMessage.user_id == 2, ChatMessage.role == 'assistant')
+    ChatMessage.query.filter_by(user_id=2, role='assistant').delete(synchronize_session=False)
+    db.session.commit()
+    before = _snapshot(1), _snapshot(2)
+
+    assert rebuild_activity() == 2
+    assert (_snapshot(1), _snapshot(2)) == before
+
+    clear_user_activity(2)
+    assert _snapshot(2) == ({}, {})
+
+
+def test_stats_read_rollups(app):
+    _activity(1)
+
+    memory = MemoryService.get_conversation_stats(1)
+    assert memory['total_messages'] == 3 and memory['persona_breakdown'] == {'Maya': 2, 'Alex': 1}
+    assert len(memory['daily_activity']) == 3
+
+    conversations = AnalyticsService.get_conversation_stats(1, days=7)
+    assert (conversations['user_messages'], conversations['ai_messages']) == (2, 1)
+    assert sum(conversations['daily_activity']['values']) == 3
+
+    overview = AnalyticsService.get_wellness_overview(1, days=7)
+    assert (overview['mood_checkins'], overview['exercises_completed'], overview['conversations']) == (2, 2, 2)
+    assert overview['average_mood'] == 4.5
+    assert AnalyticsService.get_mood_trends(1, days=7)['values'][-2:] == [2.0, 7.0]
+    assert AnalyticsService.get_exercise_stats(1)['by_type'] == {'breathing': 1, 'meditation': 1}
+
+    statistics = get_user_statistics(1)
+    assert (statistics['total_messages'], statistics['user_messages'], statistics['recent_activity']) == (3, 2, 1)
+
+    activities = AchievementsService.get_user_stats(1)['activities']
+    assert activities == {'moods': 2, 'exercises': 2, 'conversations': 2}
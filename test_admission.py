@@ -0,0 +1,66 @@
+"""
+Test Admission Control
+Verify concurrency limits, bounded queueing and load shedding
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.abspath('.'))
+
+import pytest
+
+from backend.services.admission import AdmissionLimiter, AdmissionRejected
+
+
+def test_admits_up_to_limit_without_waiting():
+    limiter = AdmissionLimiter('chat', max_concurrency=2, max_queue=0)
+    limiter.acquire()
+    limiter.acquire()
+
+    assert limiter.stats()['active'] == 2
+
+
+def test_rejects_when_queue_full():
+    limiter = AdmissionLimiter('chat', max_concurrency=1, max_queue=0)
+    limiter.acquire()
+
+    with pytest.raises(AdmissionRejected) as exc:
+        limiter.acquire()
+    assert exc.value.retry_after >= 1
+    assert limiter.stats()['rejected'] == 1
+
+
+def test_rejects_when_estimated_wait_too_long():
+    limiter = AdmissionLimiter('chat', max_concurrency=1, max_queue=10, max_wait=5, initial_latency=30)
+    limiter.acquire()
+
+    with pytest.raises(AdmissionRejected) as exc:
+        limiter.acquire()
+    assert exc.value.retry_after == 30
+
+
+def test_queued_request_gets_released_slot():
+    limiter = AdmissionLimiter('chat', max_concurrency=1, max_queue=1, max_wait=2, initial_latency=0.1)
+    limiter.acquire()
+    admitted = []
+
+    waiter = threading.Thread(target=lambda: admitted.append(limiter.acquire() is None))
+    waiter.start()
+    time.sleep(0.05)
+    assert limiter.stats()['waiting'] == 1
+
+    limiter.release(0.1)
+    waiter.join(1)
+    assert admitted == [True]
+    assert limiter.stats()['active'] == 1
+
+
+def test_latency_average_tracks_service_time():
+    limiter = AdmissionLimiter('chat', max_concurrency=4, max_queue=4, initial_latency=1.0, smoothing=0.5)
+    limiter.acquire()
+    limiter.release(5.0)
+
+    assert limiter.avg_latency == 3.0
+    assert limiter.estimated_wait(4) == 3.0
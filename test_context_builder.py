@@ -0,0 +1,75 @@
+"""
+Test Chat Context Window
+Verify token counting and where history/summary land in the chat payload
+"""
+
+import sys
+import os
+from types import SimpleNamespace
+sys.path.insert(0, os.path.abspath('.'))
+
+from flask import Flask
+
+from backend.services.chat.context_builder import (
+    count_tokens, count_message_tokens, empty_window, MESSAGE_OVERHEAD_TOKENS
+)
+from backend.services.chat.chat_service import _build_chat_payload
+from backend.routes.api import chat_routes
+
+
+def test_count_tokens():
+    assert count_tokens('') == 0
+    assert count_tokens(None) == 0
+    assert count_tokens('hello') >= 1
+    assert count_tokens('word ' * 200) > count_tokens('word ' * 20)
+
+
+def test_count_message_tokens_includes_overhead():
+    messages = [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'hello'}]
+    expected = count_tokens('hi') + count_tokens('hello') + 2 * MESSAGE_OVERHEAD_TOKENS
+    assert count_message_tokens(messages) == expected
+
+
+def test_payload_orders_summary_history_then_user():
+    history = {
+        'summary': 'User started a new job.',
+        'messages': [
+            {'role': 'user', 'content': 'first day was rough'},
+            {'role': 'assistant', 'content': 'That sounds hard.'},
+        ],
+    }
+    payload = _build_chat_payload('any tips?', 'Maya', 'Companion', None, chunks=[], history=history)
+    messages = payload['messages']
+
+    assert [m['role'] for m in messages] == ['system', 'system', 'user', 'assistant', 'user']
+    assert 'User started a new job.' in messages[1]['content']
+    assert messages[-1]['content'] == 'any tips?'
+
+
+def test_payload_without_history():
+    payload = _build_chat_payload('hi', 'Maya', 'Companion', None, chunks=[])
+    assert [m['role'] for m in payload['messages']] == ['system', 'user']
+
+
+def test_history_stage_fails_soft(monkeypatch):
+    def broken(user_id, persona):
+        raise RuntimeError('no such column')
+
+    monkeypatch.setattr(chat_routes, 'build_context_window', broken)
+    with Flask(__name__).app_context():
+        assert chat_routes._load_history(1, 'Maya') == empty_window()
+
+
+def test_chat_turn_jobs_share_one_user_id(app, monkeypatch):
+    queued = []
+    monkeypatch.setattr(chat_routes, 'enqueue_jobs', queued.extend)
+    monkeypatch.setattr(chat_routes, 'current_user', SimpleNamespace(id=1))
+    monkeypatch.setattr(chat_routes.MoodService, 'should_suggest_mood_checkin', lambda *a, **k: False)
+
+    chat_routes._finalize_chat_turn(
+        '1', 'hi', 'hello', 'Maya', None, None, False, False, None,
+        mood_context={'has_recent_mood': False}, voice_status={}, history={'needs_summary': True},
+    )
+
+    assert [name for name, _ in queued][-1] == 'memory.summarize'
+    assert {payload['user_id'] for _, payload in queued} == {'1'}
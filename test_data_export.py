@@ -0,0 +1,140 @@
+"""
+Test Streaming Data Export
+Verify keyset batching, incremental JSON/NDJSON output and background
+gzip/zip export files
+"""
+
+import sys
+import os
+import gzip
+import json
+import zipfile
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.abspath('.'))
+
+import pytest
+
+from backend.database.models.models import db, User, Message, Chat
+from backend.database.models.memory_models import ChatMessage, DataExport
+from backend.services.chat.context_builder import get_rolling_memory
+from backend.services.data_export import (
+    iter_rows, memory_export, render_export, export_response, request_export, run_export, get_export
+)
+from backend.funcs.admin import export_user_data
+
+
+@pytest.fixture
+def app(app, tmp_path):
+    app.config.update(EXPORT_BATCH_SIZE=2, EXPORT_DIR=str(tmp_path / 'exports'))
+
+    user = User(name='Sam', email='sam@example.com')
+    user.set_password('secret123')
+    db.session.add(user)
+    db.session.commit()
+    app.user_id = user.id
+    return app
+
+
+def _add_messages(user_id, count):
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        # Pairs share a timestamp so batches have to break ties on id
+        db.session.add(ChatMessage(user_id=user_id, role='user', content=f"message {i}", persona='Maya',
+                                   timestamp=start + timedelta(minutes=i // 2)))
+    db.session.commit()
+
+
+def test_keyset_batches_cover_every_row_once(app):
+    _add_messages(app.user_id, 7)
+    _add_messages(app.user_id + 1, 3)
+
+    rows = list(iter_rows([ChatMessage.id, ChatMessage.content, ChatMessage.timestamp],
+                          [ChatMessage.user_id == app.user_id], ChatMessage.timestamp, ChatMessage.id))
+
+    assert [row['content'] for row in rows] == [f"message {i}" for i in range(7)]
+
+
+def test_null_timestamps_are_exported_first(app):
+    for i in range(3):
+        db.session.add(Message(user_id=app.user_id, role='user', content=f"message {i}",
+                               timestamp=datetime(2024, 1, 1) + timedelta(minutes=i)))
+        message = Message(user_id=app.user_id, role='user', content=f"undated {i}")
+        db.session.add(message)
+        db.session.flush()
+        message.timestamp = None
+    db.session.commit()
+
+    rows = list(iter_rows([Message.id, Message.content, Message.timestamp],
+                          [Message.user_id == app.user_id], Message.timestamp, Message.id, batch_size=2))
+
+    assert [row['content'] for row in rows] == ['undated 0', 'undated 1', 'undated 2',
+                                                'message 0', 'message 1', 'message 2']
+
+
+def test_streamed_json_matches_contents(app):
+    _add_messages(app.user_id, 5)
+
+    with app.test_request_context():
+        response = export_response('memories', app.user_id, 'json')
+        assert response.is_streamed
+        body = json.loads(response.get_data(as_text=True))
+
+    assert body['total_messages'] == 5
+    assert body['user']['email'] == 'sam@example.com'
+    assert body['messages'][0] == {'id': 1, 'role': 'user', 'content': 'message 0', 'persona': 'Maya',
+                                   'timestamp': '2024-01-01T00:00:00', 'sentiment': None}
+
+
+def test_ndjson_has_header_then_one_line_per_row(app):
+    _add_messages(app.user_id, 3)
+
+    lines = ''.join(render_export(*memory_export(app.user_id), fmt='ndjson')).splitlines()
+
+    assert [json.loads(line)['section'] for line in lines] == ['header', 'messages', 'messages', 'messages']
+
+
+def test_memory_export_includes_rolling_summary_and_facts(app):
+    _add_messages(app.user_id, 2)
+    memory = get_rolling_memory(app.user_id, 'Maya', create=True)
+    memory.summary = 'Talked about exams'
+    memory.key_topics = 'exams,sleep'
+    memory.important_facts = json.dumps(['Studies biology'])
+    db.session.commit()
+
+    body = json.loads(''.join(render_export(*memory_export(app.user_id))))
+
+    assert [(s['persona'], s['summary'], s['key_topics'], s['important_facts']) for s in body['summaries']] == \
+        [('Maya', 'Talked about exams', ['exams', 'sleep'], ['Studies biology'])]
+
+
+def test_background_gzip_and_zip_exports(app):
+    _add_messages(app.user_id, 3)
+
+    gz = request_export(app.user_id, 'memories', 'ndjson', 'gzip')
+    assert app.queued == [('data.export', {'export_id': gz.id})]
+    run_export(gz.id)
+    gz = get_export(gz.id, app.user_id)
+    assert gz.status == 'done' and gz.download_name.endswith('.ndjson.gz')
+    with gzip.open(gz.path, 'rt', encoding='utf-8') as f:
+        assert len(f.read().splitlines()) == 4
+
+    archive = request_export(app.user_id, 'user_data', 'json', 'zip')
+    run_export(archive.id)
+    with zipfile.ZipFile(db.session.get(DataExport, archive.id).path) as zf:
+        assert json.loads(zf.read('mybella_user_data.json'))['user_info']['name'] == 'Sam'
+
+    assert get_export(archive.id, app.user_id + 1) is None
+
+
+def test_admin_export_user_data(app):
+    chat = Chat(user_id=app.user_id, title='First chat', persona='Maya')
+    db.session.add(chat)
+    db.session.add(Message(user_id=app.user_id, role='user', content='hello', persona='Maya',
+                           timestamp=datetime(2024, 1, 1)))
+    db.session.commit()
+
+    data = export_user_data(app.user_id)
+
+    assert data['messages'][0]['timestamp'] == '2024-01-01T00:00:00'
+    assert [c['title'] for c in data['chats']] == ['First chat']
+    assert export_user_data(app.user_id + 99) is None
@@ -0,0 +1,83 @@
+"""
+Test Embedding Cache
+Verify memory/disk lookups, persistence across instances and periodic LRU eviction
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.abspath('.'))
+
+from backend.services.chat import embedding_cache
+from backend.services.chat.embedding_cache import EmbeddingCache
+
+MODEL = 'text-embedding-3-small'
+
+
+def _cache(**kwargs):
+    return EmbeddingCache(os.path.join(tempfile.mkdtemp(), 'embeddings.db'), **kwargs)
+
+
+def test_miss_then_memory_hit():
+    cache = _cache()
+    assert cache.get_many(MODEL, ['hi']) == [None]
+
+    cache.put_many(MODEL, ['hi'], [[0.5, 0.25]])
+    assert cache.get_many(MODEL, ['hi', 'other']) == [[0.5, 0.25], None]
+
+    stats = cache.stats()
+    assert stats['memory_hits'] == 1
+    assert stats['misses'] == 2
+
+
+def test_disk_hit_from_new_instance():
+    """A second process (worker) sees embeddings stored by the first"""
+    cache = _cache()
+    cache.put_many(MODEL, ['hi'], [[0.5, 0.25]])
+
+    other = EmbeddingCache(cache.db_path)
+    assert other.get_many(MODEL, ['hi', 'hi']) == [[0.5, 0.25], [0.5, 0.25]]
+    assert other.stats()['disk_hits'] == 2
+    assert other.get_many(MODEL, ['hi']) == [[0.5, 0.25]]
+    assert other.stats()['memory_hits'] == 1
+
+
+def test_keyed_by_model():
+    cache = _cache()
+    cache.put_many(MODEL, ['hi'], [[1.0]])
+    assert cache.get_many('text-embedding-3-large', ['hi']) == [None]
+
+
+def test_size_bounded_eviction():
+    cache = _cache(memory_entries=1, max_entries=2)
+    cache.put_many(MODEL, ['a'], [[1.0]])
+    cache.put_many(MODEL, ['b'], [[2.0]])
+    cache.put_many(MODEL, ['c'], [[3.0]])
+
+    fresh = EmbeddingCache(cache.db_path, max_entries=2)
+    assert fresh.get_many(MODEL, ['a', 'b', 'c']) == [None, [2.0], [3.0]]
+
+
+def _rows(cache):
+    return cache._conn().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+def test_eviction_runs_every_few_writes():
+    cache = _cache(max_entries=2, evict_every=3)
+    cache.put_many(MODEL, ['a'], [[1.0]])  # First write checks
+    cache.put_many(MODEL, ['b', 'c'], [[2.0], [3.0]])
+    assert _rows(cache) == 3  # Over the bound until the next check
+
+    cache.put_many(MODEL, ['d'], [[4.0]])
+    assert _rows(cache) == 2
+    assert EmbeddingCache(cache.db_path).get_many(MODEL, ['c', 'd']) == [[3.0], [4.0]]
+
+
+def test_large_lookup_is_chunked(monkeypatch):
+    monkeypatch.setattr(embedding_cache, 'LOOKUP_CHUNK', 7)
+    cache = _cache(memory_entries=1)
+    texts = [f"text {i}" for i in range(20)]
+    cache.put_many(MODEL, texts, [[float(i)] for i in range(20)])
+
+    found = EmbeddingCache(cache.db_path).get_many(MODEL, texts + ['missing'])
+    assert found == [[float(i)] for i in range(20)] + [None]
@@ -0,0 +1,73 @@
+"""
+Test Idempotency Store
+Verify in-flight coalescing, replay and abandon for duplicate chat requests
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.abspath('.'))
+
+from backend.services.chat.idempotency import IdempotencyStore, make_key, NEW, REPLAY, PENDING
+
+
+def test_completed_response_is_replayed():
+    store = IdempotencyStore()
+    key = make_key(1, 'msg-1')
+
+    assert store.begin(key) == (NEW, None)
+    store.complete(key, {'text': 'hi'})
+
+    assert store.begin(key) == (REPLAY, {'text': 'hi'})
+    assert store.stats()['replays'] == 1
+
+
+def test_in_flight_duplicate_waits_for_result():
+    store = IdempotencyStore()
+    key = make_key(1, 'msg-1')
+    store.begin(key)
+    results = []
+
+    waiter = threading.Thread(target=lambda: results.append(store.begin(key)))
+    waiter.start()
+    time.sleep(0.05)
+    store.complete(key, {'text': 'hi'})
+    waiter.join(1)
+
+    assert results == [(REPLAY, {'text': 'hi'})]
+    assert store.stats()['coalesced'] == 1
+
+
+def test_abandoned_key_can_be_claimed_again():
+    store = IdempotencyStore()
+    key = make_key(1, 'msg-1')
+    store.begin(key)
+    store.abandon(key)
+
+    assert store.begin(key) == (NEW, None)
+
+
+def test_pending_after_wait_timeout():
+    store = IdempotencyStore(wait_timeout=0.05)
+    key = make_key(1, 'msg-1')
+    store.begin(key)
+
+    assert store.begin(key) == (PENDING, None)
+
+
+def test_expired_entries_run_again():
+    store = IdempotencyStore(ttl=0.01)
+    key = make_key(1, 'msg-1')
+    store.begin(key)
+    store.complete(key, {'text': 'hi'})
+    time.sleep(0.02)
+
+    assert store.begin(key) == (NEW, None)
+
+
+def test_keys_are_scoped_per_user():
+    assert make_key(1, 'msg-1') != make_key(2, 'msg-1')
+    assert make_key(1, '') is None
+    assert make_key(1, None) is None
+    assert make_key(1, 'x' * 500) is None
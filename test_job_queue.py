@@ -0,0 +1,204 @@
+"""
+Test Durable Job Queue
+Verify enqueue/claim/complete, retry backoff, dead-lettering and crash recovery,
+that a failed batch only retries the jobs that fail on their own, and that
+worker lanes and heartbeats keep slow jobs from blocking or being run twice
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+sys.path.insert(0, os.path.abspath('.'))
+
+from flask import Flask
+
+from backend.services.jobs.job_queue import JobQueue
+from backend.services.jobs.handlers import job_handler
+from backend.services.jobs.worker import process_next, start_worker_threads
+
+calls = []
+release = threading.Event()
+
+
+@job_handler('test.batch', batch=True)
+def _batch_handler(payloads):
+    calls.append(len(payloads))
+    if any(payload.get('bad') for payload in payloads):
+        raise ValueError('bad payload')
+
+
+@job_handler('test.slow')
+def _slow_handler(seconds=None):
+    if seconds is None:
+        release.wait(5)
+    else:
+        time.sleep(seconds)
+
+
+@job_handler('test.fast')
+def _fast_handler(n):
+    calls.append(n)
+
+
+def _queue(**kwargs):
+    db_path = os.path.join(tempfile.mkdtemp(), 'jobs.db')
+    return JobQueue(db_path, **kwargs)
+
+
+def test_enqueue_claim_complete():
+    """Jobs come back in order and disappear once completed"""
+    queue = _queue()
+    queue.enqueue_many([
+        ('memory.upsert', {'user_id': '1', 'persona': 'Isabella', 'text': 'hi'}),
+        ('memory.upsert', {'user_id': '1', 'persona': 'Isabella', 'text': 'hello'}),
+    ])
+
+    job = queue.claim('worker-a')
+    assert job['payload']['text'] == 'hi'
+    assert job['attempts'] == 1
+    assert queue.stats()['running'] == 1
+
+    queue.complete(job['id'])
+    assert queue.claim('worker-a')['payload']['text'] == 'hello'
+    assert queue.claim('worker-a') is None
+
+
+def test_retry_then_dead_letter():
+    """Failed jobs are rescheduled with backoff, then dead-lettered"""
+    queue = _queue(max_attempts=2, backoff_base=0.01)
+    queue.enqueue('firestore.store_message', {'text': 'x'})
+
+    job = queue.claim('worker-a')
+    assert queue.fail(job, RuntimeError('boom')) == 'retry'
+
+    time.sleep(0.05)
+    job = queue.claim('worker-a')
+    assert job['attempts'] == 2
+    assert queue.fail(job, RuntimeError('boom again')) == 'dead'
+
+    assert queue.claim('worker-a') is None
+    dead = queue.dead_letters()
+    assert len(dead) == 1 and dead[0]['last_error'] == 'boom again'
+
+    assert queue.requeue_dead() == 1
+    assert queue.claim('worker-a')['attempts'] == 1
+
+
+def test_survives_restart_and_reclaims_stale_jobs():
+    """A job locked by a crashed worker is picked up again by a new queue instance"""
+    queue = _queue(visibility_timeout=0.01)
+    queue.enqueue('memory.upsert', {'text': 'keep me'})
+    queue.claim('crashed-worker')
+
+    time.sleep(0.05)
+    restarted = JobQueue(queue.db_path, visibility_timeout=0.01)
+    job = restarted.claim('worker-b')
+    assert job['payload']['text'] == 'keep me'
+    assert job['attempts'] == 2
+
+
+def test_claim_batch_of_one_type():
+    """Batch claims take only due pending jobs of the requested type"""
+    queue = _queue()
+    queue.enqueue_many([
+        ('memory.upsert', {'text': 'a'}),
+        ('firestore.store_message', {'text': 'b'}),
+        ('memory.upsert', {'text': 'c'}),
+        ('memory.upsert', {'text': 'd'}),
+    ])
+
+    jobs = queue.claim_batch('worker-a', 'memory.upsert', 2)
+    assert [job['payload']['text'] for job in jobs] == ['a', 'c']
+    assert all(job['attempts'] == 1 for job in jobs)
+
+    queue.complete_many([job['id'] for job in jobs])
+    assert queue.stats() == {'pending': 2, 'running': 0, 'dead': 0}
+
+
+def _batch_app():
+    app = Flask(__name__)
+    app.config.update(JOB_BATCH_WINDOW=0, JOB_BATCH_SIZE=100)
+    return app
+
+
+def test_failed_batch_only_retries_the_bad_job():
+    queue = _queue()
+    queue.enqueue_many([('test.batch', {'n': i, 'bad': i == 5}) for i in range(16)])
+    calls.clear()
+
+    assert process_next(_batch_app(), queue, 'worker-a')
+
+    assert queue.stats() == {'pending': 1, 'running': 0, 'dead': 0}
+    assert len(calls) <= 2 * 4 + 1  # Whole batch, then two halves per level down to the bad job
+    retried = queue._conn().execute("SELECT payload, last_error FROM jobs").fetchone()
+    assert '"n": 5' in retried['payload'] and retried['last_error'] == 'bad payload'
+
+
+def test_failing_upstream_fails_batch_without_probing_every_job():
+    queue = _queue()
+    queue.enqueue_many([('test.batch', {'n': i, 'bad': True}) for i in range(64)])
+    calls.clear()
+
+    process_next(_batch_app(), queue, 'worker-a')
+
+    assert queue.stats()['pending'] == 64
+    assert len(calls) <= 2 * 7 + 2
+
+
+def test_claim_within_a_lane():
+    queue = _queue()
+    queue.enqueue_many([('memory.delete', {'n': 1}), ('memory.upsert', {'n': 2})])
+
+    assert queue.claim('slow', job_types=['memory.delete', 'data.export'])['payload'] == {'n': 1}
+    assert queue.claim('slow', job_types=['memory.delete', 'data.export']) is None
+    assert queue.claim('default', exclude_types=['memory.delete'])['payload'] == {'n': 2}
+
+
+def test_heartbeat_keeps_running_job_from_being_reclaimed():
+    queue = _queue(visibility_timeout=0.3)
+    queue.enqueue('test.slow', {'seconds': 0.8})
+    worker = threading.Thread(target=process_next, args=(_batch_app(), queue, 'worker-a'))
+    worker.start()
+
+    time.sleep(0.5)
+    assert queue.claim('worker-b') is None
+
+    worker.join()
+    assert queue.stats() == {'pending': 0, 'running': 0, 'dead': 0}
+
+
+def test_slow_lane_does_not_hold_up_other_jobs():
+    queue = _queue()
+    app = _batch_app()
+    app.config['JOB_SLOW_TYPES'] = ['test.slow']
+    stop = threading.Event()
+    release.clear()
+    calls.clear()
+    start_worker_threads(app, queue, stop)
+
+    queue.enqueue('test.slow', {})
+    time.sleep(0.1)
+    queue.enqueue('test.fast', {'n': 1})
+    deadline = time.time() + 2
+    while not calls and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert calls == [1]
+    assert queue.stats()['running'] == 1  # The slow job is still going
+    stop.set()
+    release.set()
+
+
+if __name__ == '__main__':
+    test_enqueue_claim_complete()
+    test_retry_then_dead_letter()
+    test_survives_restart_and_reclaims_stale_jobs()
+    test_claim_batch_of_one_type()
+    test_failed_batch_only_retries_the_bad_job()
+    test_failing_upstream_fails_batch_without_probing_every_job()
+    test_claim_within_a_lane()
+    test_heartbeat_keeps_running_job_from_being_reclaimed()
+    test_slow_lane_does_not_hold_up_other_jobs()
+    print("✅ Job queue tests passed")
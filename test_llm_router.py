@@ -0,0 +1,111 @@
+"""
+Test LLM Router
+Verify failover, circuit breaking and hedging across providers
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.abspath('.'))
+
+import pytest
+
+from backend.services.llm import LLMRouter, StubProvider, OpenAICompatibleProvider, CircuitBreaker, LLMUnavailableError
+
+PAYLOAD = {'model': 'gpt-4o-mini', 'messages': [{'role': 'user', 'content': 'hello'}]}
+
+
+def test_failover_to_next_provider():
+    broken = StubProvider('primary', fail=True)
+    backup = StubProvider('backup')
+    router = LLMRouter([broken, backup], hedge=False)
+
+    result = router.complete(PAYLOAD)
+
+    assert result['choices'][0]['message']['content'] == '(stub) I hear you: hello'
+    assert router.stats()['failovers'] == 1
+
+
+def test_all_providers_failing_raises():
+    router = LLMRouter([StubProvider('a', fail=True), StubProvider('b', fail=True)], hedge=False)
+
+    with pytest.raises(LLMUnavailableError):
+        router.complete(PAYLOAD)
+    assert router.stats()['failures'] == 1
+
+
+def test_open_circuit_skips_provider():
+    broken = StubProvider('primary', fail=True)
+    backup = StubProvider('backup')
+    router = LLMRouter([broken, backup], hedge=False, failure_threshold=2, reset_timeout=60)
+
+    for _ in range(3):
+        router.complete(PAYLOAD)
+
+    assert broken.calls == 2
+    assert router.stats()['providers']['primary']['state'] == 'open'
+
+
+def test_circuit_breaker_half_open_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    assert not breaker.allow_request()
+
+    time.sleep(0.02)
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # Only one trial at a time
+
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+
+def test_slow_request_is_hedged():
+    provider = StubProvider('primary')
+    router = LLMRouter([provider], hedge_min_delay=0.05, hedge_budget=1.0)
+    for _ in range(20):
+        router.complete(PAYLOAD)
+
+    provider.latency = 0.3
+    router.complete(PAYLOAD)
+
+    assert router.stats()['hedges_sent'] == 1
+
+
+def test_queued_attempt_gets_remaining_deadline():
+    class RecordingProvider(StubProvider):
+        def complete(self, payload, timeout=None):
+            self.timeouts.append(timeout)
+            return super().complete(payload, timeout)
+
+    provider = RecordingProvider('primary')
+    provider.timeouts = []
+    router = LLMRouter([provider], timeout=1.0, hedge=False, max_workers=1)
+    router._pool.submit(time.sleep, 0.3)  # Hold the only pool thread
+
+    router.complete(PAYLOAD)
+
+    assert provider.timeouts[0] <= 0.75
+
+
+def test_pool_sized_for_admitted_hedges():
+    from backend.services.llm.router import build_router
+
+    assert build_router({'LLM_PROVIDERS': 'stub', 'ADMISSION_CHAT_CONCURRENCY': 32})._pool._max_workers == 68
+    assert build_router({'LLM_PROVIDERS': 'stub', 'LLM_MAX_WORKERS': 8})._pool._max_workers == 8
+
+
+def test_stream_fails_over_before_first_chunk():
+    router = LLMRouter([StubProvider('primary', fail=True), StubProvider('backup')], hedge=False)
+
+    text = ''.join(chunk['choices'][0]['delta']['content'] for chunk in router.stream(PAYLOAD))
+
+    assert text == '(stub) I hear you: hello'
+
+
+def test_response_format_only_sent_to_json_mode_providers():
+    payload = {'messages': [], 'response_format': {'type': 'json_object'}}
+
+    assert 'response_format' in OpenAICompatibleProvider('openai', 'https://api.openai.com/v1', 'key')._payload(payload)
+    local = 'http://localhost:11434/v1'
+    assert 'response_format' not in OpenAICompatibleProvider('fallback', local, None)._payload(payload)
+    assert 'response_format' in OpenAICompatibleProvider('fallback', local, None, json_mode=True)._payload(payload)
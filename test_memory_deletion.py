@@ -0,0 +1,234 @@
+"""
+Test Memory Deletion Pipeline
+Verify tombstones hide deleted memory right away and the background job
+removes it from SQL, vector memory and Firestore in chunks, keeping vectors
+other messages share and restoring those of messages sent after a reset
+"""
+
+import sys
+import os
+import json
+sys.path.insert(0, os.path.abspath('.'))
+
+import pytest
+
+from backend.database.models.models import db
+from backend.database.models.memory_models import ChatMessage, MemoryDeletion, MemoryTombstone
+from backend.services.chat.context_builder import build_context_window, get_rolling_memory
+from backend.services.chat.memory_deletion import (
+    request_deletion, run_deletion, filter_tombstoned_matches, filter_tombstoned_payloads
+)
+from backend.services.firebase import firebase_service
+from backend.services.vector_store import LocalVectorStore, set_vector_store, vector_id
+
+
+@pytest.fixture
+def app(app, tmp_path):
+    app.config.update(MEMORY_DELETE_CHUNK_SIZE=2)
+
+    store = LocalVectorStore(str(tmp_path / 'vectors'))
+    set_vector_store(store)
+    app.store = store
+    yield app
+    set_vector_store(None)
+
+
+def _add(app, content, persona='Maya', user_id=1):
+    message = ChatMessage(user_id=user_id, role='user', content=content, persona=persona)
+    db.session.add(message)
+    db.session.commit()
+    app.store.upsert([{'id': vector_id(str(user_id), persona, content), 'values': [1.0, 0.0],
+                       'metadata': {'user_id': str(user_id), 'persona': persona, 'text': content}}])
+    return message
+
+
+def test_selected_messages_hidden_then_deleted(app):
+    keep = _add(app, 'I love hiking')
+    gone = _add(app, 'My old address is 12 Elm St')
+    deletion = request_deletion(1, message_ids=[gone.id])
+
+    assert app.queued == [('memory.delete', {'deletion_id': deletion.id})]
+    matches = app.store.query([1.0, 0.0], '1', 'Maya', top_k=5)
+    assert [m['metadata']['text'] for m in filter_tombstoned_matches('1', 'Maya', matches)] == ['I love hiking']
+    assert filter_tombstoned_payloads([{'user_id': '1', 'persona': 'Maya', 'text': gone.content}]) == []
+
+    run_deletion(deletion.id)
+
+    deletion = db.session.get(MemoryDeletion, deletion.id)
+    assert deletion.status == 'done'
+    assert (deletion.sql_deleted, deletion.vectors_deleted) == (1, 1)
+    assert [m.id for m in ChatMessage.query.all()] == [keep.id]
+    assert [m['metadata']['text'] for m in app.store.query([1.0, 0.0], '1', 'Maya')] == ['I love hiking']
+    assert MemoryTombstone.query.count() == 0
+
+
+def test_persona_reset_spares_later_messages_and_other_personas(app):
+    for i in range(5):
+        _add(app, f"maya message {i}")
+    _add(app, 'isabella message', persona='Isabella')
+    deletion = request_deletion(1, persona='Maya')
+    newer = _add(app, 'sent after the reset')
+
+    assert filter_tombstoned_matches('1', 'Maya', [{'id': 'x'}]) == []
+    assert filter_tombstoned_payloads([
+        {'user_id': '1', 'persona': 'Maya', 'text': 'maya message 1', 'message_id': 1},
+        {'user_id': '1', 'persona': 'Maya', 'text': newer.content, 'message_id': newer.id},
+    ]) == [{'user_id': '1', 'persona': 'Maya', 'text': newer.content, 'message_id': newer.id}]
+
+    run_deletion(deletion.id)
+
+    assert db.session.get(MemoryDeletion, deletion.id).sql_deleted == 5
+    assert sorted(m.content for m in ChatMessage.query.all()) == ['isabella message', 'sent after the reset']
+    assert len(app.store.query([1.0, 0.0], '1', 'Isabella')) == 1
+    # The persona's vectors went in bulk, the newer message's included: it's queued to be stored again
+    assert ('memory.upsert', {'user_id': '1', 'persona': 'Maya', 'text': newer.content,
+                              'message_id': newer.id}) in app.queued
+
+
+def _remember(persona, through_message_id, user_id=1):
+    memory = get_rolling_memory(user_id, persona, create=True)
+    memory.summary = f"Talked with {persona} about moving"
+    memory.key_topics = 'moving'
+    memory.user_mood = 'anxious'
+    memory.important_facts = json.dumps(['Lives on Elm St'])
+    memory.summarized_through_id = through_message_id
+    db.session.commit()
+
+
+def test_persona_reset_forgets_rolling_summary_and_facts(app):
+    message = _add(app, 'I live on Elm St')
+    _add(app, 'isabella message', persona='Isabella')
+    _remember('Maya', message.id)
+    _remember('Isabella', message.id)
+
+    run_deletion(request_deletion(1, persona='maya').id)
+
+    window = build_context_window(1, 'Maya')
+    assert (window['summary'], window['facts'], window['messages']) == (None, [], [])
+    assert build_context_window(1, 'Isabella')['facts'] == ['Lives on Elm St']
+
+    run_deletion(request_deletion(1).id)
+    assert build_context_window(1, 'Isabella')['summary'] is None
+
+
+def test_deleting_messages_clears_summary_for_rebuild(app):
+    keep = _add(app, 'I love hiking')
+    gone = _add(app, 'I live on Elm St')
+    _remember('Maya', gone.id)
+
+    run_deletion(request_deletion(1, message_ids=[gone.id]).id)
+
+    memory = get_rolling_memory(1, 'Maya')
+    assert (memory.summary, memory.key_topics, memory.user_mood, memory.important_facts) == (None, None, None, None)
+    assert memory.summarized_through_id == 0
+    assert build_context_window(1, 'Maya')['messages'] == [{'role': 'user', 'content': keep.content}]
+
+
+def test_delete_all_removes_every_persona(app):
+    _add(app, 'one')
+    _add(app, 'two', persona='Isabella')
+    _add(app, 'other user', user_id=2)
+
+    run_deletion(request_deletion(1).id)
+
+    assert [m.content for m in ChatMessage.query.all()] == ['other user']
+    assert app.store.query([1.0, 0.0], '1', 'Isabella') == []
+    assert len(app.store.query([1.0, 0.0], '2', 'Maya')) == 1
+
+
+def test_shared_vector_kept_until_its_last_message_is_deleted(app):
+    first = _add(app, 'ok')
+    second = _add(app, 'Ok!')
+    assert first.vector_id == second.vector_id
+
+    deletion = request_deletion(1, message_ids=[first.id])
+    run_deletion(deletion.id)
+
+    assert db.session.get(MemoryDeletion, deletion.id).vectors_deleted == 0
+    assert [m['metadata']['text'] for m in app.store.query([1.0, 0.0], '1', 'Maya')] == ['Ok!']
+
+    run_deletion(request_deletion(1, message_ids=[second.id]).id)
+    assert app.store.query([1.0, 0.0], '1', 'Maya') == []
+
+
+def test_messages_stored_before_vector_ids_are_backfilled(app):
+    message = _add(app, 'I moved to Lisbon last year')
+    ChatMessage.query.update({'vector_id': None}, synchronize_session=False)
+    db.session.commit()
+
+    run_deletion(request_deletion(1, message_ids=[message.id]).id)
+
+    assert app.store.query([1.0, 0.0], '1', 'Maya') == []
+
+
+def test_message_ids_must_be_integers(app):
+    with pytest.raises(ValueError):
+        request_deletion(1, message_ids=['1', 'abc'])
+    with pytest.raises(ValueError):
+        request_deletion(1, message_ids='1,2')
+
+    assert MemoryDeletion.query.count() == 0
+    assert json.loads(request_deletion(1, message_ids=['2', 1, 2]).message_ids) == [1, 2]
+
+
+class FakeFirestore:
+    """Documents by path, with just the client calls the Firestore service makes"""
+
+    def __init__(self):
+        self.docs = {}
+
+    def collection(self, name):
+        return FakeReference(self, (name,))
+
+    def get_all(self, references):
+        return [FakeSnapshot(reference, reference.path in self.docs) for reference in references]
+
+    def batch(self):
+        return FakeBatch(self)
+
+
+class FakeReference:
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+
+    def collection(self, name):
+        return FakeReference(self.client, self.path + (name,))
+
+    document = collection
+
+    def set(self, data):
+        self.client.docs[self.path] = data
+
+
+class FakeSnapshot:
+    def __init__(self, reference, exists):
+        self.reference = reference
+        self.exists = exists
+
+
+class FakeBatch:
+    def __init__(self, client):
+        self.client = client
+
+    def delete(self, reference):
+        self.client.docs.pop(reference.path, None)
+
+    def commit(self):
+        pass
+
+
+def test_firestore_copies_deleted_by_message_id(app, monkeypatch):
+    client = FakeFirestore()
+    monkeypatch.setattr(firebase_service, 'fstore', client)
+    monkeypatch.setattr(firebase_service, 'firebase_ok', True)
+    first = _add(app, 'same words')
+    second = _add(app, 'same words')
+    for message in (first, second):
+        firebase_service.store_message_firestore('1', 'Maya', 'user', message.content, message_id=message.id)
+
+    deletion = request_deletion(1, message_ids=[first.id])
+    run_deletion(deletion.id)
+
+    assert db.session.get(MemoryDeletion, deletion.id).firestore_deleted == 1
+    assert [doc['message_id'] for doc in client.docs.values()] == [second.id]
@@ -0,0 +1,106 @@
+"""
+Test Hybrid Memory Retrieval
+Verify the FTS5 chat index, rank fusion, recency weighting and the
+lexical-only fallback when vector search is slow
+"""
+
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.abspath('.'))
+
+import pytest
+
+from backend.database.models.models import db
+from backend.database.models.memory_models import ChatMessage
+from backend.services.chat import lexical_index, memory_retriever
+from backend.services.chat.lexical_index import init_lexical_index, search_chat_messages, build_match_query
+from backend.services.chat.memory_retriever import retrieve_memory, reciprocal_rank_fusion, recency_boost
+
+
+@pytest.fixture
+def app(app):
+    app.config.update(MEMORY_VECTOR_BUDGET_MS=100)
+    init_lexical_index(app)
+    return app
+
+
+def _add(user_id, content, persona='Maya', days_ago=0):
+    message = ChatMessage(user_id=user_id, role='user', content=content, persona=persona,
+                          timestamp=datetime.utcnow() - timedelta(days=days_ago))
+    db.session.add(message)
+    db.session.commit()
+    return message
+
+
+def test_build_match_query_drops_stopwords():
+    assert build_match_query('What is my dog called?') == '"dog" OR "called"'
+    assert build_match_query('is it') is None
+
+
+def test_search_is_scoped_and_synced(app):
+    _add(1, 'My dog Biscuit loves the beach')
+    _add(1, 'Work was stressful today')
+    _add(2, 'My dog is a poodle')
+    _add(1, 'Dog walking with Maya', persona='Other')
+
+    hits = search_chat_messages(1, 'maya', 'tell me about my dog')
+    assert [hit['text'] for hit in hits] == ['My dog Biscuit loves the beach']
+
+    ChatMessage.query.filter_by(content='My dog Biscuit loves the beach').delete()
+    db.session.commit()
+    assert search_chat_messages(1, 'Maya', 'dog') == []
+
+
+def test_rrf_counts_shared_results_once():
+    fused = reciprocal_rank_fusion([['a', 'b'], ['b', 'c']], k=60)
+
+    assert fused['b']['score'] > fused['a']['score'] > fused['c']['score']
+    assert len(fused) == 3
+
+
+def test_recency_boost_halves_with_age():
+    now = datetime(2026, 1, 31)
+    assert recency_boost(now, now, 0.5, 30) == 1.5
+    assert recency_boost(now - timedelta(days=30), now, 0.5, 30) == pytest.approx(1.25)
+    assert recency_boost(None, now, 0.5, 30) == 1.0
+
+
+def test_recent_lexical_match_ranks_first(app, monkeypatch):
+    _add(1, 'Biscuit the dog chewed my shoes', days_ago=200)
+    _add(1, 'Took the dog to the vet', days_ago=1)
+    monkeypatch.setattr(memory_retriever, 'retrieve_chunks', lambda *args, **kwargs: [])
+
+    assert retrieve_memory(1, 'Maya', 'dog', top_k=2)[0] == 'Took the dog to the vet'
+
+
+def test_slow_vector_search_falls_back_to_lexical(app, monkeypatch):
+    _add(1, 'Exams start next week')
+
+    def slow_vectors(*args, **kwargs):
+        time.sleep(0.5)
+        return ['from vectors']
+
+    monkeypatch.setattr(memory_retriever, 'retrieve_chunks', slow_vectors)
+    before = memory_retriever.get_memory_retrieval_stats()['vector_timeouts']
+
+    started = time.monotonic()
+    assert retrieve_memory(1, 'Maya', 'when are my exams') == ['Exams start next week']
+    assert time.monotonic() - started < 0.4
+    assert memory_retriever.get_memory_retrieval_stats()['vector_timeouts'] == before + 1
+
+
+def test_fuses_vector_and_lexical(app, monkeypatch):
+    _add(1, 'Exams start next week')
+    monkeypatch.setattr(memory_retriever, 'retrieve_chunks',
+                        lambda *args, **kwargs: ['Feeling anxious lately', 'Exams start next week'])
+
+    assert retrieve_memory(1, 'Maya', 'exams') == ['Exams start next week', 'Feeling anxious lately']
+
+
+def test_index_unavailable_returns_vector_results(app, monkeypatch):
+    monkeypatch.setattr(lexical_index, 'search_backend', None)
+    monkeypatch.setattr(memory_retriever, 'retrieve_chunks', lambda *args, **kwargs: ['from vectors'])
+
+    assert retrieve_memory(1, 'Maya', 'anything') == ['from vectors']
@@ -0,0 +1,106 @@
+"""
+Test Message Search
+Verify full-text search over chat history: index kept in sync on insert and
+delete, ranking, highlighting, pagination and the substring fallback
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath('.'))
+
+import pytest
+
+from backend.database.models.models import db, Message
+from backend.database.models.memory_models import ChatMessage
+from backend.services.chat import lexical_index
+from backend.services.chat.lexical_index import init_lexical_index, search_messages, build_search_query
+from backend.services.memory_service import MemoryService
+from backend.funcs.admin import search_all_messages_paginated
+from backend.funcs.users import search_user_messages
+
+
+@pytest.fixture
+def app(app):
+    init_lexical_index(app)
+    return app
+
+
+def _add(content, user_id=1, persona='Maya'):
+    message = Message(user_id=user_id, role='user', content=content, persona=persona)
+    db.session.add(message)
+    db.session.commit()
+    return message
+
+
+def test_search_query_requires_every_term_with_prefix_last():
+    assert build_search_query('Hiking trip') == '"hiking" "trip"*'
+    assert build_search_query('  ?! ') is None
+
+
+def test_ranked_highlighted_and_escaped(app):
+    _add('We talked about the weather and a hiking trip <b>soon</b>')
+    _add('Hiking hiking hiking every weekend')
+    _add('Nothing relevant here')
+
+    results = search_messages('messages', 'hiking', user_id=1)
+
+    assert results['total'] == 2
+    assert results['results'][0]['snippet'] == '<mark>Hiking</mark> <mark>hiking</mark> <mark>hiking</mark> every weekend'
+    assert '&lt;b&gt;soon&lt;/b&gt;' in results['results'][1]['snippet']
+
+
+def test_index_follows_inserts_and_deletes(app):
+    message = _add('Planning a birthday party')
+    assert search_messages('messages', 'birthday', user_id=1)['total'] == 1
+
+    db.session.delete(message)
+    db.session.commit()
+    assert search_messages('messages', 'birthday', user_id=1)['total'] == 0
+
+
+def test_pagination_and_user_filter(app):
+    for i in range(5):
+        _add(f"exam number {i}")
+    _add('exam for someone else', user_id=2)
+
+    pages = [search_messages('messages', 'exam', user_id=1, per_page=2)]
+    while pages[-1]['next_cursor']:
+        pages.append(search_messages('messages', 'exam', user_id=1, cursor=pages[-1]['next_cursor'], per_page=2))
+    assert [len(page['results']) for page in pages] == [2, 2, 1]
+    assert [page['total'] for page in pages] == [5, 5, 5]
+    assert len({hit['id'] for page in pages for hit in page['results']}) == 5
+    with pytest.raises(ValueError):
+        search_messages('messages', 'exam', cursor='not-a-cursor')
+    assert search_all_messages_paginated('exam', per_page=10)['total'] == 6
+    assert [m.content for m in search_all_messages_paginated('exam', user_filter=2)['messages']] == \
+        ['exam for someone else']
+
+
+def test_total_is_capped(app):
+    app.config['SEARCH_COUNT_CAP'] = 3
+    for i in range(5):
+        _add(f"exam number {i}")
+
+    first = search_messages('messages', 'exam', user_id=1, per_page=2)
+    second = search_messages('messages', 'exam', user_id=1, cursor=first['next_cursor'], per_page=2)
+    assert [(page['total'], page['total_capped']) for page in (first, second)] == [(3, True), (3, True)]
+
+
+def test_user_and_conversation_search(app):
+    _add('Feeling stressed about exams')
+    db.session.add(ChatMessage(user_id=1, role='user', content='Exams start next week', persona='Isabella'))
+    db.session.commit()
+
+    assert [m.content for m in search_user_messages(1, 'exam')] == ['Feeling stressed about exams']
+    results = MemoryService.search_conversations(1, 'exam', persona='isabella')
+    assert [(r['content'], r['snippet']) for r in results] == \
+        [('Exams start next week', '<mark>Exams</mark> start next week')]
+
+
+def test_substring_fallback_without_index(app, monkeypatch):
+    monkeypatch.setattr(lexical_index, 'search_backend', None)
+    _add('Call mom on Sunday')
+
+    results = search_messages('messages', 'mom', user_id=1)
+    assert results['total'] == 1
+    assert results['results'][0]['snippet'] == 'Call <mark>mom</mark> on Sunday'
@@ -0,0 +1,101 @@
+"""
+Test Keyset Pagination
+Verify cursor pages walk message history newest first without gaps or
+repeats, and that totals come from the activity rollups
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.abspath('.'))
+
+import pytest
+
+from backend.database.models.models import db, Message
+from backend.database.utils.pagination import encode_cursor, decode_cursor, keyset_page
+from backend.services.activity_rollups import init_activity_rollups
+from backend.funcs.users import get_user_messages, get_user_messages_page
+from backend.funcs.admin import get_all_messages
+
+
+@pytest.fixture
+def app(app):
+    init_activity_rollups(app)
+    return app
+
+
+def _add_messages(count, user_id=1, persona='Maya'):
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        # Pairs share a timestamp so pages have to break ties on id
+        db.session.add(Message(user_id=user_id, role='user', content=f"message {i}", persona=persona,
+                               timestamp=start + timedelta(minutes=i // 2)))
+    db.session.commit()
+
+
+def test_cursor_round_trip():
+    timestamp = datetime(2024, 5, 6, 7, 8, 9, 123456)
+    assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+    assert decode_cursor(encode_cursor(None, 42)) == (None, 42)
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
+
+
+def test_pages_cover_history_newest_first(app):
+    _add_messages(7)
+    _add_messages(2, user_id=2)
+
+    seen, cursor = [], None
+    while True:
+        page = get_user_messages_page(1, cursor=cursor, per_page=3)
+        seen.extend(m.content for m in page['messages'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert seen == [f"message {i}" for i in reversed(range(7))]
+    assert page['total'] == 7 and not page['has_next']
+
+
+def test_offset_and_cursor_agree(app):
+    _add_messages(6)
+    first, cursor = keyset_page(Message.query.filter_by(user_id=1), Message.timestamp, Message.id, limit=4)
+
+    assert [m.id for m in get_user_messages(1, limit=2, offset=4)] == \
+        [m.id for m in get_user_messages(1, limit=2, cursor=cursor)]
+
+
+def test_null_timestamps_page_last(app):
+    _add_messages(3)
+    for i in range(3):
+        message = Message(user_id=1, role='user', content=f"undated {i}", persona='Maya')
+        db.session.add(message)
+        db.session.flush()
+        message.timestamp = None
+    db.session.commit()
+
+    seen, cursor = [], None
+    while True:
+        page = get_user_messages_page(1, cursor=cursor, per_page=2)
+        seen.extend(m.content for m in page['messages'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert seen == ['message 2', 'message 1', 'message 0', 'undated 2', 'undated 1', 'undated 0']
+
+
+def test_admin_log_totals_come_from_rollups(app):
+    _add_messages(3, persona='Maya')
+    _add_messages(2, user_id=2, persona='Alex')
+
+    first = get_all_messages(per_page=4)
+    assert (len(first['messages']), first['total'], sorted(first['personas'])) == (4, 5, ['Alex', 'Maya'])
+    last = get_all_messages(per_page=4, cursor=first['next_cursor'])
+    assert [m.content for m in last['messages']] == ['message 0'] and last['next_cursor'] is None
+
+    _add_messages(1, user_id=3, persona='Isabella')
+    assert get_all_messages(per_page=4)['total'] == 6
+    assert get_all_messages(user_id=2)['total'] == 2
+    assert get_all_messages(persona_filter='may')['total'] == 3
+    assert get_user_messages_page(1, persona_filter='Maya')['total'] == 3
@@ -0,0 +1,56 @@
+"""
+Test Prompt Builder
+Verify the cache-friendly message layout and cached-token accounting
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath('.'))
+
+from backend.services.chat.prompt_builder import (
+    get_prompt_template, build_chat_messages, PromptCacheStats
+)
+
+MOOD = {'has_recent_mood': True, 'tone_adjustment': 'Be extra gentle today.'}
+
+
+def test_static_prefix_is_stable_across_turns():
+    """Notes and mood change per turn but the leading system message doesn't"""
+    first, _ = build_chat_messages('hi', 'Maya', 'Wellness', ['likes hiking'], mood_context=MOOD)
+    second, _ = build_chat_messages('hello again', 'Maya', 'Wellness', ['has a dog'],
+                                    mood_context={'has_recent_mood': False})
+
+    assert first[0] == second[0]
+    assert 'likes hiking' not in first[0]['content']
+    assert 'CBT-style' in first[0]['content']
+
+
+def test_dynamic_context_goes_last():
+    history = {
+        'summary': 'User moved cities.',
+        'messages': [{'role': 'user', 'content': 'hey'}, {'role': 'assistant', 'content': 'hi!'}],
+    }
+    messages, template = build_chat_messages('how are you?', 'Maya', 'Companion', ['likes hiking'],
+                                             mood_context=MOOD, history=history)
+
+    assert [m['role'] for m in messages] == ['system', 'system', 'user', 'assistant', 'system', 'user']
+    assert 'likes hiking' in messages[-2]['content']
+    assert 'Be extra gentle today.' in messages[-2]['content']
+    assert template is get_prompt_template('Maya', 'Companion')
+
+
+def test_cache_key_per_persona_and_mode():
+    assert get_prompt_template('Maya', 'Companion').cache_key == get_prompt_template('Maya', 'Companion').cache_key
+    assert get_prompt_template('Maya', 'Companion').cache_key != get_prompt_template('Maya', 'Wellness').cache_key
+
+
+def test_cache_stats():
+    stats = PromptCacheStats()
+    assert stats.record({'prompt_tokens': 2000, 'prompt_tokens_details': {'cached_tokens': 1536}}) == 1536
+    assert stats.record({'prompt_tokens': 1000}) == 0
+    assert stats.record(None) == 0
+
+    result = stats.stats()
+    assert result['requests'] == 2
+    assert result['requests_with_hits'] == 1
+    assert result['cached_ratio'] == round(1536 / 3000, 3)
@@ -0,0 +1,86 @@
+"""
+Test Chat Response Cache
+Verify fingerprint/similarity lookup, variant collection, TTL and LRU eviction
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.abspath('.'))
+
+import backend.services.chat.response_cache as response_cache
+from backend.services.chat.response_cache import ResponseCache, normalize_prompt, mood_bucket
+
+# Tiny fake embedding space: greetings point one way, everything else another
+FAKE_VECTORS = {
+    'hi': [1.0, 0.0],
+    'hello': [0.99, 0.05],
+    'hey there': [0.98, 0.1],
+}
+
+
+def _fake_embed(text):
+    return FAKE_VECTORS.get(text, [0.0, 1.0])
+
+
+response_cache.embed_text = _fake_embed
+
+
+def test_normalize_and_bucket():
+    assert normalize_prompt("  Hi!!  😊 ") == 'hi'
+    assert normalize_prompt("I'm   feeling ANXIOUS today.") == "i'm feeling anxious today"
+    assert mood_bucket(None) == 'none'
+    assert mood_bucket({'tone_adjustment': 'calm'}) == mood_bucket({'tone_adjustment': 'calm'})
+
+
+def test_variants_collected_before_serving():
+    """An entry only serves replies once it holds the configured number of variants"""
+    cache = ResponseCache(variants=2)
+    key = ('hi', 'Isabella', 'Companion', 'none')
+
+    assert cache.lookup(*key) is None
+    cache.store(*key, 'Hey you!')
+    assert cache.lookup(*key) is None
+    cache.store(*key, 'Hi there!')
+
+    assert cache.lookup(*key) in ('Hey you!', 'Hi there!')
+    assert cache.stats()['hits'] == 1
+
+
+def test_similarity_lookup_respects_partition():
+    """Similar prompts share entries, but only within the same persona/mode/mood"""
+    cache = ResponseCache(variants=1, similarity=0.9)
+    cache.store('Hi!', 'Isabella', 'Companion', 'none', 'Hello friend')
+
+    assert cache.lookup('hello', 'Isabella', 'Companion', 'none') == 'Hello friend'
+    assert cache.lookup('hello', 'Alex', 'Companion', 'none') is None
+    assert cache.lookup('hello', 'Isabella', 'Wellness', 'none') is None
+    assert cache.lookup('what should I cook', 'Isabella', 'Companion', 'none') is None
+
+
+def test_ttl_and_lru_eviction():
+    cache = ResponseCache(variants=1, max_entries=2, ttl=0.05)
+    cache.store('hi', 'Isabella', 'Companion', 'none', 'a')
+    cache.store('one', 'Isabella', 'Companion', 'none', 'b')
+    cache.store('two', 'Isabella', 'Companion', 'none', 'c')
+    assert cache.stats()['entries'] == 2
+
+    time.sleep(0.1)
+    assert cache.lookup('two', 'Isabella', 'Companion', 'none') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_only_short_prompts_cacheable():
+    cache = ResponseCache(max_chars=20)
+    assert cache.is_cacheable('hi')
+    assert not cache.is_cacheable('I had a really long and complicated day at work')
+    assert not cache.is_cacheable('!!!')
+
+
+if __name__ == '__main__':
+    test_normalize_and_bucket()
+    test_variants_collected_before_serving()
+    test_similarity_lookup_respects_partition()
+    test_ttl_and_lru_eviction()
+    test_only_short_prompts_cacheable()
+    print("✅ Response cache tests passed")
@@ -0,0 +1,72 @@
+"""
+Test Retrieval Cache
+Verify similar queries reuse cached matches and upserts/deletes keep them current
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath('.'))
+
+from flask import Flask
+
+from backend.services.chat import pinecone_service, retrieval_cache
+from backend.services.chat.retrieval_cache import RetrievalCache
+
+
+def _match(record_id, score, text):
+    return {'id': record_id, 'score': score, 'metadata': {'user_id': '1', 'persona': 'Maya', 'text': text}}
+
+
+def test_similar_query_hits_and_other_conversation_misses():
+    cache = RetrievalCache(similarity=0.9)
+    cache.store(1, 'Maya', [1.0, 0.0], 2, [_match('a', 0.8, 'dog')])
+
+    assert cache.lookup('1', 'maya', [0.99, 0.05], 2)[0]['id'] == 'a'
+    assert cache.lookup(1, 'Maya', [0.0, 1.0], 2) is None
+    assert cache.lookup(2, 'Maya', [1.0, 0.0], 2) is None
+    assert cache.lookup(1, 'Maya', [1.0, 0.0], 5) is None  # Cached with a smaller top_k
+
+
+def test_upsert_patches_results_in_rank_order():
+    cache = RetrievalCache()
+    cache.store(1, 'Maya', [1.0, 0.0], 2, [_match('a', 0.9, 'dog'), _match('b', 0.5, 'cat')])
+
+    cache.apply_upsert([{'id': 'c', 'values': [0.8, 0.6], 'metadata': {'user_id': 1, 'persona': 'Maya', 'text': 'new'}}])
+    assert [m['id'] for m in cache.lookup(1, 'Maya', [1.0, 0.0], 2)] == ['a', 'c']
+
+    # Far from the query: doesn't displace anything
+    cache.apply_upsert([{'id': 'd', 'values': [0.0, 1.0], 'metadata': {'user_id': 1, 'persona': 'Maya', 'text': 'x'}}])
+    assert [m['id'] for m in cache.lookup(1, 'Maya', [1.0, 0.0], 2)] == ['a', 'c']
+    assert cache.stats()['patches'] == 1
+
+
+def test_invalidate_drops_conversation():
+    cache = RetrievalCache()
+    cache.store(1, 'Maya', [1.0, 0.0], 2, [])
+    cache.invalidate(1, 'maya')
+
+    assert cache.lookup(1, 'Maya', [1.0, 0.0], 2) is None
+
+
+def test_retrieve_chunks_skips_vector_query_on_hit(monkeypatch):
+    class FakeStore:
+        name = 'fake'
+        queries = 0
+
+        def query(self, vector, user_id, persona, top_k=5):
+            FakeStore.queries += 1
+            return [_match('a', 0.9, 'we talked about exams')]
+
+    app = Flask(__name__)
+    app.config['OPENAI_API_KEY'] = 'test'
+    monkeypatch.setattr(retrieval_cache, '_cache', None)
+    monkeypatch.setattr(pinecone_service, 'get_vector_store', lambda: FakeStore())
+    monkeypatch.setattr(pinecone_service, 'embed_text', lambda text: [1.0, 0.0] if 'exam' in text else [0.0, 1.0])
+
+    with app.app_context():
+        assert pinecone_service.retrieve_chunks(1, 'Maya', 'exams soon') == ['we talked about exams']
+        assert pinecone_service.retrieve_chunks(1, 'Maya', 'my exam is tomorrow') == ['we talked about exams']
+        assert FakeStore.queries == 1
+
+        pinecone_service.retrieve_chunks(1, 'Maya', 'something else')
+        assert FakeStore.queries == 2
@@ -0,0 +1,303 @@
+"""
+Test Local Vector Store
+Verify top-k search, per-user/persona isolation, upsert-by-id and persistence,
+variable-length text storage, concurrent writers, append-only segments and
+deferred file cleanup, the IVF index for large shards, plus namespaced Pinecone queries with legacy fallback
+"""
+
+import sys
+import os
+import glob
+import json
+import tempfile
+import threading
+sys.path.insert(0, os.path.abspath('.'))
+
+import numpy as np
+
+from backend.services.vector_store import local_store
+
+from backend.services.vector_store import LocalVectorStore, PineconeVectorStore, vector_id
+
+
+def _record(vector_id, values, text, user_id='1', persona='Isabella'):
+    return {'id': vector_id, 'values': values, 'metadata': {'user_id': user_id, 'persona': persona, 'text': text}}
+
+
+def _store():
+    return LocalVectorStore(tempfile.mkdtemp())
+
+
+def test_top_k_by_cosine_similarity():
+    store = _store()
+    store.upsert([
+        _record('a', [1.0, 0.0], 'likes hiking'),
+        _record('b', [0.0, 1.0], 'has a dog'),
+        _record('c', [0.7, 0.7], 'hikes with the dog'),
+    ])
+
+    matches = store.query([1.0, 0.1], '1', 'Isabella', top_k=2)
+
+    assert [m['metadata']['text'] for m in matches] == ['likes hiking', 'hikes with the dog']
+    assert matches[0]['score'] > matches[1]['score']
+
+
+def test_isolated_per_user_and_persona():
+    store = _store()
+    store.upsert([
+        _record('a', [1.0, 0.0], 'mine'),
+        _record('b', [1.0, 0.0], 'other user', user_id='2'),
+        _record('c', [1.0, 0.0], 'other persona', persona='Maya'),
+    ])
+
+    assert [m['metadata']['text'] for m in store.query([1.0, 0.0], '1', 'isabella')] == ['mine']
+
+    store.delete('1', 'Isabella')
+    assert store.query([1.0, 0.0], '1', 'Isabella') == []
+    assert len(store.query([1.0, 0.0], '2', 'Isabella')) == 1
+
+
+def test_upsert_replaces_existing_id():
+    store = _store()
+    store.upsert([_record('a', [1.0, 0.0], 'old')])
+    store.upsert([_record('a', [0.0, 1.0], 'new')])
+
+    matches = store.query([0.0, 1.0], '1', 'Isabella')
+    assert [m['metadata']['text'] for m in matches] == ['new']
+
+
+def test_visible_to_another_instance():
+    """The web process sees vectors written by the worker process"""
+    store = _store()
+    reader = LocalVectorStore(store.root)
+    assert reader.query([1.0, 0.0], '1', 'Isabella') == []
+
+    store.upsert([_record('a', [1.0, 0.0], 'from the worker')])
+    assert reader.query([1.0, 0.0], '1', 'Isabella')[0]['metadata']['text'] == 'from the worker'
+
+
+def test_texts_stored_as_variable_length_utf8():
+    store = _store()
+    long_text = 'a long memory ' * 500
+    store.upsert([_record('a', [1.0, 0.0], long_text), _record('b', [0.0, 1.0], 'ok 👍 café')])
+
+    [segment] = glob.glob(os.path.join(store.root, '1', 'isabella.*.seg.npz'))
+    with np.load(segment) as data:
+        assert 'texts' not in data.files
+        assert data['texts_blob'].nbytes == len(long_text) + len('ok 👍 café'.encode('utf-8'))
+
+    reader = LocalVectorStore(store.root)
+    assert reader.query([0.0, 1.0], '1', 'Isabella', top_k=1)[0]['metadata']['text'] == 'ok 👍 café'
+    assert reader.query([1.0, 0.0], '1', 'Isabella', top_k=1)[0]['metadata']['text'] == long_text
+
+
+def test_concurrent_writers_to_one_shard_keep_every_row():
+    """Separate store instances (as in separate processes) only share the file lock"""
+    root = tempfile.mkdtemp()
+    writers = [LocalVectorStore(root) for _ in range(3)]
+
+    def write(store, name):
+        for i in range(15):
+            store.upsert([_record(f"{name}-{i}", [1.0, float(i)], f"{name} {i}")])
+
+    threads = [threading.Thread(target=write, args=(store, n)) for n, store in enumerate(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(LocalVectorStore(root).query([1.0, 0.0], '1', 'Isabella', top_k=100)) == 45
+
+
+def _manifest(store, user_id='1', persona='isabella'):
+    with open(os.path.join(store.root, user_id, f'{persona}.json')) as f:
+        return json.load(f)
+
+
+def test_upserts_append_segments_without_rewriting_earlier_ones():
+    store = _store()
+    store.upsert([_record(str(i), [1.0, float(i)], f"memory {i}") for i in range(100)])
+    [base] = _manifest(store)['segments']
+
+    for i in range(7):
+        store.upsert([_record(f"new-{i}", [float(i), 1.0], f"new {i}")])
+
+    segments = _manifest(store)['segments']
+    assert segments[0] == base
+    assert len(segments) == 4  # 100, then 7 single rows merged like a binary counter: 4 + 2 + 1
+    assert len(glob.glob(os.path.join(store.root, '1', 'isabella.*.seg.npz'))) == 4
+    assert len(store.query([1.0, 0.0], '1', 'Isabella', top_k=200)) == 107
+
+
+def test_overridden_rows_are_hidden_until_compacted():
+    store = _store()
+    store.upsert([_record(str(i), [1.0, 0.0], f"old {i}") for i in range(4)])
+    store.upsert([_record('0', [0.0, 1.0], 'new 0')])
+
+    matches = store.query([1.0, 0.0], '1', 'Isabella', top_k=10)
+    assert sorted(m['metadata']['text'] for m in matches) == ['new 0', 'old 1', 'old 2', 'old 3']
+    assert store.stats()['segments'] == 2
+
+    store.upsert([_record(str(i), [0.0, 1.0], f"new {i}") for i in range(1, 4)])
+    assert len(_manifest(store)['segments']) == 1
+    assert len(store.query([1.0, 0.0], '1', 'Isabella', top_k=10)) == 4
+
+
+def test_files_in_use_are_removed_by_a_later_write(monkeypatch):
+    """Windows refuses to remove memory-mapped codes; they're collected after the next write"""
+    store = LocalVectorStore(tempfile.mkdtemp(), ann_min_vectors=100)
+    vectors = _clustered(150)
+    store.upsert([_record(str(i), v.tolist(), f"memory {i}") for i, v in enumerate(vectors)])
+    codes = os.path.join(store.root, '1', 'isabella.*.codes.npy')
+    [old_codes] = glob.glob(codes)
+
+    real_remove = os.remove
+
+    def remove(path):
+        if path.endswith('.codes.npy'):
+            raise PermissionError(path)
+        real_remove(path)
+
+    monkeypatch.setattr(local_store.os, 'remove', remove)
+    assert store.delete_ids('1', 'Isabella', {'3'}) == 1
+    assert old_codes in glob.glob(codes) and len(glob.glob(codes)) == 2
+
+    monkeypatch.setattr(local_store.os, 'remove', real_remove)
+    store.upsert([_record('new', vectors[0].tolist(), 'just added')])
+    assert old_codes not in glob.glob(codes)
+    assert len(glob.glob(codes)) == len(_manifest(store)['segments'])
+
+
+def test_single_file_shards_from_before_segments_still_load():
+    store = _store()
+    os.makedirs(os.path.join(store.root, '1'))
+    np.savez(os.path.join(store.root, '1', 'isabella.npz'), matrix=np.array([[1.0, 0.0]], dtype=np.float32),
+             ids=np.array(['a']), texts=np.array(['from the old layout']))
+
+    assert store.query([1.0, 0.0], '1', 'Isabella')[0]['metadata']['text'] == 'from the old layout'
+
+    store.upsert([_record('b', [0.0, 1.0], 'new')])
+    assert not os.path.exists(os.path.join(store.root, '1', 'isabella.npz'))
+    assert len(store.query([1.0, 0.0], '1', 'Isabella')) == 2
+
+
+def _clustered(count, dimensions=64, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((20, dimensions))
+    return centers[rng.integers(20, size=count)] + 0.5 * rng.standard_normal((count, dimensions))
+
+
+def test_large_shard_uses_ivf_index_with_high_recall():
+    vectors = _clustered(2000)
+    exact = _store()
+    indexed = LocalVectorStore(tempfile.mkdtemp(), ann_min_vectors=1000, nprobe=8)
+    records = [_record(str(i), v.tolist(), f"memory {i}") for i, v in enumerate(vectors)]
+    exact.upsert(records)
+    indexed.upsert(records)
+
+    recalls = []
+    for query in _clustered(50, seed=1):
+        truth = {m['id'] for m in exact.query(query, '1', 'Isabella', top_k=10)}
+        found = {m['id'] for m in indexed.query(query, '1', 'Isabella', top_k=10)}
+        recalls.append(len(truth & found) / 10)
+
+    assert np.mean(recalls) >= 0.9
+    assert indexed.stats()['ann_queries'] == 50
+    assert indexed.stats()['indexed_shards'] == 1
+
+
+def test_ivf_index_encodes_only_new_rows_and_deletes():
+    store = LocalVectorStore(tempfile.mkdtemp(), ann_min_vectors=100)
+    store.upsert([_record(str(i), v.tolist(), f"memory {i}") for i, v in enumerate(_clustered(150))])
+    [base_codes] = glob.glob(os.path.join(store.root, '1', 'isabella.*.codes.npy'))
+
+    target = np.zeros(64)
+    target[0] = 1.0
+    store.upsert([_record('new', target.tolist(), 'just added'), _record('5', target.tolist(), 'overwritten')])
+
+    top = store.query(target, '1', 'Isabella', top_k=2)
+    assert {m['metadata']['text'] for m in top} == {'just added', 'overwritten'}
+    codes = glob.glob(os.path.join(store.root, '1', 'isabella.*.codes.npy'))
+    assert base_codes in codes and len(codes) == 2
+    assert sorted(len(np.load(path, mmap_mode='r')) for path in codes) == [2, 150]
+    texts = {m['metadata']['text'] for m in store.query(_clustered(150)[5], '1', 'Isabella', top_k=150)}
+    assert 'memory 5' not in texts and 'memory 6' in texts
+
+    store.delete('1', 'Isabella')
+    assert os.listdir(os.path.join(store.root, '1')) == []
+
+
+def test_delete_ids_keeps_ivf_index_consistent():
+    store = LocalVectorStore(tempfile.mkdtemp(), ann_min_vectors=100)
+    vectors = _clustered(150)
+    store.upsert([_record(str(i), v.tolist(), f"memory {i}") for i, v in enumerate(vectors)])
+
+    assert store.delete_ids('1', 'Isabella', {'3', '7', 'missing'}) == 2
+    found = {m['id'] for m in store.query(vectors[4], '1', 'Isabella', top_k=3)}
+    assert '4' in found and not found & {'3', '7'}
+    assert store.stats()['indexed_shards'] == 1
+
+
+class FakeIndex:
+    """Records Pinecone calls and answers queries from canned matches per namespace"""
+
+    def __init__(self, matches=None):
+        self.matches = matches or {}
+        self.calls = []
+
+    def upsert(self, vectors, namespace=''):
+        self.calls.append(('upsert', namespace, vectors))
+
+    def query(self, vector, top_k, include_metadata, filter, namespace=''):
+        self.calls.append(('query', namespace, filter, top_k))
+        return {'matches': self.matches.get(namespace, [])[:top_k]}
+
+
+def _match(vector_id, score, text, persona='Isabella'):
+    return {'id': vector_id, 'score': score, 'metadata': {'user_id': '1', 'persona': persona, 'text': text}}
+
+
+def test_pinecone_upserts_into_user_namespace():
+    index = FakeIndex()
+    PineconeVectorStore(index).upsert([_record('a', [1.0], 'hi'), _record('b', [1.0], 'yo', user_id='2')])
+
+    namespaces = {call[1]: call[2] for call in index.calls}
+    assert set(namespaces) == {'user-1', 'user-2'}
+    assert namespaces['user-1'][0]['metadata']['persona_key'] == 'isabella'
+
+
+def test_pinecone_query_filters_server_side():
+    index = FakeIndex({'user-1': [_match('a', 0.9, 'x'), _match('b', 0.8, 'y')]})
+    store = PineconeVectorStore(index)
+
+    matches = store.query([1.0], '1', 'Isabella', top_k=2)
+
+    assert [m['id'] for m in matches] == ['a', 'b']
+    assert index.calls == [('query', 'user-1', {'persona_key': {'$eq': 'isabella'}}, 2)]
+
+
+def test_pinecone_short_result_falls_back_to_legacy_vectors():
+    index = FakeIndex({
+        'user-1': [_match('a', 0.7, 'new')],
+        '': [_match('old-1', 0.9, 'old'), _match('old-2', 0.8, 'other persona', persona='Maya')],
+    })
+    store = PineconeVectorStore(index)
+
+    matches = store.query([1.0], '1', 'isabella', top_k=2)
+
+    assert [m['id'] for m in matches] == ['old-1', 'a']
+    assert store.stats()['short_results'] == 1
+
+
+def test_vector_ids_are_stable_and_scoped():
+    assert vector_id('1', 'Isabella', 'I went hiking today') == vector_id('1', 'isabella', 'I went hiking today')
+    assert vector_id('1', 'Isabella', 'ok') != vector_id('2', 'Isabella', 'ok')
+    assert vector_id('1', 'Isabella', 'ok') != vector_id('1', 'Maya', 'ok')
+
+
+def test_near_identical_short_messages_share_an_id():
+    assert vector_id('1', 'Isabella', 'ok') == vector_id('1', 'Isabella', 'Ok!')
+    assert vector_id('1', 'Isabella', 'Thanks') == vector_id('1', 'Isabella', '  thanks.  ')
+
+    long_text = 'I had a really long day at work and I just want to talk about it for a while.'
+    assert vector_id('1', 'Isabella', long_text) != vector_id('1', 'Isabella', long_text.upper())